@@ -1,3 +1,4 @@
+from typing import List
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -13,7 +14,56 @@ class Settings(BaseSettings):
     STRIPE_PRICE_1M: str = ""
     STRIPE_PRICE_3M: str = ""
     STRIPE_PRICE_1Y: str = ""
+    STRIPE_WEBHOOK_TOLERANCE_S: int = 300  # idade máxima do t= da assinatura (replay)
+
+    # inbox do webhook: o request só grava o evento; o drainer aplica em lotes numa thread
+    STRIPE_INBOX_BATCH: int = 100
+    STRIPE_INBOX_POLL_S: float = 5.0       # o webhook acorda o drainer na hora; isso é só a rede de segurança
+    STRIPE_INBOX_MAX_ATTEMPTS: int = 5     # evento que falhou tudo isso fica parado pra olhar na mão
 
     FRONTEND_URL: str = "http://localhost:3000"
 
+    # create_all + migrações no boot de cada worker. Desligado: em produção rodam uma vez
+    # por release (Procfile `release:` / serviço `migrate` do compose). SQLite (dev local,
+    # um processo) migra no boot mesmo assim
+    DB_AUTO_MIGRATE: bool = False
+    WARMUP_WINDOWS: List[int] = [60]  # rankings pré-calculados antes do /ready responder 200
+
+    # paywall: cache do "assinatura ativa?" (o drainer do Stripe invalida na hora no worker em que
+    # rodou; nos outros, cancelamento leva até ENTITLEMENT_TTL_S e pagamento até o NEGATIVE)
+    ENTITLEMENT_TTL_S: float = 60.0
+    ENTITLEMENT_NEGATIVE_TTL_S: float = 5.0
+    ENTITLEMENT_CACHE_SIZE: int = 50_000
+
+    # motor
+    RANKING_CACHE_SIZE: int = 64  # rankings (concurso base × janela × pesos) em memória
+    STATS_WINDOWS: List[int] = [50, 60, 100, 200]  # janelas com estatística incremental no banco
+    ENGINE_WORKERS: int = 2            # processos do motor (0 = roda inline na thread do request)
+    ENGINE_MAX_INFLIGHT: int = 8       # jobs em voo; passou disso responde 429
+    ENGINE_JOB_TIMEOUT_S: float = 20.0
+    ENGINE_RETRY_AFTER_S: int = 2
+
+    TICKET_OPTIMIZER_BUDGET_MS: float = 250.0  # ticket_mode "optimizer": tempo máximo por request
+    # /generate/evaluate: chance do conjunto por Monte Carlo, em fatias no pool do motor
+    EVALUATOR_SAMPLES: int = 1_000_000       # sorteios simulados quando o request não diz
+    EVALUATOR_MAX_SAMPLES: int = 20_000_000
+    EVALUATOR_SHARD_SAMPLES: int = 100_000   # sorteios por job (o orçamento de tempo corta entre fatias)
+    EVALUATOR_BUDGET_MS: float = 2000.0      # teto da simulação; vale o que terminou dentro dele
+    STREAM_FLUSH_EVERY: int = 10       # /generate/stream: apostas por INSERT + commit
+    IMPORT_CHUNK_SIZE: int = 1000      # concursos por INSERT ... ON CONFLICT no import
+    MIGRATION_BATCH_SIZE: int = 5000   # linhas por transação no backfill das migrações
+    # histórico mapeado em memória, compartilhado entre workers do mesmo host ("" = desliga)
+    DRAW_SNAPSHOT_PATH: str = "/tmp/lotomania-draws.snap"
+    # estatística pública (/stats): reconstruída no import; cada worker confere o concurso no banco
+    # no máximo a cada PUBLIC_STATS_RECHECK_S (import feito em outro host)
+    PUBLIC_STATS_PATH: str = "/tmp/lotomania-public-stats.json"
+    PUBLIC_STATS_WINDOWS: List[int] = [50, 60, 100, 200]
+    PUBLIC_STATS_RECHECK_S: float = 60.0
+    BACKTEST_WORKERS: int = 4          # processos do backtest (0 = inline)
+    BACKTEST_TIMEOUT_S: float = 600.0  # um backtest por vez; outro enquanto roda leva 429
+    RESULTS_BATCH_SIZE: int = 50_000   # apostas por lote na conferência (fora do Postgres)
+    EXPORT_PAGE_SIZE: int = 20_000     # export CSV/Parquet: linhas por página (keyset) = por row group
+    EXPORT_SESSIONS_PER_PAGE: int = 100  # export de apostas: sessões por página (as apostas delas vêm em lotes)
+    EXPORT_FETCH_SIZE: int = 2_000     # linhas por ida ao cursor dentro da página
+
 settings = Settings()
@@ -0,0 +1,82 @@
+from collections import OrderedDict
+from typing import Dict
+import threading
+import time
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db import crud
+
+class EntitlementCache:
+    """Cache em processo do "tem assinatura ativa?" usado no paywall.
+
+    Só o drainer da inbox do Stripe muda esse estado, e ele invalida o usuário na
+    hora no worker em que rodou. Nos outros workers a mudança aparece em no máximo
+    `ttl_s` (cancelamento: ainda gera por até ENTITLEMENT_TTL_S) ou `negative_ttl_s`
+    (pagamento: curto pra quem acabou de pagar não esperar).
+
+    Leitura do banco que estava em andamento quando chegou um invalidate não entra
+    no cache (geração por usuário): o valor velho não sobrevive à invalidação.
+    """
+
+    def __init__(self, ttl_s: float, negative_ttl_s: float, maxsize: int):
+        self.ttl_s = ttl_s
+        self.negative_ttl_s = negative_ttl_s
+        self.maxsize = maxsize
+        self._data: "OrderedDict[int, tuple]" = OrderedDict()  # user_id -> (ativo, expira_em)
+        self._lock = threading.Lock()
+        self._loading: Dict[int, int] = {}  # user_id -> geração da leitura do banco em andamento
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def is_entitled(self, db: Session, user_id: int) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(user_id)
+            if entry is not None and entry[1] > now:
+                self._data.move_to_end(user_id)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            self._generation += 1
+            generation = self._loading[user_id] = self._generation
+
+        try:
+            active = crud.has_active_subscription(db, user_id)
+        except BaseException:
+            with self._lock:
+                if self._loading.get(user_id) == generation:
+                    del self._loading[user_id]
+            raise
+        ttl = self.ttl_s if active else self.negative_ttl_s
+        with self._lock:
+            # invalidate (ou outra leitura mais nova) no meio: devolve o que leu, mas não guarda
+            if self._loading.get(user_id) == generation:
+                del self._loading[user_id]
+                self._data[user_id] = (active, now + ttl)
+                self._data.move_to_end(user_id)
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+        return active
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._data.pop(user_id, None)
+            self._loading.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._loading.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+entitlements = EntitlementCache(
+    ttl_s=settings.ENTITLEMENT_TTL_S,
+    negative_ttl_s=settings.ENTITLEMENT_NEGATIVE_TTL_S,
+    maxsize=settings.ENTITLEMENT_CACHE_SIZE,
+)
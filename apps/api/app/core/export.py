@@ -0,0 +1,165 @@
+"""Export em streaming: linhas (tuplas) viram pedaços de CSV ou Parquet à medida que chegam.
+
+Nada do arquivo inteiro fica na memória: o CSV sai a cada `CSV_CHUNK_ROWS` linhas e o
+Parquet a cada row group (`row_group` linhas), com o rodapé no fim. Quem alimenta é um
+iterador do crud (keyset + yield_per), então memória = um bloco. As dezenas chegam como
+máscara de 100 bits e são decodificadas por bloco, com numpy.
+
+Parquet é opcional (pyarrow): sem ele `parquet_chunks` levanta ExportUnavailable.
+"""
+from datetime import datetime
+from typing import Iterable, Iterator, List, Sequence, Tuple
+import csv
+import io
+
+import numpy as np
+
+from app.engine.bitmask import masks_to_matrix
+
+CSV_MEDIA_TYPE = "text/csv; charset=utf-8"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+CSV_CHUNK_ROWS = 1000
+
+# (nome, tipo): "int16/32/64", "string", "timestamp" ou "mask" (dezenas como máscara de 100 bits)
+Columns = Sequence[Tuple[str, str]]
+
+BET_COLUMNS: Columns = (
+    ("session_id", "int64"),
+    ("created_at", "timestamp"),
+    ("lottery", "string"),
+    ("base_draw_id", "string"),
+    ("target_contest", "int32"),
+    ("index", "int32"),
+    ("seed", "int64"),
+    ("numbers", "mask"),
+    ("hits", "int16"),
+)
+
+DRAW_COLUMNS: Columns = (
+    ("contest", "int32"),
+    ("date_br", "string"),
+    ("numbers", "mask"),
+)
+
+_TWO_DIGITS = np.array([f"{n:02d} " for n in range(100)], dtype="S3")
+
+class ExportUnavailable(Exception):
+    """Formato pedido precisa de dependência que não está instalada."""
+
+def _blocks(rows: Iterable[tuple], size: int) -> Iterator[List[tuple]]:
+    block: List[tuple] = []
+    for row in rows:
+        block.append(row)
+        if len(block) >= size:
+            yield block
+            block = []
+    if block:
+        yield block
+
+def _mask_members(masks) -> Tuple[np.ndarray, np.ndarray]:
+    # (dezenas de todas as linhas em sequência, quantas por linha): decodifica o bloco de uma vez
+    m = masks_to_matrix(masks).astype(bool)
+    return np.nonzero(m)[1], m.sum(axis=1)
+
+def _csv_column(values: Sequence, kind: str) -> list:
+    if kind == "mask":
+        cols, counts = _mask_members(values)
+        text = _TWO_DIGITS[cols].tobytes().decode("ascii")  # "02 07 ... " de todas as linhas juntas
+        ends = (np.cumsum(counts) * 3).tolist()
+        return [text[start:end - 1] for start, end in zip([0] + ends[:-1], ends)]
+    if kind == "timestamp":
+        return [v.isoformat() if isinstance(v, datetime) else ("" if v is None else v) for v in values]
+    return ["" if v is None else v for v in values]
+
+def csv_chunks(columns: Columns, rows: Iterable[tuple]) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow([name for name, _ in columns])
+    for block in _blocks(rows, CSV_CHUNK_ROWS):
+        cells = [_csv_column(values, kind) for values, (_, kind) in zip(zip(*block), columns)]
+        writer.writerows(zip(*cells))
+        yield buf.getvalue().encode("utf-8")
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")  # export vazio: só o cabeçalho
+
+class _Sink:
+    # "arquivo" só de escrita pro ParquetWriter: guarda os bytes até o gerador levar
+    closed = False
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._pos = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        out = b"".join(self._parts)
+        self._parts.clear()
+        return out
+
+def parquet_chunks(columns: Columns, rows: Iterable[tuple], row_group: int) -> Iterator[bytes]:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportUnavailable("Parquet precisa do pyarrow instalado; use format=csv.")
+
+    types = {
+        "int16": pa.int16(), "int32": pa.int32(), "int64": pa.int64(), "string": pa.string(),
+        "timestamp": pa.timestamp("us"), "mask": pa.list_(pa.uint8()),
+    }
+    schema = pa.schema([(name, types[kind]) for name, kind in columns])
+    return _parquet_stream(pa, pq, schema, [kind for _, kind in columns], rows, row_group)
+
+def _parquet_stream(pa, pq, schema, kinds: List[str], rows: Iterable[tuple], row_group: int) -> Iterator[bytes]:
+    # separado do parquet_chunks pra falta do pyarrow estourar antes do stream começar
+    def array(values: Sequence, kind: str, type_):
+        if kind == "mask":
+            cols, counts = _mask_members(values)
+            offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int32)
+            return pa.ListArray.from_arrays(pa.array(offsets), pa.array(cols.astype(np.uint8)))
+        return pa.array(values, type=type_)
+
+    sink = _Sink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        for block in _blocks(rows, row_group):
+            arrays = [array(values, kind, f.type) for values, kind, f in zip(zip(*block), kinds, schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))  # um row group por bloco
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+def streaming_response(fmt: str, columns: Columns, rows: Iterable[tuple], basename: str, row_group: int):
+    """StreamingResponse do export; pyarrow faltando vira 501 antes de abrir o stream."""
+    from fastapi import HTTPException
+    from fastapi.responses import StreamingResponse
+
+    if fmt == "parquet":
+        try:
+            body = parquet_chunks(columns, rows, row_group)
+        except ExportUnavailable as e:
+            raise HTTPException(status_code=501, detail=str(e))
+        media_type = PARQUET_MEDIA_TYPE
+    else:
+        body = csv_chunks(columns, rows)
+        media_type = CSV_MEDIA_TYPE
+    return StreamingResponse(
+        body, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{basename}.{fmt}"'}
+    )
@@ -0,0 +1,224 @@
+"""Métricas em processo: tempo por etapa do request (header Server-Timing) e /metrics (Prometheus).
+
+Sem dependência externa: contador/histograma com lock e render no formato texto do
+Prometheus. Barato o suficiente pra ficar ligado sempre (um perf_counter + um lock
+por observação). Cada worker do uvicorn tem os seus números; o Prometheus soma.
+
+Uso no código quente:
+
+    with stage("db.draws"):
+        rows = db.query(...).all()
+
+Tempo exclusivo: etapa dentro de etapa (ex.: "snapshot" e "engine.scores" dentro de
+"ranking") desconta o tempo das filhas, inclusive o SQL, que vai todo pro "db". Assim
+as partes do Server-Timing e as somas por etapa do histograma não contam nada duas
+vezes e fecham (no máximo) com o total do request.
+
+Dentro do motor (que pode rodar em outro processo) só dá pra contar eventos com
+`note(...)`; quem chama usa `engine_job` pra trazer tempo e contadores de volta.
+"""
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+import threading
+import time
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _fmt(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+def _labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(str(labels[n]) for n in self.labelnames), 0)
+
+    def render(self) -> List[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, v in sorted(self._values.items()):
+                out.append(f"{self.name}{_labels(self.labelnames, key)} {_fmt(v)}")
+        return out
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], list] = {}  # labels -> [contagens por bucket..., soma, total]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                s = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            if i < len(self.buckets):
+                s[i] += 1
+            s[-2] += value
+            s[-1] += 1
+
+    def render(self) -> List[str]:
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(k, list(s)) for k, s in sorted(self._series.items())]
+        for key, s in series:
+            acc = 0
+            for le, n in zip(self.buckets, s):
+                acc += n
+                bucket = _labels(self.labelnames, key, 'le="%s"' % _fmt(le))
+                out.append(f"{self.name}_bucket{bucket} {acc}")
+            bucket = _labels(self.labelnames, key, 'le="+Inf"')
+            out.append(f"{self.name}_bucket{bucket} {s[-1]}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_fmt(s[-2])}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, key)} {s[-1]}")
+        return out
+
+class Gauge:
+    # valor lido na hora do scrape (jobs em voo, ou contadores que já existem em outro objeto)
+    def __init__(self, name: str, help: str, fn: Callable[[], float], kind: str = "gauge"):
+        self.name, self.help, self.fn, self.kind = name, help, fn, kind
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", f"{self.name} {_fmt(self.fn())}"]
+
+REQUESTS = Counter("lotomania_http_requests_total", "Requests HTTP por rota e status.", ("method", "route", "status"))
+REQUEST_SECONDS = Histogram("lotomania_http_request_duration_seconds", "Latência dos requests HTTP.", ("method", "route"))
+STAGE_SECONDS = Histogram("lotomania_stage_duration_seconds", "Tempo por etapa do caminho quente.", ("stage",))
+DB_SECONDS = Histogram("lotomania_db_query_duration_seconds", "Tempo de cada comando SQL.")
+ENGINE_SECONDS = Histogram("lotomania_engine_job_duration_seconds", "Tempo de CPU de cada job do motor (sem fila).", ("job",))
+ENGINE_EVENTS = Counter("lotomania_engine_events_total", "Eventos contados dentro do motor (ex.: overlap_retries).", ("event",))
+TICKETS = Counter("lotomania_tickets_generated_total", "Bilhetes gerados (sessões reaproveitadas não contam).", ("mode",))
+
+_REGISTRY: list = [REQUESTS, REQUEST_SECONDS, STAGE_SECONDS, DB_SECONDS, ENGINE_SECONDS, ENGINE_EVENTS, TICKETS]
+
+def register(metric) -> None:
+    _REGISTRY.append(metric)
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+class RequestTimings:
+    """Soma de tempo exclusivo por etapa de um request (vira o header Server-Timing)."""
+
+    __slots__ = ("started", "stages")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def header(self) -> str:
+        parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.stages.items()]
+        parts.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.2f}")
+        return ", ".join(parts)
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+# etapas abertas (a mais interna no fim): quanto das filhas já foi contado em cada uma
+_open: ContextVar[Optional[List[float]]] = ContextVar("open_stages", default=None)
+
+def begin_request() -> RequestTimings:
+    timings = RequestTimings()
+    _current.set(timings)
+    _open.set([])
+    return timings
+
+def _charge_parent(seconds: float) -> None:
+    frames = _open.get()
+    if frames:
+        frames[-1] += seconds
+
+def observe_stage(name: str, seconds: float) -> None:
+    # `seconds` é exclusivo (sem sub-etapas); a etapa aberta em volta desconta ele
+    STAGE_SECONDS.observe(seconds, stage=name)
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds)
+    _charge_parent(seconds)
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    frames = _open.get()
+    if frames is None:  # fora de request (thread de rebuild, warmup)
+        frames = []
+        _open.set(frames)
+    frames.append(0.0)
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - t0
+        children = frames.pop()
+        observe_stage(name, max(elapsed - children, 0.0))
+        _charge_parent(children)
+
+def observe_query(seconds: float) -> None:
+    DB_SECONDS.observe(seconds)
+    timings = _current.get()
+    if timings is not None:
+        timings.add("db", seconds)
+    _charge_parent(seconds)
+
+def instrument_engine(engine) -> None:
+    """Cronometra todo comando SQL do engine (soma no "db" do request e no histograma)."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_started"] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop("query_started", None)
+        if started is not None:
+            observe_query(time.perf_counter() - started)
+
+# Contadores do job do motor. No pool de processos o ContextVar é do worker, então
+# `engine_job` devolve o que foi contado junto com o resultado.
+_job_events: ContextVar[Optional[Dict[str, float]]] = ContextVar("engine_job_events", default=None)
+
+def note(event: str, amount: float = 1) -> None:
+    events = _job_events.get()
+    if events is not None:
+        events[event] = events.get(event, 0) + amount
+
+def engine_job(fn: Callable, *args) -> Tuple[object, float, Dict[str, float]]:
+    # roda no worker: (resultado, segundos de CPU do job, eventos contados)
+    events: Dict[str, float] = {}
+    token = _job_events.set(events)
+    t0 = time.perf_counter()
+    try:
+        result = fn(*args)
+    finally:
+        _job_events.reset(token)
+    return result, time.perf_counter() - t0, events
+
+def record_engine_job(job: str, seconds: float, events: Dict[str, float]) -> None:
+    ENGINE_SECONDS.observe(seconds, job=job)
+    observe_stage(f"engine.{job}", seconds)
+    for event, amount in events.items():
+        ENGINE_EVENTS.inc(amount, event=event)
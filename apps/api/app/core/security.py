@@ -1,20 +1,29 @@
 from datetime import datetime, timedelta
-from jose import jwt
-from passlib.context import CryptContext
+from functools import lru_cache
 from app.core.config import settings
 
-pwd = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# passlib/bcrypt e jose só entram no primeiro uso (ou no aquecimento do /ready),
+# não no boot do worker
+
+@lru_cache(maxsize=None)
+def _pwd():
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def hash_password(raw: str) -> str:
-    return pwd.hash(raw)
+    return _pwd().hash(raw)
 
 def verify_password(raw: str, hashed: str) -> bool:
-    return pwd.verify(raw, hashed)
+    return _pwd().verify(raw, hashed)
 
 def create_access_token(sub: str) -> str:
+    from jose import jwt
+
     exp = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_MINUTES)
     payload = {"sub": sub, "exp": exp}
     return jwt.encode(payload, settings.JWT_SECRET, algorithm=settings.JWT_ALG)
 
 def decode_token(token: str) -> dict:
+    from jose import jwt
+
     return jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALG])
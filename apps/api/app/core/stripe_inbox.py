@@ -0,0 +1,164 @@
+"""Webhook do Stripe com inbox: o request só confere a assinatura e grava o evento.
+
+O Stripe reenvia o mesmo evento (mesmo id) até receber 2xx, então a tabela
+stripe_events usa o id como chave e o retry vira no-op. Quem aplica na
+assinatura é o `StripeInbox`, numa thread de fundo, evento por evento, fora do
+event loop e do caminho do request.
+
+A assinatura é conferida pelo SDK (stripe.WebhookSignature.verify_header), sem
+o parse de evento do construct_event: o corpo cru vai pra inbox do jeito que chegou.
+`sign_payload` monta o mesmo header `Stripe-Signature: t=<epoch>,v1=<hex>`
+(hex = HMAC-SHA256(segredo, "<t>.<corpo>")), pra testar/rodar local sem o Stripe.
+"""
+from datetime import datetime
+from typing import Optional
+import hashlib
+import hmac
+import json
+import threading
+import time
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.entitlements import entitlements
+from app.db import crud
+
+SUBSCRIPTION_EVENTS = (
+    "customer.subscription.created",
+    "customer.subscription.updated",
+    "customer.subscription.deleted",  # cancelou de vez: status "canceled"
+)
+
+class SignatureError(Exception):
+    """Assinatura ausente, inválida ou velha demais, ou corpo que não é evento."""
+
+def sign_payload(payload: bytes, secret: str, timestamp: Optional[int] = None) -> str:
+    t = int(time.time()) if timestamp is None else timestamp
+    sig = hmac.new(secret.encode(), f"{t}.".encode() + payload, hashlib.sha256).hexdigest()
+    return f"t={t},v1={sig}"
+
+def verify_event(payload: bytes, header: Optional[str], secret: str, tolerance_s: int = 300) -> dict:
+    """Confere o header Stripe-Signature (verificador do SDK) e devolve o evento (JSON do corpo)."""
+    import stripe  # preguiçoso: só o webhook usa
+
+    if not header or not secret:
+        raise SignatureError("sem assinatura")
+    try:
+        stripe.WebhookSignature.verify_header(payload.decode("utf-8"), header, secret, tolerance_s or None)
+    except stripe.SignatureVerificationError as e:
+        raise SignatureError(str(e))
+    except UnicodeDecodeError:
+        raise SignatureError("corpo não é UTF-8")
+
+    try:
+        event = json.loads(payload)
+    except ValueError:
+        raise SignatureError("corpo não é JSON")
+    if not isinstance(event, dict) or not event.get("id") or not event.get("type"):
+        raise SignatureError("evento sem id/type")
+    return event
+
+def apply_event(db: Session, event: dict) -> Optional[int]:
+    # só os eventos de assinatura mexem no banco; o resto fica registrado como processado
+    if event["type"] not in SUBSCRIPTION_EVENTS:
+        return None
+    return crud.apply_stripe_subscription(db, event["data"]["object"], int(event.get("created") or 0))
+
+class StripeInbox:
+    """Drena a tabela stripe_events: thread de fundo acordada pelo webhook (ou a cada `poll_s`)."""
+
+    def __init__(self, batch_size: int, poll_s: float, max_attempts: int):
+        self.batch_size = batch_size
+        self.poll_s = poll_s
+        self.max_attempts = max_attempts
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._drain_lock = threading.Lock()
+        self.applied = 0
+        self.failed = 0
+        self.drain_errors = 0
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stripe-inbox", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            self._wake.set()
+            thread.join(timeout)
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                self.drain()
+            except Exception:
+                self.drain_errors += 1  # banco fora do ar etc.: tenta de novo no próximo ciclo
+            self._wake.wait(self.poll_s)
+
+    def drain(self) -> int:
+        """Aplica os eventos pendentes até a inbox esvaziar. Devolve quantos foram processados."""
+        from app.db.session import SessionLocal
+
+        done = 0
+        with self._drain_lock:
+            db = SessionLocal()
+            try:
+                while True:
+                    ids = crud.pending_stripe_event_ids(db, self.batch_size, self.max_attempts)
+                    db.rollback()
+                    batch = sum(self._process(db, event_id) for event_id in ids) if ids else 0
+                    done += batch
+                    if not batch:
+                        # vazia, ou só sobrou evento falhando: esse tenta de novo no próximo ciclo
+                        return done
+            finally:
+                db.close()
+
+    def _process(self, db: Session, event_id: str) -> int:
+        # um commit por evento: a alteração na assinatura e o processed_at entram juntos
+        row = crud.claim_stripe_event(db, event_id)
+        if row is None:
+            db.rollback()
+            return 0
+        try:
+            user_id = apply_event(db, json.loads(row.payload))
+            row.processed_at = datetime.utcnow()
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            self.failed += 1
+            row = crud.claim_stripe_event(db, event_id)
+            if row is not None:
+                row.attempts += 1
+                row.last_error = repr(e)[:1000]
+                db.commit()
+            return 0
+        self.applied += 1
+        if user_id is not None:
+            entitlements.invalidate(user_id)
+        return 1
+
+    def stats(self) -> dict:
+        return {
+            "running": self._thread is not None,
+            "applied": self.applied,
+            "failed": self.failed,
+            "drain_errors": self.drain_errors,
+        }
+
+stripe_inbox = StripeInbox(
+    batch_size=settings.STRIPE_INBOX_BATCH,
+    poll_s=settings.STRIPE_INBOX_POLL_S,
+    max_attempts=settings.STRIPE_INBOX_MAX_ATTEMPTS,
+)
@@ -0,0 +1,72 @@
+from typing import Callable, Dict, List, Optional, Tuple
+import threading
+import time
+
+class Warmup:
+    """Aquece o worker numa thread depois do boot; o /ready só dá 200 quando todos os passos passaram.
+
+    Passo que falha (banco ainda subindo, por exemplo) tenta de novo a cada
+    `retry_s`, a partir dele mesmo. O /health continua respondendo o tempo todo.
+    """
+
+    def __init__(self, retry_s: float = 2.0):
+        self.retry_s = retry_s
+        self.steps: List[Tuple[str, Callable[[], object]]] = []
+        self.timings_ms: Dict[str, float] = {}
+        self.error: Optional[str] = None
+        self.ready_s: Optional[float] = None
+        self._done = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = 0.0
+
+    def add(self, name: str, fn: Callable[[], object]) -> None:
+        self.steps.append((name, fn))
+
+    def start(self) -> None:
+        # lifespan de novo depois de um stop (reload, testes): continua do passo que faltava
+        if self._done.is_set():
+            return
+        if self._thread is not None:
+            if self._thread.is_alive() and not self._stop.is_set():
+                return
+            self._thread.join()  # a thread parada termina o passo em que estava
+        self._started = time.perf_counter()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        i = len(self.timings_ms)
+        while i < len(self.steps) and not self._stop.is_set():
+            name, fn = self.steps[i]
+            t0 = time.perf_counter()
+            try:
+                fn()
+            except Exception as e:
+                self.error = f"{name}: {e!r}"
+                self._stop.wait(self.retry_s)
+                continue
+            self.timings_ms[name] = round((time.perf_counter() - t0) * 1000, 1)
+            self.error = None
+            i += 1
+        if i == len(self.steps):
+            self.ready_s = round(time.perf_counter() - self._started, 3)
+            self._done.set()
+
+    def wait(self, timeout: float = 0.0) -> bool:
+        return self._done.wait(timeout) if timeout > 0 else self._done.is_set()
+
+    def status(self) -> dict:
+        return {
+            "ready": self._done.is_set(),
+            "ready_s": self.ready_s,
+            "steps_ms": dict(self.timings_ms),
+            "pending": [name for name, _ in self.steps if name not in self.timings_ms],
+            "error": self.error,
+        }
+
+warmup = Warmup()
@@ -0,0 +1,87 @@
+"""Formato de resposta do /generate: o de sempre ou o compacto (negociado pelo Accept).
+
+Compacto = auditoria compartilhada uma vez só e cada bilhete como máscara de 100
+bits em hex (bit n ligado = dezena n, mesma máscara do banco), com a seed ao lado.
+O cliente remonta o formato antigo (apps/web/app/api/client.ts, `expandCompact`).
+
+    Accept: application/vnd.lotomania.compact+json
+
+Serializa com orjson quando instalado (cai no json da stdlib se não) e comprime
+com gzip quando o cliente aceita e o corpo passa de GZIP_MIN_BYTES.
+"""
+from functools import lru_cache
+from typing import List, Optional, Sequence
+import gzip
+import json
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from app.core import metrics
+from app.engine.bitmask import to_mask
+
+COMPACT_MEDIA_TYPE = "application/vnd.lotomania.compact+json"
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 5  # quase o tamanho do 9 por uma fração do tempo (bilhete em hex comprime pouco)
+
+try:
+    import orjson
+except ImportError:  # opcional: sem ele fica o json da stdlib, mesmo conteúdo
+    orjson = None
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+@lru_cache(maxsize=256)
+def _gzip_q(accept_encoding: str) -> float:
+    # q do gzip no Accept-Encoding: "x-gzip" é o mesmo, "*" vale se gzip não foi citado,
+    # "gzip;q=0" é recusa explícita (ganha do "*")
+    named = star = None
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if coding not in ("gzip", "x-gzip", "*"):
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value.strip())
+                except ValueError:
+                    q = 0.0
+        if coding == "*":
+            star = q if star is None else max(star, q)
+        else:
+            named = q if named is None else max(named, q)
+    if named is not None:
+        return named
+    return star or 0.0
+
+def accepts_gzip(request: Request) -> bool:
+    return _gzip_q(request.headers.get("accept-encoding", "")) > 0
+
+def wants_compact(request: Request) -> bool:
+    return COMPACT_MEDIA_TYPE in request.headers.get("accept", "")
+
+def mask_hex(ticket: Sequence[int]) -> str:
+    return format(to_mask(ticket), "x")
+
+def compact_bets(tickets: List[List[int]], seeds: List[int], optimizer: Optional[List[dict]] = None) -> dict:
+    # índice = posição na lista (1..n); "optimizer" só no modo otimizador e quando acabou de gerar
+    out = {"masks": [mask_hex(t) for t in tickets], "seeds": list(seeds)}
+    if optimizer:
+        out["optimizer"] = optimizer
+    return out
+
+def respond(request: Request, body: dict, compact: bool = False) -> Response:
+    """Serializa (e comprime, se couber) o corpo já montado."""
+    with metrics.stage("encode"):
+        data = dumps(body)
+        headers = {"Vary": "Accept, Accept-Encoding"}
+        if len(data) >= GZIP_MIN_BYTES and accepts_gzip(request):
+            data = gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+            headers["Content-Encoding"] = "gzip"
+    return Response(data, media_type=COMPACT_MEDIA_TYPE if compact else "application/json", headers=headers)
@@ -1,6 +1,16 @@
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+import json
+import numpy as np
+from sqlalchemy import and_, insert, or_, select, text, tuple_, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app.db import models
+from app.core.config import settings
 from app.core.security import hash_password, verify_password
+from app.engine.stats import WindowStats
+from app.engine.bitmask import from_mask, join_mask, split_mask, to_mask
+from app.engine.results import count_hits
 
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
@@ -27,3 +37,438 @@ def authenticate(db: Session, email: str, password: str):
 def has_active_subscription(db: Session, user_id: int) -> bool:
     sub = db.query(models.Subscription).filter(models.Subscription.user_id == user_id).first()
     return bool(sub and sub.active)
+
+def enqueue_stripe_event(db: Session, event_id: str, event_type: str, created: int, payload: str) -> bool:
+    """Grava o evento do webhook na inbox. False = esse id já estava lá (retry do Stripe)."""
+    row = {"id": event_id, "type": event_type, "created": created, "payload": payload}
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        res = db.execute(dialect_insert(models.StripeEvent).values(row).on_conflict_do_nothing(index_elements=["id"]))
+        db.commit()
+        return res.rowcount == 1
+
+    db.add(models.StripeEvent(**row))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return False
+    return True
+
+def pending_stripe_event_ids(db: Session, limit: int, max_attempts: int) -> List[str]:
+    # na ordem em que o Stripe criou (created tem resolução de segundo: desempata pela chegada)
+    return db.execute(
+        select(models.StripeEvent.id)
+        .where(models.StripeEvent.processed_at.is_(None), models.StripeEvent.attempts < max_attempts)
+        .order_by(models.StripeEvent.created, models.StripeEvent.received_at)
+        .limit(limit)
+    ).scalars().all()
+
+def claim_stripe_event(db: Session, event_id: str) -> Optional[models.StripeEvent]:
+    # trava o evento até o commit; no Postgres outro worker drenando junto pula (SKIP LOCKED) e recebe None
+    return db.execute(
+        select(models.StripeEvent)
+        .where(models.StripeEvent.id == event_id, models.StripeEvent.processed_at.is_(None))
+        .with_for_update(skip_locked=True)
+    ).scalar_one_or_none()
+
+def apply_stripe_subscription(db: Session, obj: dict, created: int) -> Optional[int]:
+    """Copia o objeto subscription do evento pra assinatura do cliente. Devolve o user_id se aplicou.
+
+    Idempotente: reaplicar o mesmo evento grava os mesmos valores, e evento mais
+    velho que o último aplicado (entrega fora de ordem) é ignorado.
+    """
+    sub = db.query(models.Subscription).filter(models.Subscription.stripe_customer_id == obj["customer"]).first()
+    if sub is None or created < (sub.stripe_event_at or 0):
+        return None
+    sub.stripe_subscription_id = obj["id"]
+    sub.active = obj["status"] in ("active", "trialing")
+    sub.current_period_end = datetime.utcfromtimestamp(obj["current_period_end"]).isoformat()
+    sub.stripe_event_at = created
+    return sub.user_id
+
+def upsert_draws(db: Session, draws: List[tuple]):
+    """Upsert de um bloco de concursos (concurso, data, csv, máscara) num INSERT só.
+
+    Postgres/SQLite: INSERT ... ON CONFLICT (contest) DO UPDATE. Outros bancos: linha a linha.
+    Devolve (inseridos, atualizados, concursos novos ou com dezenas alteradas).
+    """
+    # o mesmo concurso duas vezes no bloco quebra o ON CONFLICT: fica o último
+    by_contest = {d[0]: d for d in draws}
+    existing = dict(
+        db.query(models.Draw.contest, models.Draw.numbers_csv)
+        .filter(models.Draw.contest.in_(list(by_contest)))
+        .all()
+    )
+    changed = [c for c, d in by_contest.items() if existing.get(c) != d[2]]
+
+    rows = []
+    for contest, date_br, nums_csv, mask in by_contest.values():
+        lo, hi = split_mask(mask)
+        rows.append({
+            "lottery": "lotomania", "contest": contest, "date_br": date_br,
+            "numbers_csv": nums_csv, "mask_lo": lo, "mask_hi": hi,
+        })
+
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(models.Draw).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[models.Draw.contest],
+            set_={
+                "date_br": stmt.excluded.date_br,
+                "numbers_csv": stmt.excluded.numbers_csv,
+                "mask_lo": stmt.excluded.mask_lo,
+                "mask_hi": stmt.excluded.mask_hi,
+            },
+        )
+        db.execute(stmt)
+    else:
+        for r in rows:
+            row = db.query(models.Draw).filter(models.Draw.contest == r["contest"]).first()
+            if row:
+                for k, v in r.items():
+                    setattr(row, k, v)
+            else:
+                db.add(models.Draw(**r))
+        db.flush()
+
+    updated = sum(1 for c in by_contest if c in existing)
+    return len(by_contest) - updated, updated, changed
+
+def _draw_history(db: Session, limit: int, after: Optional[int] = None):
+    # (concurso, dezenas) dos últimos `limit` concursos (só os > after, se vier), em ordem crescente
+    q = (
+        db.query(models.Draw.contest, models.Draw.mask_lo, models.Draw.mask_hi)
+        .filter(models.Draw.lottery == "lotomania", models.Draw.mask_lo.isnot(None))
+    )
+    if after is not None:
+        q = q.filter(models.Draw.contest > after)
+    rows = q.order_by(models.Draw.contest.desc()).limit(limit).all()
+    return [(contest, from_mask(join_mask(lo, hi))) for contest, lo, hi in reversed(rows)]
+
+def rebuild_public_stats(db: Session) -> Optional[int]:
+    # regrava a estatística pública (app/engine/public_stats.py); devolve o concurso mais recente
+    # (None = sem concursos ou desligado)
+    from app.engine.public_stats import build_public_stats, write_public_stats
+
+    if not settings.PUBLIC_STATS_PATH or not settings.PUBLIC_STATS_WINDOWS:
+        return None
+    rows = (
+        db.query(models.Draw.contest, models.Draw.date_br, models.Draw.mask_lo, models.Draw.mask_hi)
+        .filter(models.Draw.lottery == "lotomania", models.Draw.mask_lo.isnot(None))
+        .order_by(models.Draw.contest.desc())
+        .limit(max(settings.PUBLIC_STATS_WINDOWS))
+        .all()
+    )
+    if not rows:
+        return None
+    masks = [join_mask(lo, hi) for _, _, lo, hi in rows]
+    write_public_stats(
+        settings.PUBLIC_STATS_PATH,
+        build_public_stats(rows[0].contest, rows[0].date_br or "", masks, settings.PUBLIC_STATS_WINDOWS),
+    )
+    return rows[0].contest
+
+def get_draw_history(db: Session):
+    # histórico inteiro (concurso, dezenas) em ordem crescente, pro backtest
+    return _draw_history(db, limit=None)
+
+def get_data_version(db: Session, name: str) -> int:
+    return db.query(models.DataVersion.version).filter(models.DataVersion.name == name).scalar() or 0
+
+def bump_data_version(db: Session, name: str) -> None:
+    # vai no mesmo commit do que mudou
+    bumped = db.execute(
+        update(models.DataVersion)
+        .where(models.DataVersion.name == name)
+        .values(version=models.DataVersion.version + 1, updated_at=datetime.utcnow())
+    ).rowcount
+    if not bumped:
+        db.add(models.DataVersion(name=name, version=1))
+        db.flush()
+
+def rebuild_draw_snapshot(db: Session) -> Optional[int]:
+    # regrava o snapshot mapeado do histórico (app/engine/snapshot.py); devolve a versão gravada
+    from app.engine.snapshot import write_snapshot
+
+    if not settings.DRAW_SNAPSHOT_PATH:
+        return None
+    # versão lida antes das linhas: import que commitar no meio deixa o arquivo com versão
+    # velha (e é regravado na próxima conferência), nunca o contrário
+    version = get_data_version(db, "draws")
+    rows = (
+        db.query(models.Draw.contest, models.Draw.mask_lo, models.Draw.mask_hi)
+        .filter(models.Draw.lottery == "lotomania", models.Draw.mask_lo.isnot(None))
+        .all()
+    )
+    write_snapshot(settings.DRAW_SNAPSHOT_PATH, [tuple(r) for r in rows], version)
+    return version
+
+def get_window_stats(db: Session, window: int) -> Optional[WindowStats]:
+    row = db.get(models.WindowStatsRow, window)
+    return WindowStats.from_bytes(row.payload) if row else None
+
+def refresh_window_stats(db: Session, changed_contests: Iterable[int]) -> None:
+    """Atualiza as estatísticas de cada janela depois de um import.
+
+    Se só entraram concursos mais novos que o topo da janela, soma os novos e
+    tira os que caíram; se mexeu em concurso antigo (correção/backfill), reconstrói.
+    """
+    changed = sorted(set(changed_contests))
+    if not changed:
+        return
+
+    for window in settings.STATS_WINDOWS:
+        row = db.get(models.WindowStatsRow, window)
+        stats = WindowStats.from_bytes(row.payload) if row else None
+
+        if stats is not None and stats.head_contest is not None and changed[0] > stats.head_contest:
+            for contest, numbers in _draw_history(db, window, after=stats.head_contest):
+                stats.push(contest, numbers)
+        else:
+            stats = WindowStats.build(window, _draw_history(db, window))
+
+        if stats.head_contest is None:
+            continue
+        if row is None:
+            row = models.WindowStatsRow(window=window)
+            db.add(row)
+        row.head_contest = stats.head_contest
+        row.payload = stats.to_bytes()
+
+    db.commit()
+
+def create_session(
+    db: Session,
+    user_id: int,
+    requested_count: int,
+    shared_audit: dict,
+    fingerprint: Optional[str] = None,
+):
+    # sessão guarda a auditoria compartilhada; cada aposta só leva índice, seed e máscara
+    sess = models.GenerationSession(
+        user_id=user_id,
+        lottery="lotomania",
+        requested_count=requested_count,
+        base_draw_id=str(shared_audit["base_draw_id"]),
+        window_size=int(shared_audit["window"]),
+        target_contest=int(shared_audit["base_draw_id"]) + 1,
+        audit_json=json.dumps(shared_audit, ensure_ascii=False),
+        request_fingerprint=fingerprint,
+    )
+    db.add(sess)
+    db.flush()
+    return sess
+
+def add_bets(db: Session, session_id: int, first_index: int, tickets: List[List[int]], seeds: List[int]) -> None:
+    rows = []
+    for i, (ticket, seed) in enumerate(zip(tickets, seeds), start=first_index):
+        lo, hi = split_mask(to_mask(ticket))
+        rows.append({"session_id": session_id, "index": i, "seed": seed, "mask_lo": lo, "mask_hi": hi})
+    if rows:
+        db.execute(insert(models.Bet), rows)
+
+def save_generation(
+    db: Session,
+    user_id: int,
+    requested_count: int,
+    shared_audit: dict,
+    tickets: List[List[int]],
+    seeds: List[int],
+    fingerprint: Optional[str] = None,
+):
+    sess = create_session(db, user_id, requested_count, shared_audit, fingerprint)
+    add_bets(db, sess.id, 1, tickets, seeds)
+    db.commit()
+    return sess
+
+def get_session_by_fingerprint(db: Session, user_id: int, fingerprint: str):
+    return (
+        db.query(models.GenerationSession)
+        .filter(
+            models.GenerationSession.request_fingerprint == fingerprint,
+            models.GenerationSession.user_id == user_id,
+        )
+        .first()
+    )
+
+def get_session_bets(db: Session, session_id: int):
+    # (índice, seed, dezenas) das apostas da sessão, em ordem
+    rows = (
+        db.query(models.Bet.index, models.Bet.seed, models.Bet.mask_lo, models.Bet.mask_hi)
+        .filter(models.Bet.session_id == session_id)
+        .order_by(models.Bet.index)
+        .all()
+    )
+    return [(index, seed, from_mask(join_mask(lo, hi))) for index, seed, lo, hi in rows]
+
+# Postgres 14+: conferência inteira num UPDATE (bit_count em bit(64)), sem trazer aposta pro Python
+_PG_CHECK_SQL = text("""
+    UPDATE bets SET hits = bit_count((bets.mask_lo & :lo)::bit(64)) + bit_count((bets.mask_hi & :hi)::bit(64))
+    FROM sessions
+    WHERE bets.session_id = sessions.id AND sessions.target_contest = :contest
+""")
+
+def check_results(db: Session, contests: Iterable[int]) -> Dict[int, int]:
+    """Grava bets.hits das apostas feitas para esses concursos (que já estejam no banco).
+
+    Postgres: um UPDATE por concurso. Outros bancos: lotes de RESULTS_BATCH_SIZE por id
+    (só id e máscaras, popcount no numpy). Devolve {concurso: apostas conferidas}.
+    """
+    out: Dict[int, int] = {}
+    for contest in sorted(set(contests)):
+        draw = (
+            db.query(models.Draw.mask_lo, models.Draw.mask_hi)
+            .filter(models.Draw.lottery == "lotomania", models.Draw.contest == contest)
+            .first()
+        )
+        if draw is None or draw.mask_lo is None:
+            continue
+        if db.get_bind().dialect.name == "postgresql":
+            res = db.execute(_PG_CHECK_SQL, {"lo": draw.mask_lo, "hi": draw.mask_hi, "contest": contest})
+            out[contest] = res.rowcount
+        else:
+            out[contest] = _check_results_batched(db, contest, join_mask(draw.mask_lo, draw.mask_hi))
+    db.commit()
+    return out
+
+_PARAM_MARK = {"qmark": "?", "format": "%s", "pyformat": "%s"}
+
+def _check_results_batched(db: Session, contest: int, draw_mask: int) -> int:
+    checked = 0
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(models.Bet.id, models.Bet.mask_lo, models.Bet.mask_hi)
+            .join(models.GenerationSession, models.Bet.session_id == models.GenerationSession.id)
+            .where(models.GenerationSession.target_contest == contest, models.Bet.id > last_id)
+            .order_by(models.Bet.id)
+            .limit(settings.RESULTS_BATCH_SIZE)
+        ).tuples().all()
+        if not rows:
+            return checked
+        ids, lo, hi = zip(*rows)
+        hits = count_hits(np.fromiter(lo, np.int64, len(lo)), np.fromiter(hi, np.int64, len(hi)), draw_mask)
+        # executemany direto no driver: montar params pelo SQLAlchemy custava mais que o UPDATE
+        conn = db.connection()
+        mark = _PARAM_MARK.get(conn.dialect.paramstyle)
+        if mark:
+            conn.exec_driver_sql(f"UPDATE bets SET hits = {mark} WHERE id = {mark}", list(zip(hits.tolist(), ids)))
+        else:
+            db.execute(text("UPDATE bets SET hits = :hits WHERE id = :id"), [{"hits": h, "id": i} for i, h in zip(ids, hits.tolist())])
+        checked += len(rows)
+        last_id = ids[-1]
+
+def get_user_results(
+    db: Session,
+    user_id: int,
+    contest: Optional[int],
+    limit: int,
+    after: Optional[tuple] = None,
+    offset: int = 0,
+    with_total: bool = False,
+):
+    """Apostas já conferidas do usuário, concurso mais recente primeiro: (total, linhas, próximo).
+
+    Paginação por keyset: `after` = (concurso, sessão, índice) da última linha da página
+    anterior, e `próximo` é esse cursor pra página seguinte (None no fim). `offset` só
+    sobra pro ?page= antigo. O COUNT varre tudo do usuário, então `total` é None se não
+    pedirem `with_total`.
+    """
+    S, B = models.GenerationSession, models.Bet
+    q = (
+        db.query(S.id, S.target_contest, B.index, B.mask_lo, B.mask_hi, B.hits)
+        .join(B, B.session_id == S.id)
+        .filter(S.user_id == user_id, B.hits.isnot(None))
+    )
+    if contest is not None:
+        q = q.filter(S.target_contest == contest)
+    total = q.count() if with_total else None
+    if after is not None:
+        # mesma ordem do ORDER BY: concurso desc, sessão desc, índice asc
+        a_contest, a_session, a_index = after
+        q = q.filter(or_(
+            S.target_contest < a_contest,
+            and_(S.target_contest == a_contest, S.id < a_session),
+            and_(S.target_contest == a_contest, S.id == a_session, B.index > a_index),
+        ))
+    rows = q.order_by(S.target_contest.desc(), S.id.desc(), B.index).offset(offset).limit(limit + 1).all()
+    cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        cursor = (rows[-1][1], rows[-1][0], rows[-1][2])
+    return total, [
+        (session_id, target, index, from_mask(join_mask(lo, hi)), hits)
+        for session_id, target, index, lo, hi, hits in rows
+    ], cursor
+
+
+def _keyset_pages(db: Session, query, key_cols, page_size: int) -> Iterator:
+    # export em páginas por keyset: cada página é uma query curta com LIMIT (sem OFFSET e sem
+    # transação aberta o export inteiro); dentro dela as linhas vêm em lotes (yield_per =
+    # cursor do lado do servidor no Postgres). Memória = um lote, qualquer que seja o total.
+    key = None
+    while True:
+        q = query if key is None else query.where(tuple_(*key_cols) > key)
+        q = q.order_by(*key_cols).limit(page_size).execution_options(
+            stream_results=True, yield_per=min(page_size, settings.EXPORT_FETCH_SIZE)
+        )
+        n = 0
+        for row in db.execute(q):
+            n += 1
+            key = tuple(row[-len(key_cols):])
+            yield row
+        db.rollback()  # só leitura: solta o snapshot/conexão entre páginas
+        if n < page_size:
+            return
+
+def iter_user_bets_export(db: Session, user_id: int, sessions_per_page: int) -> Iterator[tuple]:
+    """Todas as apostas do usuário em ordem (sessão mais antiga primeiro), em memória constante.
+
+    Linhas: (session_id, created_at, lottery, base_draw_id, target_contest, index, seed, máscara, hits).
+    Keyset nas sessões por (created_at, id) dentro do user_id (ix_sessions_user_created); as
+    apostas de cada página de sessões vêm numa query só (ix_bets_session_id), em lotes.
+    """
+    S, B = models.GenerationSession, models.Bet
+    key = None
+    while True:
+        q = select(S.created_at, S.id).where(S.user_id == user_id)
+        if key is not None:
+            q = q.where(tuple_(S.created_at, S.id) > key)
+        page = db.execute(q.order_by(S.created_at, S.id).limit(sessions_per_page)).all()
+        if not page:
+            return
+        key = tuple(page[-1])
+
+        bets = (
+            select(
+                S.id, S.created_at, S.lottery, S.base_draw_id, S.target_contest,
+                B.index, B.seed, B.mask_lo, B.mask_hi, B.hits,
+            )
+            .join(B, B.session_id == S.id)
+            .where(S.id.in_([session_id for _, session_id in page]))
+            .order_by(S.created_at, S.id, B.index)
+            .execution_options(stream_results=True, yield_per=settings.EXPORT_FETCH_SIZE)
+        )
+        for session_id, created_at, lottery, base, target, index, seed, lo, hi, hits in db.execute(bets):
+            yield session_id, created_at, lottery, base, target, index, seed, join_mask(lo, hi), hits
+        db.rollback()  # só leitura: solta o snapshot/conexão entre páginas
+        if len(page) < sessions_per_page:
+            return
+
+def iter_draws_export(db: Session, page_size: int, lottery: str = "lotomania") -> Iterator[tuple]:
+    # (concurso, data, máscara das dezenas) em ordem crescente de concurso; keyset no índice único de draws.contest
+    D = models.Draw
+    query = select(D.date_br, D.numbers_csv, D.mask_lo, D.mask_hi, D.contest).where(D.lottery == lottery)
+    for date_br, csv, lo, hi, contest in _keyset_pages(db, query, (D.contest,), page_size):
+        mask = join_mask(lo, hi) if lo is not None else to_mask(int(x) for x in csv.split(",") if x)
+        yield contest, date_br, mask
@@ -0,0 +1,217 @@
+"""Migrações simples e idempotentes (o create_all só cria tabela nova, não coluna).
+
+Rodam uma vez por release, antes de os workers subirem (release do Procfile / serviço
+`migrate` do compose), não no boot:
+
+    python -m app.db.migrations              # colunas/índices novos + backfill em lotes
+    python -m app.db.migrations --contract   # depois de conferido: apaga as colunas antigas
+
+Cada passo confere o estado do banco antes de mexer, então rodar de novo não faz nada;
+no Postgres um advisory lock impede duas execuções ao mesmo tempo. O que não tem volta
+(DROP COLUMN) fica fora do fluxo normal, em CONTRACT_STEPS, e só roda com --contract,
+que antes confere que nenhuma linha ficou sem backfill.
+
+SQLite não tira NOT NULL de coluna: num banco de dev anterior à normalização das apostas,
+rode o --contract logo depois da migração (as colunas antigas barram INSERT de aposta nova).
+"""
+from contextlib import contextmanager
+import json
+import sys
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine, Connection
+
+from app.core.config import settings
+from app.engine.bitmask import split_mask, to_mask
+
+LOCK_KEY = 0x6C6F746F  # pg_advisory_lock das migrações
+
+def _columns(conn: Connection, table: str) -> set:
+    return {c["name"] for c in inspect(conn).get_columns(table)}
+
+def _add_column(conn: Connection, table: str, name: str, ddl: str) -> None:
+    if name not in _columns(conn, table):
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+
+def _mask_of(csv: str):
+    return split_mask(to_mask(int(x) for x in (csv or "").split(",") if x != ""))
+
+def _batches(engine: Engine, sql: str, batch_size: int):
+    # keyset por id, uma transação por lote: tabela grande não vira uma transação só
+    # nem vem inteira pra memória. `sql` filtra por id > :after e devolve o id primeiro
+    after = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(text(sql), {"after": after, "n": batch_size}).all()
+            if not rows:
+                return
+            yield conn, rows
+        after = rows[-1][0]
+
+def draw_masks(conn: Connection) -> None:
+    # draws.numbers_csv -> draws.mask_lo/mask_hi (preenchidas no backfill_draw_masks)
+    _add_column(conn, "draws", "mask_lo", "BIGINT")
+    _add_column(conn, "draws", "mask_hi", "BIGINT")
+
+def bet_normalization(conn: Connection) -> None:
+    # bets.audit_json repetido por bilhete -> sessions.audit_json (uma vez) + bets.seed;
+    # bets.numbers_csv -> bets.mask_lo/mask_hi (preenchidas no backfill_bets)
+    _add_column(conn, "sessions", "base_draw_id", "VARCHAR(20) DEFAULT ''")
+    _add_column(conn, "sessions", "window_size", "INTEGER DEFAULT 0")
+    _add_column(conn, "sessions", "audit_json", "TEXT DEFAULT ''")
+    _add_column(conn, "bets", "seed", "BIGINT")
+    _add_column(conn, "bets", "mask_lo", "BIGINT")
+    _add_column(conn, "bets", "mask_hi", "BIGINT")
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_bets_session_id ON bets (session_id)"))
+
+    # código novo não grava as colunas antigas: elas ficam até o --contract, mas aceitando NULL
+    if conn.dialect.name == "postgresql":
+        cols = _columns(conn, "bets")
+        for legacy in ("numbers_csv", "audit_json"):
+            if legacy in cols:
+                conn.execute(text(f"ALTER TABLE bets ALTER COLUMN {legacy} DROP NOT NULL"))
+
+def backfill_draw_masks(engine: Engine, batch_size: int) -> None:
+    sql = "SELECT id, numbers_csv FROM draws WHERE mask_lo IS NULL AND id > :after ORDER BY id LIMIT :n"
+    for conn, rows in _batches(engine, sql, batch_size):
+        params = []
+        for draw_id, csv in rows:
+            lo, hi = _mask_of(csv)
+            params.append({"id": draw_id, "lo": lo, "hi": hi})
+        conn.execute(text("UPDATE draws SET mask_lo = :lo, mask_hi = :hi WHERE id = :id"), params)
+
+def backfill_bets(engine: Engine, batch_size: int) -> None:
+    with engine.connect() as conn:
+        if "numbers_csv" not in _columns(conn, "bets"):
+            return
+
+    sql = (
+        "SELECT id, session_id, numbers_csv, audit_json FROM bets "
+        "WHERE mask_lo IS NULL AND id > :after ORDER BY id LIMIT :n"
+    )
+    for conn, rows in _batches(engine, sql, batch_size):
+        bet_params, sess_params, seen = [], [], set()
+        for bet_id, session_id, csv, audit_raw in rows:
+            audit = json.loads(audit_raw or "{}")
+            lo, hi = _mask_of(csv)
+            bet_params.append({"id": bet_id, "seed": int(audit.get("seed", 0)), "lo": lo, "hi": hi})
+            if session_id not in seen:
+                # a parte compartilhada é igual em todos os bilhetes da sessão: qualquer um serve
+                seen.add(session_id)
+                shared = {k: v for k, v in audit.items() if k not in ("ticket_index", "seed")}
+                sess_params.append({
+                    "id": session_id,
+                    "base": str(shared.get("base_draw_id", "")),
+                    "window": int(shared.get("window", 0)),
+                    "audit": json.dumps(shared, ensure_ascii=False),
+                })
+        conn.execute(text("UPDATE bets SET seed = :seed, mask_lo = :lo, mask_hi = :hi WHERE id = :id"), bet_params)
+        conn.execute(
+            text(
+                "UPDATE sessions SET base_draw_id = :base, window_size = :window, audit_json = :audit "
+                "WHERE id = :id AND (audit_json IS NULL OR audit_json = '')"
+            ),
+            sess_params,
+        )
+
+def backfill_target_contest(engine: Engine, batch_size: int) -> None:
+    # depois do backfill_bets: sessão antiga só tem base_draw_id depois dele
+    sql = (
+        "SELECT id, base_draw_id FROM sessions "
+        "WHERE target_contest IS NULL AND base_draw_id <> '' AND id > :after ORDER BY id LIMIT :n"
+    )
+    for conn, rows in _batches(engine, sql, batch_size):
+        conn.execute(
+            text("UPDATE sessions SET target_contest = :target WHERE id = :id"),
+            [{"id": sess_id, "target": int(base) + 1} for sess_id, base in rows],
+        )
+
+def drop_legacy_bet_columns(conn: Connection) -> None:
+    # irreversível: só com --contract, depois que o backfill foi conferido
+    cols = _columns(conn, "bets")
+    if not {"numbers_csv", "audit_json"} & cols:
+        return
+    pending = conn.execute(text("SELECT COUNT(*) FROM bets WHERE mask_lo IS NULL OR seed IS NULL")).scalar()
+    if pending:
+        raise RuntimeError(f"{pending} apostas ainda sem backfill; rode as migrações antes do --contract.")
+    for legacy in ("numbers_csv", "audit_json"):
+        if legacy in cols:
+            conn.execute(text(f"ALTER TABLE bets DROP COLUMN {legacy}"))
+
+def session_fingerprint(conn: Connection) -> None:
+    # geração idempotente: uma sessão por fingerprint de request
+    _add_column(conn, "sessions", "request_fingerprint", "VARCHAR(64)")
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_sessions_request_fingerprint ON sessions (request_fingerprint)"
+    ))
+
+def bet_hits(conn: Connection) -> None:
+    # conferência: sessão aponta pro concurso em que aposta, aposta guarda os acertos
+    _add_column(conn, "sessions", "target_contest", "INTEGER")
+    _add_column(conn, "bets", "hits", "SMALLINT")
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_sessions_target_contest ON sessions (target_contest)"))
+
+def stripe_inbox(conn: Connection) -> None:
+    # webhook com inbox (tabela stripe_events vem do create_all): ordem dos eventos por assinatura
+    _add_column(conn, "subscriptions", "stripe_event_at", "BIGINT DEFAULT 0")
+
+def export_indexes(conn: Connection) -> None:
+    # export das apostas do usuário: keyset em (user_id, created_at) sem varrer a tabela
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_sessions_user_created ON sessions (user_id, created_at)"))
+
+def results_index(conn: Connection) -> None:
+    # /results: keyset em (concurso desc, sessão desc) dentro do user_id
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_sessions_user_target ON sessions (user_id, target_contest, id)"))
+
+STEPS = [
+    draw_masks,
+    bet_normalization,
+    session_fingerprint,
+    bet_hits,
+    stripe_inbox,
+    export_indexes,
+    results_index,
+]
+
+# (engine, tamanho do lote): rodam depois dos STEPS, um commit por lote
+BACKFILLS = [
+    backfill_draw_masks,
+    backfill_bets,
+    backfill_target_contest,
+]
+
+CONTRACT_STEPS = [
+    drop_legacy_bet_columns,
+]
+
+@contextmanager
+def _migration_lock(engine: Engine):
+    # dois releases (ou um worker com DB_AUTO_MIGRATE) ao mesmo tempo: o segundo espera
+    if engine.dialect.name != "postgresql":
+        yield
+        return
+    with engine.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": LOCK_KEY})
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": LOCK_KEY})
+
+def run_migrations(engine: Engine, contract: bool = False) -> None:
+    with _migration_lock(engine):
+        for step in STEPS:
+            with engine.begin() as conn:
+                step(conn)
+        for backfill in BACKFILLS:
+            backfill(engine, settings.MIGRATION_BATCH_SIZE)
+        if contract:
+            for step in CONTRACT_STEPS:
+                with engine.begin() as conn:
+                    step(conn)
+
+if __name__ == "__main__":
+    from app.db.session import engine, Base
+    from app.db import models  # noqa: F401  (registra as tabelas)
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine, contract="--contract" in sys.argv[1:])
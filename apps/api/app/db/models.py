@@ -1,4 +1,5 @@
-from sqlalchemy import String, Integer, DateTime, Boolean, ForeignKey, Text
+from typing import Optional
+from sqlalchemy import String, Integer, SmallInteger, BigInteger, DateTime, Boolean, ForeignKey, Text, LargeBinary, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
 from app.db.session import Base
@@ -21,24 +22,40 @@ class Subscription(Base):
     stripe_customer_id: Mapped[str] = mapped_column(String(255), default="")
     stripe_subscription_id: Mapped[str] = mapped_column(String(255), default="")
     current_period_end: Mapped[str] = mapped_column(String(50), default="")  # ISO string
+    # created do último evento do Stripe aplicado (evento mais velho chegando atrasado é ignorado)
+    stripe_event_at: Mapped[int] = mapped_column(BigInteger, default=0)
 
     user: Mapped["User"] = relationship(back_populates="subscription")
 
 class GenerationSession(Base):
     __tablename__ = "sessions"
+    # export/histórico do usuário: keyset em (created_at, id) dentro do user_id; /results em (target_contest, id)
+    __table_args__ = (
+        Index("ix_sessions_user_created", "user_id", "created_at"),
+        Index("ix_sessions_user_target", "user_id", "target_contest", "id"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id"))
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     lottery: Mapped[str] = mapped_column(String(50))  # "lotomania"
     requested_count: Mapped[int] = mapped_column(Integer)
+    base_draw_id: Mapped[str] = mapped_column(String(20), default="")
+    window_size: Mapped[int] = mapped_column(Integer, default=0)
+    target_contest: Mapped[Optional[int]] = mapped_column(Integer, nullable=True, index=True)  # concurso apostado (base + 1)
+    audit_json: Mapped[str] = mapped_column(Text, default="")  # auditoria compartilhada (JSON), uma vez por sessão
+    # sha256 das entradas determinísticas (user, concurso base, count, janela, pesos); NULL = force_new
+    request_fingerprint: Mapped[Optional[str]] = mapped_column(String(64), nullable=True, unique=True, index=True)
 
 class Bet(Base):
     __tablename__ = "bets"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    session_id: Mapped[int] = mapped_column(ForeignKey("sessions.id"))
+    session_id: Mapped[int] = mapped_column(ForeignKey("sessions.id"), index=True)
     index: Mapped[int] = mapped_column(Integer)  # 1..N
-    numbers_csv: Mapped[str] = mapped_column(String(400))  # "00,01,..."
-    audit_json: Mapped[str] = mapped_column(Text)  # JSON string
+    seed: Mapped[int] = mapped_column(BigInteger)  # _stable_seed do bilhete (resto da auditoria fica na sessão)
+    # dezenas como máscara de 100 bits, mesmo esquema do Draw
+    mask_lo: Mapped[int] = mapped_column(BigInteger)
+    mask_hi: Mapped[int] = mapped_column(BigInteger)
+    hits: Mapped[Optional[int]] = mapped_column(SmallInteger, nullable=True)  # acertos no target_contest (NULL = não conferida)
 
 class Draw(Base):
     __tablename__ = "draws"
@@ -47,3 +64,34 @@ class Draw(Base):
     contest: Mapped[int] = mapped_column(Integer, index=True, unique=True)
     date_br: Mapped[str] = mapped_column(String(20), default="")  # "09/01/2026"
     numbers_csv: Mapped[str] = mapped_column(String(300))  # "02,03,..."
+    # máscara de 100 bits (app/engine/bitmask.py): lo = dezenas 00..49, hi = 50..99
+    mask_lo: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    mask_hi: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+
+class WindowStatsRow(Base):
+    # estatísticas incrementais da janela (ver app/engine/stats.py), uma linha por tamanho de janela
+    __tablename__ = "window_stats"
+    window: Mapped[int] = mapped_column(Integer, primary_key=True)
+    head_contest: Mapped[int] = mapped_column(Integer)
+    payload: Mapped[bytes] = mapped_column(LargeBinary)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class StripeEvent(Base):
+    # inbox do webhook: evento cru gravado na chegada (id do Stripe = dedup), aplicado depois pelo drainer
+    __tablename__ = "stripe_events"
+    id: Mapped[str] = mapped_column(String(255), primary_key=True)  # evt_...
+    type: Mapped[str] = mapped_column(String(100))
+    created: Mapped[int] = mapped_column(BigInteger, default=0)  # epoch do evento no Stripe
+    payload: Mapped[str] = mapped_column(Text)
+    received_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    processed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True, index=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    last_error: Mapped[str] = mapped_column(Text, default="")
+
+class DataVersion(Base):
+    # contador por conjunto de dados ("draws" sobe a cada import que muda concurso), no mesmo
+    # commit da mudança: cache em arquivo (snapshot) compara com ele pra saber se ficou velho
+    __tablename__ = "data_versions"
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,98 @@
+from typing import List, Optional, Tuple
+import time
+
+import numpy as np
+
+from app.engine.bitmask import to_mask
+from app.engine.lotomania import LotomaniaConfig, assemble_tickets, build_ranking_from_stats
+from app.engine.results import PRIZE_HITS
+from app.engine.stats import WindowStats
+
+# Backtest: para cada concurso histórico, gera os bilhetes que o /generate teria
+# gerado na véspera (janela = os `window` concursos anteriores, base = concurso
+# anterior) e conta os acertos. A janela desliza com WindowStats.push (soma o
+# novo, tira o que saiu) em vez de recalcular tudo a cada concurso, e faixas de
+# concursos rodam como jobs separados no executor do backtest.
+
+RANDOM_MEAN_HITS = 50 * 20 / 100  # média de acertos de um bilhete aleatório de 50
+
+def _backtest_shard(
+    history: List[Tuple[int, List[int]]],
+    cfg: LotomaniaConfig,
+    user_id: int,
+) -> dict:
+    # history[:cfg.window] só aquece a janela; os alvos são history[cfg.window:]
+    window = cfg.window
+    stats = WindowStats.build(window, history[:window])
+    hits_hist = np.zeros(21, dtype=np.int64)
+    best_hist = np.zeros(21, dtype=np.int64)
+
+    for contest, numbers in history[window:]:
+        ranking = build_ranking_from_stats(stats, cfg)
+        tickets, _ = assemble_tickets(user_id, str(stats.head_contest), ranking, cfg)
+        drawn = to_mask(numbers)
+        hits = [(to_mask(t) & drawn).bit_count() for t in tickets]
+        np.add.at(hits_hist, hits, 1)
+        best_hist[max(hits)] += 1
+        stats.push(contest, numbers)
+
+    return {"hits": hits_hist, "best": best_hist}
+
+def run_backtest(
+    history: List[Tuple[int, List[int]]],
+    cfg: LotomaniaConfig,
+    user_id: int = 0,
+    start_contest: Optional[int] = None,
+    end_contest: Optional[int] = None,
+    executor=None,
+) -> dict:
+    """Replay do histórico (concurso, dezenas) em ordem crescente com a configuração `cfg`.
+
+    Só entram concursos com `cfg.window` concursos antes deles. Os bilhetes são os
+    mesmos do generate (mesmo ranking, mesmas seeds de `user_id`). Com `executor`
+    (EngineExecutor) as faixas rodam nos workers dele, e EngineBusy/EngineTimeout
+    sobem pro chamador; sem, roda inline.
+    """
+    t0 = time.perf_counter()
+    window = cfg.window
+    targets = [
+        i for i in range(window, len(history))
+        if (start_contest is None or history[i][0] >= start_contest)
+        and (end_contest is None or history[i][0] <= end_contest)
+    ]
+    if not targets:
+        raise ValueError("Nenhum concurso com janela completa nesse intervalo.")
+    lo, hi = targets[0], targets[-1] + 1
+
+    # faixas contíguas; cada uma aquece a própria janela
+    workers = executor.workers if executor is not None else 0
+    shards = max(1, min(workers, hi - lo))
+    bounds = np.linspace(lo, hi, shards + 1).astype(int)
+    parts = [history[a - window:b] for a, b in zip(bounds[:-1], bounds[1:])]
+
+    if executor is None:
+        results = [_backtest_shard(p, cfg, user_id) for p in parts]
+    else:
+        # sem orçamento parcial: ou todas as faixas terminam ou estoura o timeout do executor
+        results = executor.run_many(_backtest_shard, [(p, cfg, user_id) for p in parts], float("inf"))
+
+    hits = sum(r["hits"] for r in results)
+    best = sum(r["best"] for r in results)
+    n_tickets = int(hits.sum())
+    return {
+        "window": window,
+        "count": cfg.count,
+        "user_id": user_id,
+        "contests": hi - lo,
+        "first_contest": history[lo][0],
+        "last_contest": history[hi - 1][0],
+        "tickets": n_tickets,
+        "mean_hits": round(float((hits * np.arange(21)).sum() / n_tickets), 4),
+        "random_mean_hits": RANDOM_MEAN_HITS,
+        "mean_best_hits": round(float((best * np.arange(21)).sum() / (hi - lo)), 4),
+        "hits_histogram": hits.tolist(),       # posição = acertos, valor = bilhetes
+        "best_hits_histogram": best.tolist(),  # melhor bilhete de cada concurso
+        "prize_tickets": {str(k): int(hits[k]) for k in PRIZE_HITS},
+        "shards": shards,
+        "elapsed_s": round(time.perf_counter() - t0, 3),
+    }
@@ -0,0 +1,43 @@
+from typing import Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+# Um concurso/bilhete = inteiro de 100 bits (bit n ligado = dezena n).
+# No banco vai em duas BIGINT com sinal: lo = dezenas 00..49, hi = dezenas 50..99
+# (50 bits cada, então nunca encosta no bit de sinal).
+
+HALF = 50
+HALF_MASK = (1 << HALF) - 1
+
+_BITS = np.arange(HALF, dtype=np.int64)
+
+def to_mask(numbers: Iterable[int]) -> int:
+    mask = 0
+    for n in numbers:
+        mask |= 1 << n
+    return mask
+
+def from_mask(mask: int) -> List[int]:
+    out = []
+    while mask:
+        low = mask & -mask
+        out.append(low.bit_length() - 1)
+        mask ^= low
+    return out
+
+def split_mask(mask: int) -> Tuple[int, int]:
+    return mask & HALF_MASK, mask >> HALF
+
+def join_mask(lo: int, hi: int) -> int:
+    return lo | (hi << HALF)
+
+def overlap(a: int, b: int) -> int:
+    return (a & b).bit_count()
+
+def masks_to_matrix(masks: Sequence[int]) -> np.ndarray:
+    # (n × 100) uint8, mesma matriz de ocorrência do motor, sem passar por string/lista
+    lo = np.fromiter((m & HALF_MASK for m in masks), dtype=np.int64, count=len(masks))
+    hi = np.fromiter((m >> HALF for m in masks), dtype=np.int64, count=len(masks))
+    return np.concatenate(
+        [(lo[:, None] >> _BITS) & 1, (hi[:, None] >> _BITS) & 1], axis=1
+    ).astype(np.uint8)
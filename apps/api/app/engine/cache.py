@@ -0,0 +1,74 @@
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable
+import threading
+
+from app.core.config import settings
+from app.engine.lotomania import Ranking
+
+class RankingCache:
+    """LRU do ranking (núcleo + periferia) por (base_draw_id, versão dos concursos, janela, hash do score).
+
+    O ranking não depende do usuário, então depois de importar um concurso
+    só a primeira request de cada chave paga o score; as outras só montam bilhetes.
+    A versão (data_versions "draws", sobe a cada import que muda algo) é o que
+    invalida entre processos; o clear() no import só adianta a limpeza local.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Ranking]" = OrderedDict()
+        self._lock = threading.Lock()
+        # uma trava por chave: requests simultâneas da mesma chave esperam a primeira
+        self._building: Dict[Hashable, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, key: Hashable):
+        with self._lock:
+            ranking = self._data.get(key)
+            if ranking is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+            return ranking
+
+    def get_or_build(self, key: Hashable, build: Callable[[], Ranking]) -> Ranking:
+        ranking = self._lookup(key)
+        if ranking is not None:
+            return ranking
+
+        with self._lock:
+            key_lock = self._building.setdefault(key, threading.Lock())
+
+        with key_lock:
+            ranking = self._lookup(key)
+            if ranking is not None:
+                return ranking
+
+            with self._lock:
+                self.misses += 1
+            try:
+                ranking = build()
+                with self._lock:
+                    self._data[key] = ranking
+                    self._data.move_to_end(key)
+                    while len(self._data) > self.maxsize:
+                        self._data.popitem(last=False)
+            finally:
+                with self._lock:
+                    self._building.pop(key, None)
+            return ranking
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+ranking_cache = RankingCache(maxsize=settings.RANKING_CACHE_SIZE)
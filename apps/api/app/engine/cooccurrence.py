@@ -0,0 +1,167 @@
+from functools import lru_cache
+from typing import Optional
+import itertools
+
+import numpy as np
+
+# Coocorrência de k dezenas na janela (pares, trincas, ...) em vetores densos em
+# vez de Counter de tuplas:
+#   pares   -> matriz 100×100, slot = a*100 + b (só o triângulo a < b é usado)
+#   trincas -> vetor de C(100,3) posições, slot = número combinatório (colex)
+#              C(c,3) + C(b,2) + a
+#   k >= 4  -> esparso, só as combinações que apareceram (C(100,4) já passa de 3,9 mi);
+#              janela curta também vai no esparso, o vetor denso seria quase todo zero
+# O top-k sai por seleção parcial (np.partition na contagem) e só os candidatos
+# são ordenados. Desempate igual ao Counter.most_common sobre a janela do mais
+# recente pro mais antigo: contagem desc, aparição mais recente primeiro, depois
+# ordem lexicográfica da combinação (= ordem do id em base 100).
+
+_C2 = np.array([n * (n - 1) // 2 for n in range(100)], dtype=np.int64)
+_C3 = np.array([n * (n - 1) * (n - 2) // 6 for n in range(100)], dtype=np.int64)
+
+N_PAIRS = 4950
+N_TRIPLES = 161700
+MAX_K = 9  # id em base 100 cabe em int64 até 9 dezenas
+
+def _colex_ids(k: int) -> np.ndarray:
+    # por índice colex: id em base 100 da combinação (a*100+b, a*10000+b*100+c);
+    # np.nonzero num cubo a<b<c em vez de itertools (roda no import de todo worker)
+    r = np.arange(100)
+    inc = r[:, None] < r[None, :]
+    grid = inc if k == 2 else inc[:, :, None] & inc[None, :, :]
+    combos = np.stack(np.nonzero(grid), axis=1).astype(np.int64)
+    colex = _C2[combos[:, 1]] + combos[:, 0] if k == 2 else _C3[combos[:, 2]] + _C2[combos[:, 1]] + combos[:, 0]
+    ids = np.empty(len(combos), dtype=np.int64)
+    ids[colex] = _base100(combos)
+    return ids
+
+def _base100(tuples: np.ndarray) -> np.ndarray:
+    ids = np.zeros(tuples.shape[:-1], dtype=np.int64)
+    for j in range(tuples.shape[-1]):
+        ids = ids * 100 + tuples[..., j]
+    return ids
+
+PAIR_IDS = _colex_ids(2)
+TRIPLE_IDS = _colex_ids(3)
+
+@lru_cache(maxsize=None)
+def _positions(size: int, k: int) -> np.ndarray:
+    # posições das combinações de k dentro de um concurso de `size` dezenas ordenadas
+    return np.array(list(itertools.combinations(range(size), k)), dtype=np.intp).reshape(-1, k)
+
+class RankedTuples:
+    """Combinações já ordenadas: ids em base 100 e contagens.
+
+    `complete` = já tem todas as combinações com contagem > 0 (um top maior não muda nada).
+    """
+
+    __slots__ = ("k", "ids", "counts", "complete")
+
+    def __init__(self, k: int, ids: np.ndarray, counts: np.ndarray, complete: bool = False):
+        self.k, self.ids, self.counts, self.complete = k, ids, counts, complete
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def top(self, n: int) -> "RankedTuples":
+        return RankedTuples(self.k, self.ids[:n], self.counts[:n], self.complete and n >= len(self.ids))
+
+    def numbers(self) -> np.ndarray:
+        # (n × k) dezenas de cada combinação, em ordem crescente
+        powers = 100 ** np.arange(self.k - 1, -1, -1, dtype=np.int64)
+        return (self.ids[:, None] // powers) % 100
+
+class TupleCounts:
+    """Contagem e aparição mais recente (maior = mais novo) de cada combinação de k dezenas.
+
+    `ids` leva o slot pro id em base 100; None quando o slot já é o id (pares na matriz).
+    """
+
+    __slots__ = ("k", "count", "last", "ids", "_ranked")
+
+    def __init__(self, k: int, count: np.ndarray, last: np.ndarray, ids: Optional[np.ndarray] = None):
+        self.k, self.count, self.last, self.ids = k, count, last, ids
+        self._ranked: Optional[RankedTuples] = None
+
+    def top(self, n: int) -> RankedTuples:
+        ranked = self._ranked
+        if ranked is not None and (len(ranked) >= n or ranked.complete):
+            return ranked.top(n)
+
+        count = self.count.ravel()
+        nz = np.flatnonzero(count)
+        complete = n >= len(nz)
+        if not complete and n > 0:
+            # só quem empata ou passa da n-ésima maior contagem pode entrar no top
+            c = count[nz]
+            kth = np.partition(c, len(c) - n)[len(c) - n]
+            nz = nz[c >= kth]
+        elif n <= 0:
+            nz = nz[:0]
+
+        ids = nz.astype(np.int64) if self.ids is None else self.ids[nz]
+        order = np.lexsort((ids, -self.last.ravel()[nz].astype(np.int64), -count[nz].astype(np.int64)))[:max(n, 0)]
+        ranked = RankedTuples(self.k, ids[order], count[nz[order]].astype(np.int64), complete)
+        self._ranked = ranked
+        return ranked
+
+def _slots(nums: np.ndarray, pos: np.ndarray) -> np.ndarray:
+    # slot de cada combinação de cada concurso, coluna a coluna (sem montar concursos × combinações × k)
+    k = pos.shape[1]
+
+    def col(j: int) -> np.ndarray:
+        return nums[:, pos[:, j]]
+
+    if k == 2:
+        return col(0) * 100 + col(1)
+    if k == 3:
+        return _C3[col(2)] + _C2[col(1)] + col(0)
+    ids = col(0)
+    for j in range(1, k):
+        ids = ids * 100 + col(j)
+    return ids
+
+def window_tuple_counts(m: np.ndarray, k: int) -> TupleCounts:
+    """Combinações de k dezenas da matriz de ocorrência (janela × 100, linha 0 = mais recente)."""
+    if not 1 <= k <= MAX_K:
+        raise ValueError(f"k fora de 1..{MAX_K}: {k}")
+    n_rows = len(m)
+    sizes = m.sum(axis=1)
+    slot_parts, recent_parts = [], []
+    for size in np.unique(sizes):  # concursos de 20 dezenas caem todos no mesmo grupo
+        size = int(size)
+        if size < k:
+            continue
+        rows = np.flatnonzero(sizes == size)
+        nums = np.nonzero(m[rows])[1].reshape(len(rows), size).astype(np.int64)
+        pos = _positions(size, k)
+        slot_parts.append(_slots(nums, pos).ravel())
+        recent_parts.append(np.repeat((n_rows - 1 - rows).astype(np.int32), len(pos)))
+    slots = np.concatenate(slot_parts) if slot_parts else np.zeros(0, dtype=np.int64)
+    recent = np.concatenate(recent_parts) if recent_parts else np.zeros(0, dtype=np.int32)
+
+    n_slots = 100 * 100 if k == 2 else N_TRIPLES if k == 3 else 0
+    if n_slots and len(slots) * 4 >= n_slots:
+        count = np.bincount(slots, minlength=n_slots)
+        last = np.full(n_slots, -1, dtype=np.int32)
+        np.maximum.at(last, slots, recent)
+        if k == 2:
+            return TupleCounts(2, count.reshape(100, 100), last.reshape(100, 100))
+        return TupleCounts(3, count, last, TRIPLE_IDS)
+
+    # janela curta (ou k >= 4): só os slots que apareceram; o vetor denso seria quase todo zero
+    uniq, inv = np.unique(slots, return_inverse=True)
+    count = np.bincount(inv, minlength=len(uniq))
+    last = np.full(len(uniq), -1, dtype=np.int32)
+    np.maximum.at(last, inv, recent)
+    return TupleCounts(k, count, last, TRIPLE_IDS[uniq] if k == 3 else uniq)
+
+def tuple_bonus(source, top: int) -> np.ndarray:
+    """Bônus por dezena: soma das contagens do top `top` em que ela aparece, normalizada pelo máximo.
+
+    `source` é TupleCounts ou RankedTuples (qualquer coisa com .top(n)).
+    """
+    ranked = source.top(top)
+    bonus = np.bincount(ranked.numbers().ravel(), weights=np.repeat(ranked.counts, ranked.k), minlength=100)
+    mx = bonus.max()
+    return bonus / mx if mx else bonus
@@ -0,0 +1,124 @@
+from math import comb, sqrt
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from app.engine.bitmask import HALF
+from app.engine.results import PRIZE_HITS
+
+# Chance de um conjunto de bilhetes: cada bilhete sozinho tem conta fechada
+# (hipergeométrica: 20 dezenas sorteadas de 100, k delas no bilhete); o conjunto
+# não (os bilhetes se sobrepõem), então "pelo menos um com 15+ ou 0" sai de Monte
+# Carlo: sorteios aleatórios como máscara (lo/hi uint64) e acertos de todos os
+# bilhetes por AND + popcount, em lotes.
+#
+# Reprodutível: a fatia i usa SeedSequence(seed, spawn_key=(i,)) e cada sorteio
+# consome sempre os mesmos 20 números do gerador, então mesma seed + mesmas
+# amostras = mesmo resultado, com qualquer número de workers ou tamanho de lote.
+
+NUMBERS = 100
+DRAW_SIZE = 20
+TICKET_SIZE = 50
+# lote = sorteios × bilhetes; cada célula custa ~BYTES_PER_CELL de temporários (AND em
+# uint64 das duas metades + popcount + soma), então o lote sai do orçamento em bytes
+CHUNK_BYTES = 32 * 1024 * 1024  # por fatia; com N workers no pool são N disso
+BYTES_PER_CELL = 24
+MIN_CHUNK_ROWS = 16
+
+_LO_BIT = np.array([1 << n if n < HALF else 0 for n in range(NUMBERS)], dtype=np.uint64)
+_HI_BIT = np.array([0 if n < HALF else 1 << (n - HALF) for n in range(NUMBERS)], dtype=np.uint64)
+_FLOYD_SPAN = np.arange(NUMBERS - DRAW_SIZE + 1, NUMBERS + 1, dtype=np.float64)  # 81..100
+_MIN_PRIZE = min(h for h in PRIZE_HITS if h > 0)
+
+def hit_distribution(ticket_size: int = TICKET_SIZE) -> List[float]:
+    """P(acertos = h), h = 0..20, de um bilhete com `ticket_size` dezenas (exato)."""
+    total = comb(NUMBERS, DRAW_SIZE)
+    return [comb(ticket_size, h) * comb(NUMBERS - ticket_size, DRAW_SIZE - h) / total for h in range(DRAW_SIZE + 1)]
+
+def ticket_odds(n_tickets: int, ticket_size: int = TICKET_SIZE) -> dict:
+    dist = hit_distribution(ticket_size)
+    prize = sum(dist[h] for h in PRIZE_HITS)
+    return {
+        "ticket_size": ticket_size,
+        "hit_distribution": {str(h): p for h, p in enumerate(dist)},
+        "one_in": {str(h): round(1 / dist[h]) for h in PRIZE_HITS if dist[h] > 0},
+        "prize_probability": prize,
+        # por linearidade vale pro conjunto mesmo com sobreposição
+        "expected_prize_tickets": n_tickets * prize,
+    }
+
+def pack_tickets(tickets: Sequence[Sequence[int]]) -> Tuple[np.ndarray, np.ndarray]:
+    lo = np.zeros(len(tickets), dtype=np.uint64)
+    hi = np.zeros(len(tickets), dtype=np.uint64)
+    for i, t in enumerate(tickets):
+        idx = np.asarray(t, dtype=np.intp)
+        lo[i] = np.bitwise_or.reduce(_LO_BIT[idx])
+        hi[i] = np.bitwise_or.reduce(_HI_BIT[idx])
+    return lo, hi
+
+def random_draws(rng: np.random.Generator, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """`n` sorteios 20-de-100 uniformes como máscaras (lo, hi).
+
+    Algoritmo de Floyd vetorizado: no passo j (80..99) sorteia r em 0..j; se r já
+    saiu naquele sorteio entra j. 20 passos sobre vetores de n, sem ordenar 100 chaves.
+    """
+    lo = np.zeros(n, dtype=np.uint64)
+    hi = np.zeros(n, dtype=np.uint64)
+    picks = np.ascontiguousarray((rng.random((n, DRAW_SIZE)) * _FLOYD_SPAN).astype(np.uint8).T)
+    for step, r in enumerate(picks):
+        taken = ((lo & np.take(_LO_BIT, r)) | (hi & np.take(_HI_BIT, r))) != 0
+        r[taken] = NUMBERS - DRAW_SIZE + step
+        lo |= np.take(_LO_BIT, r)
+        hi |= np.take(_HI_BIT, r)
+    return lo, hi
+
+def chunk_rows(n_tickets: int) -> int:
+    # bolão de 10 mil bilhetes: ~140 sorteios por lote em vez de estourar a memória
+    return max(MIN_CHUNK_ROWS, CHUNK_BYTES // (BYTES_PER_CELL * max(n_tickets, 1)))
+
+def simulate_shard(t_lo: np.ndarray, t_hi: np.ndarray, seed: int, shard: int, samples: int) -> Dict[str, np.ndarray]:
+    """Uma fatia da simulação (roda no worker): contagens por sorteio, pra somar com as outras."""
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(shard,)))
+    n_tickets = len(t_lo)
+    best = np.zeros(DRAW_SIZE + 1, dtype=np.int64)
+    worst = np.zeros(DRAW_SIZE + 1, dtype=np.int64)
+    prize_tickets = np.zeros(n_tickets + 1, dtype=np.int64)
+    rows = chunk_rows(n_tickets)
+    for start in range(0, samples, rows):
+        d_lo, d_hi = random_draws(rng, min(rows, samples - start))
+        hits = (np.bitwise_count(d_lo[:, None] & t_lo) + np.bitwise_count(d_hi[:, None] & t_hi)).astype(np.uint8)
+        best += np.bincount(hits.max(axis=1), minlength=DRAW_SIZE + 1)
+        worst += np.bincount(hits.min(axis=1), minlength=DRAW_SIZE + 1)
+        prized = ((hits >= _MIN_PRIZE) | (hits == 0)).sum(axis=1)  # 15..20 ou 0 acertos
+        prize_tickets += np.bincount(prized, minlength=n_tickets + 1)
+    return {"samples": samples, "best": best, "worst": worst, "prize_tickets": prize_tickets}
+
+def shard_plan(samples: int, shard_samples: int) -> List[Tuple[int, int]]:
+    # (índice da fatia, sorteios); a última pode ser menor
+    return [(i, min(shard_samples, samples - start)) for i, start in enumerate(range(0, samples, shard_samples))]
+
+def _estimate(count: int, n: int) -> dict:
+    # intervalo de Wilson 95%: não colapsa em [0, 0] quando o evento não apareceu
+    z = 1.96
+    count = int(count)
+    p = count / n
+    center = (p + z * z / (2 * n)) / (1 + z * z / n)
+    half = z * sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    return {"count": count, "p": p, "ci95": [max(center - half, 0.0), min(center + half, 1.0)]}
+
+def summarize_simulation(parts: List[Dict[str, np.ndarray]]) -> dict:
+    """Junta as fatias (em ordem) e tira as probabilidades do conjunto."""
+    n = sum(p["samples"] for p in parts)
+    best = sum(p["best"] for p in parts)
+    worst = sum(p["worst"] for p in parts)
+    prize_tickets = sum(p["prize_tickets"] for p in parts)
+    at_least = np.cumsum(best[::-1])[::-1]  # at_least[h] = sorteios com algum bilhete de h+ acertos
+    last = int(np.flatnonzero(prize_tickets).max()) if prize_tickets.any() else 0
+    return {
+        "samples": n,
+        "any_prize": _estimate(n - prize_tickets[0], n),
+        "any_hits_at_least": {str(h): _estimate(at_least[h], n) for h in range(_MIN_PRIZE, DRAW_SIZE + 1)},
+        "any_zero": _estimate(worst[0], n),
+        "best_hits_histogram": best.tolist(),
+        "prize_tickets_histogram": prize_tickets[: last + 1].tolist(),  # índice = bilhetes premiados no sorteio
+    }
@@ -0,0 +1,231 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, List, Optional
+import multiprocessing
+import os
+import threading
+import time
+
+from app.core.config import settings
+
+class EngineBusy(Exception):
+    """Fila do motor cheia: o request deve voltar depois (429 + Retry-After)."""
+
+class EngineTimeout(Exception):
+    """Job passou do tempo limite."""
+
+def _warm_worker() -> int:
+    # roda em cada processo do pool: paga o import do motor (numpy, tabelas) antes do primeiro request
+    import app.engine.lotomania  # noqa: F401
+    return os.getpid()
+
+class EngineExecutor:
+    """Roda o motor (CPU puro, preso no GIL) num pool de processos.
+
+    - no máximo `max_inflight` jobs em voo (rodando + esperando worker); passou disso, EngineBusy
+    - cada job tem `timeout_s`; o slot só é liberado quando o job termina de fato,
+      então um job estourado continua contando na fila até o worker largar
+    - workers=0 roda inline na thread do request (dev/testes)
+    """
+
+    def __init__(self, workers: int, max_inflight: int, timeout_s: float):
+        self.workers = workers
+        self.max_inflight = max_inflight
+        self.timeout_s = timeout_s
+        self._slots = threading.BoundedSemaphore(max_inflight)
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.inflight = 0
+        self.jobs = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.exec_seconds_total = 0.0
+        self.exec_seconds_max = 0.0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn: worker limpo, sem herdar threads/conexões do processo do uvicorn
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def _release(self, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.inflight -= 1
+            self.jobs += 1
+            self.exec_seconds_total += elapsed
+            self.exec_seconds_max = max(self.exec_seconds_max, elapsed)
+        self._slots.release()
+
+    def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise EngineBusy()
+
+        started = time.perf_counter()
+        with self._lock:
+            self.inflight += 1
+
+        if self.workers <= 0:
+            try:
+                return fn(*args)
+            finally:
+                self._release(started)
+
+        try:
+            fut = self._get_pool().submit(fn, *args)
+        except BrokenProcessPool:
+            self._release(started)
+            self._reset_pool()
+            raise EngineBusy()
+        except Exception:
+            self._release(started)
+            raise
+        fut.add_done_callback(lambda _f: self._release(started))
+
+        try:
+            return fut.result(timeout=self.timeout_s)
+        except BrokenProcessPool:
+            self._reset_pool()
+            raise EngineBusy()
+        except FutureTimeout:
+            fut.cancel()  # só cancela se ainda não começou
+            with self._lock:
+                self.timeouts += 1
+            raise EngineTimeout()
+
+    def run_many(self, fn: Callable[..., Any], jobs: List[tuple], budget_s: float) -> List[Any]:
+        """fn(*args) pra cada job, em ordem, até `workers` por vez, ocupando um slot só da fila.
+
+        Passou de `budget_s`, não submete mais: devolve os resultados do prefixo que
+        terminou (pelo menos o primeiro job). O conjunto todo continua limitado por `timeout_s`.
+        """
+        if not jobs:
+            return []
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise EngineBusy()
+
+        started = time.perf_counter()
+        deadline = started + budget_s
+        with self._lock:
+            self.inflight += 1
+        results: List[Any] = []
+
+        if self.workers <= 0:
+            try:
+                for args in jobs:
+                    results.append(fn(*args))
+                    if time.perf_counter() >= deadline:
+                        break
+                return results
+            finally:
+                self._release(started)
+
+        # igual ao run: o slot só volta quando o último job submetido terminar de fato
+        state = {"left": 0, "closed": False}
+
+        def job_done(_f) -> None:
+            with self._lock:
+                state["left"] -= 1
+                last = state["closed"] and state["left"] == 0
+            if last:
+                self._release(started)
+
+        pending: deque = deque()
+        queue = iter(jobs)
+
+        def submit(args: tuple) -> None:
+            fut = self._get_pool().submit(fn, *args)
+            with self._lock:
+                state["left"] += 1
+            fut.add_done_callback(job_done)
+            pending.append(fut)
+
+        try:
+            for _ in range(self.workers):
+                args = next(queue, None)
+                if args is None:
+                    break
+                submit(args)
+            while pending:
+                fut = pending[0]
+                results.append(fut.result(timeout=max(started + self.timeout_s - time.perf_counter(), 0.0)))
+                pending.popleft()
+                if time.perf_counter() < deadline:
+                    args = next(queue, None)
+                    if args is not None:
+                        submit(args)
+            return results
+        except BrokenProcessPool:
+            self._reset_pool()
+            raise EngineBusy()
+        except FutureTimeout:
+            with self._lock:
+                self.timeouts += 1
+            raise EngineTimeout()
+        finally:
+            for fut in pending:
+                fut.cancel()  # só os que ainda não começaram
+            with self._lock:
+                state["closed"] = True
+                last = state["left"] == 0
+            if last:
+                self._release(started)
+
+    def warm(self) -> int:
+        """Sobe todos os workers do pool e importa o motor neles. Devolve quantos responderam."""
+        if self.workers <= 0:
+            _warm_worker()
+            return 0
+        pool = self._get_pool()
+        # jobs submetidos juntos antes de algum terminar: o pool abre um processo pra cada
+        futures = [pool.submit(_warm_worker) for _ in range(self.workers)]
+        return len({f.result(timeout=self.timeout_s * 3) for f in futures})
+
+    def _reset_pool(self) -> None:
+        # worker morreu (OOM/kill): descarta o pool, o próximo job sobe um novo
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        # desligando o servidor: espera os workers saírem (sem isso ficam órfãos presos na fila)
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_inflight": self.max_inflight,
+                "inflight": self.inflight,
+                "jobs": self.jobs,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "exec_ms_avg": round(1000 * self.exec_seconds_total / self.jobs, 2) if self.jobs else 0.0,
+                "exec_ms_max": round(1000 * self.exec_seconds_max, 2),
+            }
+
+engine_executor = EngineExecutor(
+    workers=settings.ENGINE_WORKERS,
+    max_inflight=settings.ENGINE_MAX_INFLIGHT,
+    timeout_s=settings.ENGINE_JOB_TIMEOUT_S,
+)
+
+# backtest (admin): pool próprio, criado uma vez, e um job por vez; não disputa os
+# workers do /generate nem sobe um pool novo a cada request
+backtest_executor = EngineExecutor(
+    workers=settings.BACKTEST_WORKERS,
+    max_inflight=1,
+    timeout_s=settings.BACKTEST_TIMEOUT_S,
+)
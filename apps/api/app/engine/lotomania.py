@@ -1,10 +1,19 @@
 from dataclasses import dataclass
-from typing import List, Dict, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 import hashlib
+import json
 import math
+import time
 from collections import Counter
 import itertools
 
+import numpy as np
+
+from app.core.metrics import note
+from app.engine.bitmask import masks_to_matrix, to_mask
+from app.engine.cooccurrence import TupleCounts, tuple_bonus, window_tuple_counts
+from app.engine.stats import WindowStats
+
 @dataclass
 class LotomaniaConfig:
     count: int
@@ -28,6 +37,33 @@ class LotomaniaConfig:
     top_pairs: int = 80
     top_triples: int = 40
 
+    # montagem: "walk" = periferia com offset do seed e +17 até passar no overlap (pode
+    # desistir e aceitar acima do limite); "optimizer" = guloso + trocas, overlap garantido
+    ticket_mode: str = "walk"
+    optimizer_budget_ms: float = 250.0  # tempo de CPU do otimizador por chamada (todos os bilhetes)
+    optimizer_max_swaps: int = 200      # trocas por bilhete (limite determinístico)
+
+# campos que mexem no score/ranking (count, janela e diversidade ficam de fora:
+# a janela entra na chave do cache separada, o resto é montagem de bilhete)
+_RANKING_FIELDS = (
+    "nucleus_size",
+    "w_freq", "w_recency", "w_cycle",
+    "target_gap_draws", "sigma_gap_draws",
+    "w_pair", "w_triple", "top_pairs", "top_triples",
+)
+
+def scoring_hash(cfg: LotomaniaConfig) -> str:
+    raw = json.dumps({f: getattr(cfg, f) for f in _RANKING_FIELDS}, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+@dataclass(frozen=True)
+class Ranking:
+    # resultado do score que não depende do usuário: dá pra compartilhar entre requests
+    nucleus: List[int]
+    ranked: List[int]
+    meta: dict
+    scores: List[float]  # score por dezena (índice = dezena)
+
 def _stable_seed(user_id: int, base_draw_id: str, salt: str) -> int:
     s = f"{user_id}|{base_draw_id}|{salt}".encode("utf-8")
     return int(hashlib.sha256(s).hexdigest()[:12], 16)
@@ -54,16 +90,9 @@ def _cycle_bonus(gap: int, target: float, sigma: float) -> float:
     z = (gap - target) / (sigma if sigma > 0 else 1.0)
     return math.exp(-0.5 * (z ** 2))
 
-def _cooccurrence_maps(window_results: List[List[int]]):
-    pair = Counter()
-    triple = Counter()
-    for draw in window_results:
-        s = sorted(draw)
-        for a, b in itertools.combinations(s, 2):
-            pair[(a, b)] += 1
-        for a, b, c in itertools.combinations(s, 3):
-            triple[(a, b, c)] += 1
-    return pair, triple
+def _cooccurrence_maps(window_results: List[List[int]]) -> Tuple[TupleCounts, TupleCounts]:
+    m = _occurrence_matrix(window_results)
+    return window_tuple_counts(m, 2), window_tuple_counts(m, 3)
 
 def _build_scores(window_results: List[List[int]], cfg: LotomaniaConfig) -> Tuple[Dict[int, float], dict]:
     freq = _compute_freq(window_results)
@@ -82,18 +111,17 @@ def _build_scores(window_results: List[List[int]], cfg: LotomaniaConfig) -> Tupl
 
     # coocorrência: pega top pares/trincas da janela e distribui bônus
     pair, triple = _cooccurrence_maps(window_results)
-    topP = pair.most_common(cfg.top_pairs)
-    topT = triple.most_common(cfg.top_triples)
+    topP, topT = pair.top(cfg.top_pairs), triple.top(cfg.top_triples)
 
     pair_bonus = {n: 0.0 for n in range(100)}
-    for (a, b), v in topP:
+    for (a, b), v in zip(topP.numbers().tolist(), topP.counts.tolist()):
         pair_bonus[a] += v
         pair_bonus[b] += v
     pb_max = max(pair_bonus.values()) if pair_bonus else 1.0
     pair_bonus = {n: (pair_bonus[n] / pb_max) if pb_max else 0.0 for n in range(100)}
 
     triple_bonus = {n: 0.0 for n in range(100)}
-    for (a, b, c), v in topT:
+    for (a, b, c), v in zip(topT.numbers().tolist(), topT.counts.tolist()):
         triple_bonus[a] += v
         triple_bonus[b] += v
         triple_bonus[c] += v
@@ -105,7 +133,10 @@ def _build_scores(window_results: List[List[int]], cfg: LotomaniaConfig) -> Tupl
         for n in range(100)
     }
 
-    audit_meta = {
+    return scores, _audit_meta(cfg)
+
+def _audit_meta(cfg: LotomaniaConfig) -> dict:
+    return {
         "weights": {
             "freq": cfg.w_freq,
             "recency": cfg.w_recency,
@@ -119,71 +150,332 @@ def _build_scores(window_results: List[List[int]], cfg: LotomaniaConfig) -> Tupl
         "top_triples_used": cfg.top_triples,
     }
 
-    return scores, audit_meta
+# --- caminho vetorizado -------------------------------------------------------
+# Mesmo resultado do _build_scores (scores e audit_meta), mas tudo sai de uma
+# matriz de ocorrência (janela × 100). Serve pra varrer vários configs de uma vez.
 
-def generate_lotomania_tickets(
-    user_id: int,
-    base_draw_id: str,
+def _occurrence_matrix(window_results: List[List[int]]) -> np.ndarray:
+    # m[i, n] = 1 se a dezena n saiu no concurso i (idx 0 = mais recente)
+    m = np.zeros((len(window_results), 100), dtype=np.uint8)
+    lens = [len(draw) for draw in window_results]
+    if sum(lens):
+        rows = np.repeat(np.arange(len(window_results)), lens)
+        cols = np.fromiter(itertools.chain.from_iterable(window_results), dtype=np.intp, count=sum(lens))
+        m[rows, cols] = 1
+    return m
+
+def _window_features(m: np.ndarray) -> dict:
+    # tudo que depende só da janela (não dos pesos) — calculado uma vez por janela
+    counts = m.sum(axis=0, dtype=np.int64)
+    seen = counts > 0
+    maxv = counts.max() if seen.any() else 1
+    first = m.argmax(axis=0) if len(m) else np.zeros(100, dtype=np.intp)
+    gap = np.where(seen, first, len(m) + 5)
+    return {
+        "freq": counts / maxv,
+        "gap": gap,
+        "pairs": window_tuple_counts(m, 2),
+        "triples": window_tuple_counts(m, 3),
+    }
+
+def _scores_from_features(feat: dict, cfg: LotomaniaConfig) -> Tuple[Dict[int, float], dict]:
+    gap = feat["gap"]
+
+    rec = 1.0 / (gap + 1)
+    rec = rec / rec.max()
+
+    # math.exp por gap distinto (poucos valores) pra bater bit a bit com o caminho de referência
+    uniq, inv = np.unique(gap, return_inverse=True)
+    cycle = np.array([_cycle_bonus(int(g), cfg.target_gap_draws, cfg.sigma_gap_draws) for g in uniq])[inv]
+    cycle = cycle / cycle.max()
+
+    base = cfg.w_freq * feat["freq"] + cfg.w_recency * rec + cfg.w_cycle * cycle
+    scores = (
+        base
+        + cfg.w_pair * tuple_bonus(feat["pairs"], cfg.top_pairs)
+        + cfg.w_triple * tuple_bonus(feat["triples"], cfg.top_triples)
+    )
+    return dict(enumerate(scores.tolist())), _audit_meta(cfg)
+
+def _build_scores_np(window_results: List[List[int]], cfg: LotomaniaConfig) -> Tuple[Dict[int, float], dict]:
+    return _scores_from_features(_window_features(_occurrence_matrix(window_results)), cfg)
+
+def build_scores_batch(
     window_results: List[List[int]],
-    cfg: LotomaniaConfig
-) -> Tuple[List[List[int]], List[dict]]:
-    scores, meta = _build_scores(window_results, cfg)
+    cfgs: List[LotomaniaConfig]
+) -> List[Tuple[Dict[int, float], dict]]:
+    """Pontua vários configs com uma única matriz de ocorrência.
+
+    window_results vem do mais recente pro mais antigo e deve cobrir a maior
+    janela pedida; cada cfg usa os seus cfg.window concursos mais recentes.
+    Janelas iguais reaproveitam freq/gap/pares/trincas.
+    """
+    m = _occurrence_matrix(window_results)
+    features: Dict[int, dict] = {}
+    out = []
+    for cfg in cfgs:
+        w = min(cfg.window, len(m))
+        if w not in features:
+            features[w] = _window_features(m[:w])
+        out.append(_scores_from_features(features[w], cfg))
+    return out
+
+def build_ranking(window_results: List[List[int]], cfg: LotomaniaConfig) -> Ranking:
+    return _ranking_from_scores(*_build_scores_np(window_results, cfg), cfg)
+
+def build_ranking_from_masks(masks: List[int], cfg: LotomaniaConfig) -> Ranking:
+    # janela como máscaras de 100 bits (mais recente primeiro), direto das colunas do Draw
+    feat = _window_features(masks_to_matrix(masks))
+    return _ranking_from_scores(*_scores_from_features(feat, cfg), cfg)
+
+def build_ranking_from_stats(stats: WindowStats, cfg: LotomaniaConfig) -> Ranking:
+    # mesmo ranking do build_ranking, lendo as estatísticas incrementais da janela
+    return _ranking_from_scores(*_scores_from_features(stats.features(), cfg), cfg)
+
+def _ranking_from_scores(scores: Dict[int, float], meta: dict, cfg: LotomaniaConfig) -> Ranking:
+    order = [n for n, _ in sorted(scores.items(), key=lambda x: (-x[1], x[0]))]
 
     # 1) Núcleo fixo (top scores)
-    nucleus = [n for n, _ in sorted(scores.items(), key=lambda x: (-x[1], x[0]))[: cfg.nucleus_size]]
+    nucleus = order[: cfg.nucleus_size]
 
     # 2) Ranking periférico (restante por score)
-    ranked = [n for n, _ in sorted(scores.items(), key=lambda x: (-x[1], x[0])) if n not in nucleus]
+    ranked = order[cfg.nucleus_size:]
 
-    tickets: List[List[int]] = []
-    audits: List[dict] = []
+    return Ranking(nucleus=nucleus, ranked=ranked, meta=meta, scores=[scores[n] for n in range(100)])
+
+def shared_audit(base_draw_id: str, ranking: Ranking, cfg: LotomaniaConfig) -> dict:
+    # parte da auditoria que é igual pra todos os bilhetes da sessão (vai uma vez só no banco)
+    audit = {
+        "lottery": "lotomania",
+        "base_draw_id": base_draw_id,
+        "window": cfg.window,
+        "nucleus": ranking.nucleus,
+        "diversity_overlap_max": cfg.diversity_overlap_max,
+        "meta": ranking.meta,
+        "notes": [
+            "determinístico: user_id + base_draw_id + ticket_index",
+            "score = freq + recência + ciclo (gap alvo) + bônus de pares/trincas",
+            "núcleo fixo = top scores; periferia móvel = ranking com offset determinístico",
+            "overlap controlado com deslocamento determinístico"
+        ],
+    }
+    if cfg.ticket_mode == "optimizer":
+        audit["ticket_mode"] = "optimizer"
+        audit["notes"][-1] = OPTIMIZER_NOTE
+    return audit
+
+OPTIMIZER_NOTE = "overlap garantido: guloso por score em bitset + trocas locais, com orçamento de tempo"
+
+def ticket_audit(shared: dict, ticket_index: int, seed: int, optimizer: Optional[dict] = None) -> dict:
+    # auditoria completa de um bilhete = compartilhada + (índice, seed)
+    audit = {k: shared[k] for k in ("lottery", "base_draw_id", "window", "nucleus", "diversity_overlap_max")}
+    audit["ticket_index"] = ticket_index
+    audit["seed"] = seed
+    audit["meta"] = shared["meta"]
+    audit["notes"] = shared["notes"]
+    if "ticket_mode" in shared:
+        audit["ticket_mode"] = shared["ticket_mode"]
+    if optimizer is not None:
+        audit["optimizer"] = optimizer
+    return audit
+
+def iter_lotomania_tickets(
+    user_id: int,
+    base_draw_id: str,
+    ranking: Ranking,
+    cfg: LotomaniaConfig
+) -> Iterator[Tuple[List[int], dict]]:
+    """Gera (bilhete, auditoria) um a um, assim que cada bilhete passa no teste de overlap.
+
+    Memória não cresce com cfg.count: o bilhete só depende do offset no ranking,
+    então há no máximo len(ranked) bilhetes distintos (montados uma vez cada) e
+    o overlap é testado contra as máscaras distintas já aceitas.
+    """
+    if cfg.ticket_mode == "optimizer":
+        yield from _iter_optimized_tickets(user_id, base_draw_id, ranking, cfg)
+        return
+    if cfg.ticket_mode != "walk":
+        raise ValueError(f"ticket_mode desconhecido: {cfg.ticket_mode!r}")
+
+    nucleus, ranked = ranking.nucleus, ranking.ranked
+
+    shared = shared_audit(base_draw_id, ranking, cfg)
+
+    need = cfg.ticket_size - len(nucleus)
+    cycled = ranked * (max(need, 0) // len(ranked) + 2)  # ranked[idx % len] sem o laço
+
+    def build_ticket(start_idx: int) -> List[int]:
+        periphery = cycled[start_idx:start_idx + max(need, 0)]
+        ticket = sorted(set(nucleus + periphery))
+        # garante 50 exatas (fallback determinístico)
+        if len(ticket) != cfg.ticket_size:
+            missing = [n for n in range(100) if n not in ticket]
+            ticket = sorted(ticket + missing[: (cfg.ticket_size - len(ticket))])
+        return ticket
+
+    built: Dict[int, Tuple[List[int], int]] = {}
+
+    def ticket_at(start_idx: int) -> Tuple[List[int], int]:
+        if start_idx not in built:
+            ticket = build_ticket(start_idx)
+            built[start_idx] = (ticket, to_mask(ticket))
+        return built[start_idx]
+
+    accepted: Dict[int, None] = {}  # máscaras distintas já aceitas (ordem de aceite)
 
     for i in range(cfg.count):
         seed = _stable_seed(user_id, base_draw_id, salt=f"ticket-{i+1}")
         start = seed % len(ranked)
 
-        need = cfg.ticket_size - len(nucleus)
-
-        def build_ticket(start_idx: int) -> List[int]:
-            periphery = []
-            idx = start_idx
-            while len(periphery) < need:
-                periphery.append(ranked[idx % len(ranked)])
-                idx += 1
-            ticket = sorted(set(nucleus + periphery))
-            # garante 50 exatas (fallback determinístico)
-            if len(ticket) != cfg.ticket_size:
-                missing = [n for n in range(100) if n not in ticket]
-                ticket = sorted(ticket + missing[: (cfg.ticket_size - len(ticket))])
-            return ticket
+        ticket, mask = ticket_at(start)
 
-        ticket = build_ticket(start)
-
-        # 3) Overlap controlado determinístico
+        # 3) Overlap controlado determinístico (AND + popcount nas máscaras)
         tries = 0
-        while tries < 25 and any(len(set(ticket) & set(t)) > cfg.diversity_overlap_max for t in tickets):
+        while tries < 25 and any((mask & m).bit_count() > cfg.diversity_overlap_max for m in accepted):
             tries += 1
             start = (start + 17) % len(ranked)
-            ticket = build_ticket(start)
-
-        audit = {
-            "lottery": "lotomania",
-            "base_draw_id": base_draw_id,
-            "window": cfg.window,
-            "nucleus": nucleus,
-            "diversity_overlap_max": cfg.diversity_overlap_max,
-            "ticket_index": i + 1,
-            "seed": seed,
-            "meta": meta,
-            "notes": [
-                "determinístico: user_id + base_draw_id + ticket_index",
-                "score = freq + recência + ciclo (gap alvo) + bônus de pares/trincas",
-                "núcleo fixo = top scores; periferia móvel = ranking com offset determinístico",
-                "overlap controlado com deslocamento determinístico"
-            ],
+            ticket, mask = ticket_at(start)
+        if tries:
+            note("overlap_retries", tries)
+
+        accepted[mask] = None
+        yield list(ticket), ticket_audit(shared, i + 1, seed)
+
+def _iter_optimized_tickets(
+    user_id: int,
+    base_draw_id: str,
+    ranking: Ranking,
+    cfg: LotomaniaConfig
+) -> Iterator[Tuple[List[int], dict]]:
+    """Modo otimizador: cada bilhete maximiza a soma dos scores com overlap <= limite contra os já aceitos.
+
+    1) guloso: núcleo + dezenas em ordem de score, pulando a que estouraria o overlap
+       com algum bilhete aceito (folga por bilhete; os aceitos ficam numa matriz de bits
+       dezena × bilhete, então "quem contém a dezena n" é uma linha só);
+    2) trocas locais (sai x da periferia, entra y de fora): a que mais reduz a violação,
+       se o guloso travou, senão a que mais sobe o score sem violar; até não ter troca
+       que melhore, `optimizer_max_swaps` ou o orçamento acabar.
+    Empates seguem uma permutação sorteada com o seed do bilhete (`_stable_seed`), então
+    continua determinístico em (user_id, base_draw_id, índice) enquanto o orçamento não
+    estoura. O orçamento é o tempo do otimizador somado na chamada (o consumidor do
+    stream não conta); acabou, os bilhetes seguintes ficam só com o guloso.
+    """
+    shared = shared_audit(base_draw_id, ranking, cfg)
+    scores = np.array(ranking.scores, dtype=np.float64)
+    cap, n = cfg.diversity_overlap_max, cfg.count
+    fixed = np.zeros(100, dtype=bool)
+    fixed[ranking.nucleus] = True
+    need = max(cfg.ticket_size - int(fixed.sum()), 0)
+    budget_s = cfg.optimizer_budget_ms / 1000.0
+    spent = 0.0
+
+    members = np.zeros((100, n), dtype=bool)  # members[d, j] = dezena d está no bilhete aceito j
+
+    for i in range(n):
+        t0 = time.perf_counter()
+        seed = _stable_seed(user_id, base_draw_id, salt=f"ticket-{i+1}")
+        tiebreak = np.random.default_rng(seed).permutation(100)
+        acc = members[:, :i]
+
+        # 1) guloso com folga por bilhete aceito; custo[d] = quantos bilhetes sem folga têm a dezena d
+        ticket = fixed.copy()
+        slack = cap - acc[fixed].sum(axis=0)
+        cost = acc[:, slack <= 0].sum(axis=1)
+        order = np.array([d for d in np.lexsort((tiebreak, -scores)).tolist() if not fixed[d]], dtype=np.intp)
+        free = np.ones(len(order), dtype=bool)
+        for _ in range(need):
+            # primeira dezena (em ordem de score) que não estoura nada; travou, a que menos estoura
+            # (aí o bilhete sai acima do limite e as trocas tentam consertar)
+            k = int(np.argmin(np.where(free, cost[order], np.iinfo(np.int64).max)))
+            d = order[k]
+            free[k] = False
+            ticket[d] = True
+            slack -= acc[d]
+            tight = acc[d] & (slack == 0)
+            if tight.any():
+                cost += acc[:, tight].sum(axis=1)
+
+        # 2) trocas locais: só os bilhetes no limite (ou acima) podem passar a violar
+        swaps = 0
+        exhausted = False
+        while swaps < cfg.optimizer_max_swaps:
+            if spent + (time.perf_counter() - t0) >= budget_s:
+                exhausted = True
+                break
+            out_ = np.flatnonzero(ticket & ~fixed)
+            in_ = np.flatnonzero(~ticket)
+            out_, in_ = out_[np.argsort(tiebreak[out_])], in_[np.argsort(tiebreak[in_])]
+            if not len(out_) or not len(in_):
+                break
+            # violação depois de trocar x por y: quem já estoura muda em -[x em j] + [y em j];
+            # quem está no limite só estoura se y está nele e x não (produto de matrizes)
+            excess = -slack
+            over, at = excess > 0, excess == 0
+            current = int(excess[over].sum())
+            ax, ay = acc[out_], acc[in_]
+            violation = (current - ax[:, over].sum(axis=1)[:, None] + ay[:, over].sum(axis=1)[None, :]
+                         + ((~ax[:, at]).astype(np.float32) @ ay[:, at].T.astype(np.float32)).astype(np.int64))
+            gain = scores[in_][None, :] - scores[out_][:, None]
+            better = (violation < current) | ((violation == current) & (gain > 1e-12))
+            if not better.any():
+                break
+            best = better & (violation == violation[better].min())
+            xi, yi = divmod(int(np.argmax(np.where(best, gain, -np.inf))), len(in_))
+            x, y = out_[xi], in_[yi]
+            ticket[x], ticket[y] = False, True
+            slack += acc[x]
+            slack -= acc[y]
+            swaps += 1
+
+        ov = cap - slack
+        members[:, i] = ticket
+        spent += time.perf_counter() - t0
+        if swaps:
+            note("optimizer_swaps", swaps)
+        stats = {
+            "constraint_met": bool((ov <= cap).all()),
+            "iterations": swaps,
+            "max_overlap": int(ov.max()) if i else 0,
+            "budget_exhausted": exhausted,
         }
+        yield np.flatnonzero(ticket).tolist(), ticket_audit(shared, i + 1, seed, stats)
+
+def optimizer_summary(stats: List[dict]) -> dict:
+    # resumo da sessão no modo otimizador (vai na auditoria compartilhada; o detalhe por bilhete não é gravado)
+    return {
+        "tickets": len(stats),
+        "constraint_met": all(s["constraint_met"] for s in stats),
+        "violations": sum(not s["constraint_met"] for s in stats),
+        "iterations": sum(s["iterations"] for s in stats),
+        "max_overlap": max((s["max_overlap"] for s in stats), default=0),
+        "budget_exhausted": any(s["budget_exhausted"] for s in stats),
+    }
 
+def assemble_tickets(
+    user_id: int,
+    base_draw_id: str,
+    ranking: Ranking,
+    cfg: LotomaniaConfig
+) -> Tuple[List[List[int]], List[dict]]:
+    tickets: List[List[int]] = []
+    audits: List[dict] = []
+    for ticket, audit in iter_lotomania_tickets(user_id, base_draw_id, ranking, cfg):
         tickets.append(ticket)
         audits.append(audit)
-
     return tickets, audits
+
+def generate_lotomania_tickets(
+    user_id: int,
+    base_draw_id: str,
+    window_results: List[List[int]],
+    cfg: LotomaniaConfig
+) -> Tuple[List[List[int]], List[dict]]:
+    return assemble_tickets(user_id, base_draw_id, build_ranking(window_results, cfg), cfg)
+
+def generate_lotomania_tickets_from_masks(
+    user_id: int,
+    base_draw_id: str,
+    window_masks: List[int],
+    cfg: LotomaniaConfig
+) -> Tuple[List[List[int]], List[dict]]:
+    return assemble_tickets(user_id, base_draw_id, build_ranking_from_masks(window_masks, cfg), cfg)
@@ -0,0 +1,166 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Dict, List, Optional, Tuple
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+from app.core.config import settings
+from app.engine.bitmask import masks_to_matrix
+
+# Estatística pública da janela (frequência, atraso, quentes/frias, top pares), pra página
+# de resultado e site: calculada uma vez no import e gravada num arquivo JSON (temp +
+# os.replace, igual ao snapshot do histórico). Cada worker guarda os corpos já
+# serializados (e em gzip) por janela e só troca quando o arquivo muda (1 stat por request):
+# request anônimo não encosta no banco nem no motor.
+#
+# Score/núcleo do motor ficam de fora de propósito (é o que o assinante paga).
+
+FORMAT_VERSION = 1
+HOT_COLD_SIZE = 10
+TOP_PAIRS = 20
+
+def _two(n: int) -> str:
+    return f"{n:02d}"
+
+def window_public_stats(masks: List[int]) -> dict:
+    """Estatística de uma janela (máscaras de 100 bits, mais recente primeiro)."""
+    from app.engine.cooccurrence import window_tuple_counts  # só no import/rebuild, não no boot
+
+    m = masks_to_matrix(masks)
+    counts = m.sum(axis=0, dtype=np.int64)
+    seen = counts > 0
+    gap = np.where(seen, m.argmax(axis=0), -1) if len(m) else np.full(100, -1)
+
+    # quentes: mais saíram (empate: saiu mais recente); frias: menos saíram (empate: atraso maior)
+    never = len(m) + 1
+    gap_key = np.where(seen, gap, never)
+    numbers = np.arange(100)
+    hot = np.lexsort((numbers, gap_key, -counts))[:HOT_COLD_SIZE]
+    cold = np.lexsort((numbers, -gap_key, counts))[:HOT_COLD_SIZE]
+
+    pairs = window_tuple_counts(m, 2).top(TOP_PAIRS)
+    return {
+        "draws": len(m),
+        "frequency": counts.tolist(),  # índice = dezena
+        "gap": [int(g) if g >= 0 else None for g in gap.tolist()],  # concursos desde a última vez (None = não saiu)
+        "hot": [_two(n) for n in hot.tolist()],
+        "cold": [_two(n) for n in cold.tolist()],
+        "top_pairs": [
+            {"numbers": [_two(a), _two(b)], "count": c}
+            for (a, b), c in zip(pairs.numbers().tolist(), pairs.counts.tolist())
+        ],
+    }
+
+def build_public_stats(contest: int, draw_date: str, masks: List[int], windows: List[int]) -> dict:
+    # masks = últimos max(windows) concursos, mais recente primeiro
+    return {
+        "format": FORMAT_VERSION,
+        "contest": contest,
+        "draw_date": draw_date,
+        "built_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "windows": {str(w): window_public_stats(masks[:w]) for w in sorted(set(windows))},
+    }
+
+def write_public_stats(path: str, doc: dict) -> None:
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".public-stats-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(doc, f, ensure_ascii=False, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def _last_modified(doc: dict) -> str:
+    # data do concurso mais recente (igual em todo worker/host); sem data, a hora do build
+    try:
+        when = datetime.strptime(doc.get("draw_date") or "", "%d/%m/%Y").replace(tzinfo=timezone.utc)
+    except ValueError:
+        when = datetime.fromisoformat(doc["built_at"])
+    return format_datetime(when, usegmt=True)
+
+class PublicBody:
+    """Uma janela pronta pra responder: JSON, gzip e validadores."""
+
+    __slots__ = ("body", "gzipped", "etag", "last_modified", "contest")
+
+    def __init__(self, doc: dict, window: str):
+        from app.core.wire import dumps
+
+        payload = {"contest": doc["contest"], "draw_date": doc["draw_date"], "window": int(window)}
+        payload.update(doc["windows"][window])
+        self.body = dumps(payload)
+        self.gzipped = gzip.compress(self.body, compresslevel=9, mtime=0)
+        # forte: concurso + janela + hash do conteúdo (reimport que corrige dezenas muda o ETag)
+        digest = hashlib.sha256(self.body).hexdigest()[:12]
+        self.etag = f'"{doc["contest"]}-{window}-{digest}"'
+        self.last_modified = _last_modified(doc)
+        self.contest = doc["contest"]
+
+class PublicStatsReader:
+    """Corpos prontos por janela, recarregados quando o arquivo muda (1 stat por chamada)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._key = None
+        self._bodies: Dict[str, PublicBody] = {}
+        self.reloads = 0
+
+    def current(self) -> Optional[Dict[str, PublicBody]]:
+        if not self.path:
+            return None
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if key != self._key:
+            with self._lock:
+                if key != self._key:
+                    try:
+                        with open(self.path, encoding="utf-8") as f:
+                            doc = json.load(f)
+                        if doc.get("format") != FORMAT_VERSION:
+                            return None
+                        bodies = {w: PublicBody(doc, w) for w in doc["windows"]}
+                    except (OSError, ValueError, KeyError):
+                        return None  # meio escrito/corrompido: quem chama reconstrói
+                    self._bodies, self._key = bodies, key
+                    self.reloads += 1
+        return self._bodies
+
+    @property
+    def loaded(self) -> bool:
+        # já leu algum arquivo (se ele sumiu depois, dá pra reconstruir sem esperar a conferência)
+        return bool(self._bodies)
+
+    def get(self, window: int) -> Tuple[Optional[PublicBody], bool]:
+        # (corpo, arquivo existe?)
+        bodies = self.current()
+        if bodies is None:
+            return None, False
+        return bodies.get(str(window)), True
+
+    def stats(self) -> dict:
+        any_body = next(iter(self._bodies.values()), None)
+        return {
+            "path": self.path,
+            "windows": sorted(int(w) for w in self._bodies),
+            "contest": any_body.contest if any_body else None,
+            "reloads": self.reloads,
+        }
+
+public_stats = PublicStatsReader(settings.PUBLIC_STATS_PATH)
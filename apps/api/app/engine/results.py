@@ -0,0 +1,17 @@
+import numpy as np
+
+from app.engine.bitmask import split_mask
+
+# Conferência: acertos = popcount(aposta AND concurso) nas duas metades da máscara,
+# vetorizado pra um lote inteiro de apostas (colunas mask_lo/mask_hi do banco).
+
+PRIZE_HITS = (20, 19, 18, 17, 16, 15, 0)  # faixas premiadas da Lotomania
+
+def count_hits(mask_lo: np.ndarray, mask_hi: np.ndarray, draw_mask: int) -> np.ndarray:
+    d_lo, d_hi = split_mask(draw_mask)
+    lo = np.asarray(mask_lo, dtype=np.int64).view(np.uint64)
+    hi = np.asarray(mask_hi, dtype=np.int64).view(np.uint64)
+    return (np.bitwise_count(lo & np.uint64(d_lo)) + np.bitwise_count(hi & np.uint64(d_hi))).astype(np.int16)
+
+def is_prize(hits: int) -> bool:
+    return hits in PRIZE_HITS
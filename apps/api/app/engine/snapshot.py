@@ -0,0 +1,172 @@
+from typing import Callable, List, Optional, Tuple
+import fcntl
+import os
+import struct
+import tempfile
+import threading
+
+import numpy as np
+
+from app.core.config import settings
+from app.engine.bitmask import HALF, from_mask
+
+# Snapshot do histórico de concursos num arquivo binário mapeado em memória.
+# Todo worker mapeia o mesmo arquivo só pra leitura (o SO divide as páginas);
+# o import grava um arquivo novo e troca com os.replace (atômico). Quem já
+# tinha o antigo mapeado continua lendo ele até perceber a troca pelo stat.
+#
+# A versão no cabeçalho é a do conteúdo (data_versions "draws" no banco, que sobe a cada
+# import que muda concurso, inclusive correção de concurso antigo): snapshot com versão
+# diferente da do banco está velho. Quem regrava é o import; fora dele, só em segundo
+# plano e um por host (flock), nunca dentro do request.
+#
+# Layout: cabeçalho fixo + linhas de 24 bytes em ordem crescente de concurso.
+
+MAGIC = b"LTMSNAP\x00"
+FORMAT_VERSION = 2
+_HEADER = struct.Struct("<8sIIQQ")  # magic, formato, bytes por linha, linhas, versão do conteúdo
+ROW = np.dtype([("contest", "<i4"), ("pad", "<i4"), ("lo", "<u8"), ("hi", "<u8")])
+
+class SnapshotError(Exception):
+    """Arquivo de snapshot ausente, truncado ou de outro formato."""
+
+class DrawSnapshot:
+    """Uma versão do snapshot, mapeada só leitura."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+        if len(header) != _HEADER.size:
+            raise SnapshotError("cabeçalho truncado")
+        magic, fmt, row_size, n_rows, version = _HEADER.unpack(header)
+        if magic != MAGIC or fmt != FORMAT_VERSION or row_size != ROW.itemsize:
+            raise SnapshotError(f"formato desconhecido ({magic!r}, v{fmt}, {row_size} bytes/linha)")
+        if os.path.getsize(path) != _HEADER.size + n_rows * ROW.itemsize:
+            raise SnapshotError("tamanho não bate com o cabeçalho")
+
+        self.version = version
+        self.rows = (
+            np.memmap(path, dtype=ROW, mode="r", offset=_HEADER.size, shape=(n_rows,))
+            if n_rows else np.zeros(0, dtype=ROW)
+        )
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def head_contest(self) -> Optional[int]:
+        return int(self.rows["contest"][-1]) if len(self.rows) else None
+
+    def window_masks(self, window: int) -> List[int]:
+        # últimos `window` concursos como máscaras de 100 bits, mais recente primeiro (igual à query do generate)
+        tail = self.rows[-window:][::-1] if window > 0 else self.rows[:0]
+        return [lo | (hi << HALF) for lo, hi in zip(tail["lo"].tolist(), tail["hi"].tolist())]
+
+    def history(self) -> List[Tuple[int, List[int]]]:
+        # (concurso, dezenas) em ordem crescente, mesmo formato do crud.get_draw_history
+        return [
+            (contest, from_mask(lo | (hi << HALF)))
+            for contest, lo, hi in zip(
+                self.rows["contest"].tolist(), self.rows["lo"].tolist(), self.rows["hi"].tolist()
+            )
+        ]
+
+def write_snapshot(path: str, rows: List[Tuple[int, int, int]], version: int) -> int:
+    """Grava (concurso, mask_lo, mask_hi) num arquivo novo e troca atomicamente. Devolve a versão."""
+    arr = np.zeros(len(rows), dtype=ROW)
+    if rows:
+        contests, lo, hi = zip(*rows)
+        arr["contest"], arr["lo"], arr["hi"] = contests, lo, hi
+        arr = arr[np.argsort(arr["contest"], kind="stable")]
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".draws-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, ROW.itemsize, len(arr), version))
+            f.write(arr.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return version
+
+class SnapshotReader:
+    """Devolve o snapshot atual do arquivo; troca de mapa só quando o arquivo muda (1 stat por chamada)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._snap: Optional[DrawSnapshot] = None
+        self._key = None
+        self._rebuild_lock = threading.Lock()
+        self.reloads = 0
+        self.rebuilds = 0
+        self.rebuild_errors = 0
+
+    def current(self) -> Optional[DrawSnapshot]:
+        if not self.path:
+            return None
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if key != self._key:
+            with self._lock:
+                if key != self._key:
+                    try:
+                        snap = DrawSnapshot(self.path)
+                    except (OSError, SnapshotError):
+                        return None  # meio escrito/corrompido: quem chama cai no banco
+                    self._snap, self._key = snap, key
+                    self.reloads += 1
+        return self._snap
+
+    def rebuild(self, write: Callable[[], object], wait: bool = False) -> bool:
+        """Roda `write` (que regrava o arquivo) com o lock do host; sem `wait`, pula se alguém já está gravando."""
+        if not self._rebuild_lock.acquire(blocking=wait):
+            return False
+        try:
+            # lock de arquivo: os outros workers do host (processos) também respeitam
+            with open(self.path + ".lock", "a") as lock_file:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if wait else fcntl.LOCK_NB))
+                except BlockingIOError:
+                    return False
+                write()
+                self.rebuilds += 1
+                return True  # o flock sai junto com o arquivo
+        finally:
+            self._rebuild_lock.release()
+
+    def rebuild_in_background(self, write: Callable[[], object]) -> None:
+        # request que achou o snapshot velho não espera: usa o banco e deixa isso pra uma thread
+        if not self.path or self._rebuild_lock.locked():
+            return
+        threading.Thread(target=self._rebuild_quietly, args=(write,), name="snapshot-rebuild", daemon=True).start()
+
+    def _rebuild_quietly(self, write: Callable[[], object]) -> None:
+        try:
+            self.rebuild(write)
+        except Exception:
+            self.rebuild_errors += 1  # próxima conferência tenta de novo
+
+    def stats(self) -> dict:
+        snap = self._snap
+        return {
+            "path": self.path,
+            "rows": len(snap) if snap is not None else 0,
+            "head_contest": snap.head_contest if snap is not None else None,
+            "version": snap.version if snap is not None else None,
+            "reloads": self.reloads,
+            "rebuilds": self.rebuilds,
+            "rebuild_errors": self.rebuild_errors,
+        }
+
+draw_snapshot = SnapshotReader(settings.DRAW_SNAPSHOT_PATH)
@@ -0,0 +1,129 @@
+from dataclasses import dataclass, field
+from typing import List, Tuple
+import io
+import itertools
+
+import numpy as np
+
+from app.engine.cooccurrence import _C2, _C3, N_PAIRS, N_TRIPLES, PAIR_IDS, TRIPLE_IDS, TupleCounts
+
+# Estatísticas da janela mantidas de forma incremental: entra o concurso novo,
+# sai o que caiu da janela. Pares/trincas ficam em vetores densos indexados pelo
+# número combinatório (colex): idx(a<b) = C(b,2) + a ; idx(a<b<c) = C(c,3) + C(b,2) + a
+
+# posições das combinações dentro de um concurso de 20 dezenas ordenadas
+_POS2 = np.array(list(itertools.combinations(range(20), 2)), dtype=np.intp)
+_POS3 = np.array(list(itertools.combinations(range(20), 3)), dtype=np.intp)
+
+def _draw_indices(numbers: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+    s = np.array(sorted(numbers), dtype=np.int64)
+    if len(s) == 20:
+        p2, p3 = _POS2, _POS3
+    else:
+        p2 = np.array(list(itertools.combinations(range(len(s)), 2)), dtype=np.intp).reshape(-1, 2)
+        p3 = np.array(list(itertools.combinations(range(len(s)), 3)), dtype=np.intp).reshape(-1, 3)
+    pairs = _C2[s[p2[:, 1]]] + s[p2[:, 0]]
+    triples = _C3[s[p3[:, 2]]] + _C2[s[p3[:, 1]]] + s[p3[:, 0]]
+    return pairs, triples
+
+@dataclass
+class WindowStats:
+    window: int
+    seq: int = -1                      # seq do concurso mais recente (cresce 1 por concurso)
+    contests: List[int] = field(default_factory=list)        # mais recente primeiro
+    draws: List[List[int]] = field(default_factory=list)     # idem
+    freq: np.ndarray = field(default_factory=lambda: np.zeros(100, dtype=np.int32))
+    last_seen: np.ndarray = field(default_factory=lambda: np.full(100, -1, dtype=np.int32))
+    pair_count: np.ndarray = field(default_factory=lambda: np.zeros(N_PAIRS, dtype=np.int16))
+    pair_last: np.ndarray = field(default_factory=lambda: np.full(N_PAIRS, -1, dtype=np.int32))
+    triple_count: np.ndarray = field(default_factory=lambda: np.zeros(N_TRIPLES, dtype=np.int16))
+    triple_last: np.ndarray = field(default_factory=lambda: np.full(N_TRIPLES, -1, dtype=np.int32))
+
+    def __len__(self) -> int:
+        return len(self.draws)
+
+    @property
+    def head_contest(self):
+        return self.contests[0] if self.contests else None
+
+    @classmethod
+    def build(cls, window: int, history: List[Tuple[int, List[int]]]) -> "WindowStats":
+        # history: (concurso, dezenas) em ordem crescente de concurso
+        stats = cls(window=window)
+        for contest, numbers in history[-window:]:
+            stats.push(contest, numbers)
+        return stats
+
+    def push(self, contest: int, numbers: List[int]) -> None:
+        if self.contests and contest <= self.contests[0]:
+            raise ValueError(f"Concurso {contest} não é mais novo que {self.contests[0]}")
+
+        if len(self.draws) >= self.window:
+            self._pop_oldest()
+
+        self.seq += 1
+        pairs, triples = _draw_indices(numbers)
+        self.freq[numbers] += 1
+        self.last_seen[numbers] = self.seq
+        self.pair_count[pairs] += 1
+        self.pair_last[pairs] = self.seq
+        self.triple_count[triples] += 1
+        self.triple_last[triples] = self.seq
+        self.contests.insert(0, contest)
+        self.draws.insert(0, list(numbers))
+
+    def _pop_oldest(self) -> None:
+        # last_seen não precisa mexer: se a dezena/par ainda está na janela,
+        # a aparição mais recente é mais nova que a que saiu
+        self.contests.pop()
+        numbers = self.draws.pop()
+        pairs, triples = _draw_indices(numbers)
+        self.freq[numbers] -= 1
+        self.pair_count[pairs] -= 1
+        self.triple_count[triples] -= 1
+
+    def features(self) -> dict:
+        # mesmo formato do _window_features do motor (freq, gap, pares e trincas);
+        # as contagens vão copiadas porque o push seguinte mexe nos vetores
+        seen = self.freq > 0
+        maxv = int(self.freq.max()) if seen.any() else 1
+        gap = np.where(seen, self.seq - self.last_seen.astype(np.int64), len(self.draws) + 5)
+        return {
+            "freq": self.freq.astype(np.int64) / maxv,
+            "gap": gap,
+            "pairs": TupleCounts(2, self.pair_count.copy(), self.pair_last.copy(), PAIR_IDS),
+            "triples": TupleCounts(3, self.triple_count.copy(), self.triple_last.copy(), TRIPLE_IDS),
+        }
+
+    def to_bytes(self) -> bytes:
+        buf = io.BytesIO()
+        np.savez(
+            buf,
+            meta=np.array([self.window, self.seq], dtype=np.int64),
+            contests=np.array(self.contests, dtype=np.int64),
+            draws=np.array(self.draws, dtype=np.int8) if self.draws else np.zeros((0, 20), dtype=np.int8),
+            freq=self.freq,
+            last_seen=self.last_seen,
+            pair_count=self.pair_count,
+            pair_last=self.pair_last,
+            triple_count=self.triple_count,
+            triple_last=self.triple_last,
+        )
+        return buf.getvalue()
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "WindowStats":
+        z = np.load(io.BytesIO(raw))
+        window, seq = (int(x) for x in z["meta"])
+        return cls(
+            window=window,
+            seq=seq,
+            contests=z["contests"].tolist(),
+            draws=z["draws"].tolist(),
+            freq=z["freq"],
+            last_seen=z["last_seen"],
+            pair_count=z["pair_count"],
+            pair_last=z["pair_last"],
+            triple_count=z["triple_count"],
+            triple_last=z["triple_last"],
+        )
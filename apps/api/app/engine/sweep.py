@@ -0,0 +1,277 @@
+"""Varredura de pesos do LotomaniaConfig contra o histórico (grade ou amostra aleatória).
+
+Tudo que depende só da janela (freq, gap, pares/trincas ranqueados) é calculado
+uma vez por concurso avaliado em cada worker; cada config só refaz score,
+ranking e bilhetes. O histórico vai pros workers como uma matriz (concursos × 100)
+em memória compartilhada, sem pickle por worker. Cada config avaliado vira uma
+linha no checkpoint (JSONL), então uma varredura interrompida continua de onde parou:
+
+    python -m app.engine.sweep --window 60 --contests 300 --random 2000 \\
+        --range w_freq=0.3:0.8 --range w_cycle=0.1:0.5 --range top_pairs=20:200 \\
+        --checkpoint sweep.jsonl --workers 4
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import fields
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import time
+
+import numpy as np
+
+from app.engine.bitmask import to_mask
+from app.engine.lotomania import (
+    LotomaniaConfig, _RANKING_FIELDS, _ranking_from_scores, _scores_from_features, assemble_tickets,
+)
+from app.engine.stats import WindowStats
+
+FIELD_TYPES = {f.name: f.type for f in fields(LotomaniaConfig) if f.name in _RANKING_FIELDS}
+RANK_BY = ("mean_hits", "mean_best_hits", "prize_rate")
+
+def grid_candidates(grid: Dict[str, Sequence]) -> List[dict]:
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+def random_candidates(ranges: Dict[str, Tuple[float, float]], n: int, seed: int = 0) -> List[dict]:
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        cand = {}
+        for name in sorted(ranges):
+            lo, hi = ranges[name]
+            if FIELD_TYPES[name] is int:
+                cand[name] = rng.randint(int(lo), int(hi))
+            else:
+                cand[name] = round(rng.uniform(lo, hi), 4)
+        out.append(cand)
+    return out
+
+# estado por processo do pool, montado uma vez no initializer
+_W: dict = {}
+
+def _init_worker(shm_name: Optional[str], shape: Tuple[int, int], matrix: Optional[np.ndarray],
+                 contests: List[int], window: int, first: int, top_pairs: int, top_triples: int) -> None:
+    if shm_name is not None:
+        # só leitura; quem criou (o processo pai) é quem faz o unlink no fim
+        shm = shared_memory.SharedMemory(name=shm_name)
+        matrix = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+        _W["shm"] = shm
+
+    # janela deslizante até cada concurso avaliado; guarda só o top dos pares/trincas que algum config usa
+    history = [(contests[i], np.flatnonzero(matrix[i]).tolist()) for i in range(first - window, len(contests))]
+    stats = WindowStats.build(window, history[:window])
+    targets = []
+    for contest, numbers in history[window:]:
+        feat = stats.features()
+        feat["pairs"] = feat["pairs"].top(top_pairs)
+        feat["triples"] = feat["triples"].top(top_triples)
+        targets.append((str(stats.head_contest), feat, to_mask(numbers)))
+        stats.push(contest, numbers)
+    _W["targets"] = targets
+
+def _evaluate(base: dict, cand: dict, user_id: int) -> Tuple[dict, List[int]]:
+    cfg = LotomaniaConfig(**base, **cand)
+    hits_hist = np.zeros(21, dtype=np.int64)
+    best_hist = np.zeros(21, dtype=np.int64)
+    for base_draw_id, feat, drawn in _W["targets"]:
+        ranking = _ranking_from_scores(*_scores_from_features(feat, cfg), cfg)
+        tickets, _ = assemble_tickets(user_id, base_draw_id, ranking, cfg)
+        hits = [(to_mask(t) & drawn).bit_count() for t in tickets]
+        np.add.at(hits_hist, hits, 1)
+        best_hist[max(hits)] += 1
+    return _summary(hits_hist, best_hist), hits_hist.tolist()
+
+def _evaluate_job(idx: int, base: dict, cand: dict, user_id: int) -> Tuple[int, dict, List[int]]:
+    stats, hist = _evaluate(base, cand, user_id)
+    return idx, stats, hist
+
+def _summary(hits_hist: np.ndarray, best_hist: np.ndarray) -> dict:
+    k = np.arange(21)
+    n_tickets = int(hits_hist.sum())
+    n_contests = int(best_hist.sum())
+    mean = float((hits_hist * k).sum() / n_tickets)
+    return {
+        "mean_hits": round(mean, 4),
+        "std_hits": round(float(np.sqrt((hits_hist * (k - mean) ** 2).sum() / n_tickets)), 4),
+        "mean_best_hits": round(float((best_hist * k).sum() / n_contests), 4),
+        "prize_rate": round(float((hits_hist[15:].sum() + hits_hist[0]) / n_tickets), 6),  # 15..20 ou 0 acertos
+        "best_hits_histogram": best_hist.tolist(),
+    }
+
+def _sweep_key(header: dict) -> str:
+    return hashlib.sha256(json.dumps(header, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+def _load_checkpoint(path: str, key: str) -> Dict[int, dict]:
+    done: Dict[int, dict] = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if "sweep" in row:
+                if row["sweep"] != key:
+                    raise ValueError(f"{path} é checkpoint de outra varredura (apague ou use outro arquivo).")
+                continue
+            done[row["id"]] = row
+    return done
+
+def run_sweep(
+    history: List[Tuple[int, List[int]]],
+    candidates: List[dict],
+    window: int = 60,
+    count: int = 10,
+    eval_contests: int = 300,
+    user_id: int = 0,
+    workers: int = 0,
+    checkpoint: Optional[str] = None,
+    rank_by: str = "mean_hits",
+    progress: bool = False,
+) -> List[dict]:
+    """Avalia cada candidato nos últimos `eval_contests` concursos e devolve os resultados ranqueados.
+
+    history: (concurso, dezenas) em ordem crescente. Candidatos = dicts só com campos
+    de score (FIELD_TYPES). Com `checkpoint`, candidatos já gravados lá não rodam de novo.
+    """
+    if rank_by not in RANK_BY:
+        raise ValueError(f"rank_by deve ser um de {RANK_BY}")
+    for cand in candidates:
+        unknown = set(cand) - set(FIELD_TYPES)
+        if unknown:
+            raise ValueError(f"Campos que não são de score: {sorted(unknown)}")
+    first = max(window, len(history) - eval_contests)
+    if first >= len(history):
+        raise ValueError("Histórico curto demais pra essa janela.")
+
+    contests = [c for c, _ in history]
+    base = {"count": count, "window": window}
+    header = {
+        "window": window, "count": count, "user_id": user_id,
+        "contests": [contests[first], contests[-1]],
+        "candidates": _sweep_key({"c": candidates}),
+    }
+    key = _sweep_key(header)
+    done = _load_checkpoint(checkpoint, key) if checkpoint else {}
+    pending = [i for i in range(len(candidates)) if i not in done]
+
+    # o top que algum candidato pede (o resto do ranking de pares/trincas não é guardado)
+    default = LotomaniaConfig(count=1)
+    top_pairs = max(c.get("top_pairs", default.top_pairs) for c in candidates)
+    top_triples = max(c.get("top_triples", default.top_triples) for c in candidates)
+
+    out = open(checkpoint, "a", encoding="utf-8") if checkpoint else None
+    if out is not None and not done:
+        out.write(json.dumps({"sweep": key, **header}) + "\n")
+
+    def record(idx: int, stats: dict, hist: List[int]) -> None:
+        row = {"id": idx, "config": candidates[idx], **stats, "hits_histogram": hist}
+        done[idx] = row
+        if out is not None:
+            out.write(json.dumps(row) + "\n")
+            out.flush()
+        if progress:
+            print(f"[{len(done)}/{len(candidates)}] #{idx} {rank_by}={stats[rank_by]}", flush=True)
+
+    matrix = np.zeros((len(history), 100), dtype=np.uint8)
+    for i, (_, nums) in enumerate(history):
+        matrix[i, nums] = 1
+    t0 = time.perf_counter()
+    try:
+        if pending and workers <= 0:
+            _init_worker(None, matrix.shape, matrix, contests, window, first, top_pairs, top_triples)
+            for idx in pending:
+                record(idx, *_evaluate(base, candidates[idx], user_id))
+        elif pending:
+            shm = shared_memory.SharedMemory(create=True, size=matrix.nbytes)
+            try:
+                np.ndarray(matrix.shape, dtype=np.uint8, buffer=shm.buf)[:] = matrix
+                ctx = multiprocessing.get_context("spawn")
+                initargs = (shm.name, matrix.shape, None, contests, window, first, top_pairs, top_triples)
+                with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                         initializer=_init_worker, initargs=initargs) as pool:
+                    futs = [pool.submit(_evaluate_job, idx, base, candidates[idx], user_id) for idx in pending]
+                    for fut in as_completed(futs):
+                        record(*fut.result())
+            finally:
+                shm.close()
+                shm.unlink()
+    finally:
+        if out is not None:
+            out.close()
+
+    if progress and pending:
+        print(f"{len(pending)} configs em {time.perf_counter() - t0:.1f}s", flush=True)
+    return sorted(done.values(), key=lambda r: (-r[rank_by], -r["mean_hits"], r["id"]))
+
+def _parse_value(name: str, raw: str):
+    return FIELD_TYPES[name](raw)
+
+def _parse_pairs(items: Iterable[str]) -> Dict[str, str]:
+    out = {}
+    for item in items:
+        name, _, raw = item.partition("=")
+        if name not in FIELD_TYPES:
+            raise SystemExit(f"campo desconhecido: {name} (use um de {sorted(FIELD_TYPES)})")
+        out[name] = raw
+    return out
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Varredura de pesos do LotomaniaConfig contra o histórico do banco")
+    ap.add_argument("--window", type=int, default=60)
+    ap.add_argument("--count", type=int, default=10, help="bilhetes por concurso")
+    ap.add_argument("--contests", type=int, default=300, help="últimos N concursos avaliados")
+    ap.add_argument("--user-id", type=int, default=0)
+    ap.add_argument("--grid", action="append", default=[], help="campo=v1,v2,... (produto cartesiano)")
+    ap.add_argument("--range", action="append", default=[], help="campo=min:max (amostra aleatória)")
+    ap.add_argument("--random", type=int, default=0, help="quantos configs aleatórios")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--checkpoint", help="JSONL de resultados parciais (retoma se já existir)")
+    ap.add_argument("--rank-by", choices=RANK_BY, default="mean_hits")
+    ap.add_argument("--top", type=int, default=20)
+    ap.add_argument("--out", help="grava o ranking completo em JSON")
+    args = ap.parse_args(argv)
+
+    candidates = []
+    if args.grid:
+        grid = {n: [_parse_value(n, v) for v in raw.split(",")] for n, raw in _parse_pairs(args.grid).items()}
+        candidates += grid_candidates(grid)
+    if args.random:
+        ranges = {}
+        for n, raw in _parse_pairs(args.range).items():
+            lo, _, hi = raw.partition(":")
+            ranges[n] = (float(lo), float(hi))
+        candidates += random_candidates(ranges, args.random, seed=args.seed)
+    if not candidates:
+        raise SystemExit("nada pra varrer: use --grid e/ou --random com --range")
+
+    from app.db.session import SessionLocal
+    from app.db import crud
+
+    db = SessionLocal()
+    try:
+        history = crud.get_draw_history(db)
+    finally:
+        db.close()
+
+    ranked = run_sweep(
+        history, candidates, window=args.window, count=args.count, eval_contests=args.contests,
+        user_id=args.user_id, workers=args.workers, checkpoint=args.checkpoint,
+        rank_by=args.rank_by, progress=True,
+    )
+    for pos, row in enumerate(ranked[: args.top], start=1):
+        print(f"{pos:3d}. {row[args.rank_by]:.4f}  mean={row['mean_hits']:.4f}  best={row['mean_best_hits']:.3f}  {row['config']}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(ranked, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+from dataclasses import dataclass
+from typing import List, Tuple
+import time
+
+import numpy as np
+
+from app.core.metrics import note
+from app.engine.bitmask import HALF
+from app.engine.lotomania import Ranking, _stable_seed
+
+# Modo bolão: milhares de bilhetes por rodada. Bilhete = duas palavras uint64
+# (lo = dezenas 00..49, hi = 50..99) e o teste de overlap é AND + popcount
+# vetorizado contra todos os bilhetes já aceitos.
+
+SYNDICATE_NOTES = [
+    "modo bolão: bilhetes como máscaras de 100 bits, overlap por AND + popcount",
+    "amostragem ponderada pelo score, penalizando dezenas já muito usadas",
+    "entre os candidatos válidos fica o que mais cobre pares ainda pouco cobertos das top dezenas",
+    "determinístico: user_id + base_draw_id + índice do bilhete",
+]
+
+_POW = np.left_shift(np.uint64(1), np.arange(HALF, dtype=np.uint64))
+
+@dataclass
+class SyndicateConfig:
+    count: int
+    ticket_size: int = 50
+    overlap_max: int = 40          # com milhares de bilhetes o 30 do modo normal é inviável
+    focus_size: int = 30           # top dezenas do ranking cuja cobertura (dezenas e pares) é perseguida
+    candidates: int = 8            # candidatos sorteados por bilhete; fica o de maior ganho de cobertura
+    max_attempts: int = 6          # rodadas de candidatos antes de aceitar o de menor overlap
+    balance: float = 1.0           # quanto o uso acumulado de uma dezena derruba o peso dela
+    w_score: float = 0.05          # desempate pelo score médio do bilhete
+
+def _pack(member: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    lo = (member[:, :HALF].astype(np.uint64) * _POW).sum(axis=1, dtype=np.uint64)
+    hi = (member[:, HALF:].astype(np.uint64) * _POW).sum(axis=1, dtype=np.uint64)
+    return lo, hi
+
+def generate_syndicate_tickets(
+    user_id: int,
+    base_draw_id: str,
+    ranking: Ranking,
+    cfg: SyndicateConfig
+) -> Tuple[List[List[int]], List[int], dict]:
+    """Gera cfg.count bilhetes com overlap <= cfg.overlap_max e cobertura das top dezenas/pares.
+
+    Cada bilhete sai de `candidates` amostras ponderadas (score, penalizado pelo uso
+    acumulado da dezena); ganha a válida que cobre mais pares do foco ainda pouco
+    cobertos. Determinístico em (user_id, base_draw_id, índice do bilhete).
+    Devolve (bilhetes, seeds, relatório de cobertura).
+    """
+    t0 = time.perf_counter()
+    n, size, c = cfg.count, cfg.ticket_size, cfg.candidates
+
+    scores = np.array(ranking.scores, dtype=np.float64)
+    logw = np.log(np.maximum(scores, 1e-9))
+    order = np.array(ranking.nucleus + ranking.ranked, dtype=np.intp)
+    focus = order[: cfg.focus_size]
+    f = len(focus)
+
+    usage = np.zeros(100, dtype=np.float64)
+    pair_cov = np.zeros((f, f), dtype=np.float64)
+    upper = np.triu(np.ones((f, f), dtype=bool), k=1)
+
+    acc_lo = np.zeros(n, dtype=np.uint64)
+    acc_hi = np.zeros(n, dtype=np.uint64)
+    tickets: List[List[int]] = []
+    seeds: List[int] = []
+    max_overlap = 0
+    violations = 0
+    rows = np.arange(c)[:, None]
+
+    for i in range(n):
+        seed = _stable_seed(user_id, base_draw_id, salt=f"bolao-{i+1}")
+        rng = np.random.default_rng(seed)
+        keys_base = logw - cfg.balance * np.log1p(usage)
+        pair_w = np.where(upper, 1.0 / (1.0 + pair_cov), 0.0)
+
+        best = None  # (válido?, overlap, member, lo, hi)
+        for attempt in range(cfg.max_attempts):
+            # amostra ponderada sem reposição (Gumbel top-k), c candidatos de uma vez
+            keys = keys_base + rng.gumbel(size=(c, 100))
+            pick = np.argpartition(-keys, size - 1, axis=1)[:, :size]
+            member = np.zeros((c, 100), dtype=bool)
+            member[rows, pick] = True
+            lo, hi = _pack(member)
+
+            if i:
+                ov = (
+                    np.bitwise_count(acc_lo[:i] & lo[:, None])
+                    + np.bitwise_count(acc_hi[:i] & hi[:, None])
+                ).max(axis=1).astype(np.int64)
+            else:
+                ov = np.zeros(c, dtype=np.int64)
+
+            fm = member[:, focus].astype(np.float64)
+            gain = np.einsum("cf,fg,cg->c", fm, pair_w, fm) + cfg.w_score * (member @ scores) / size
+
+            valid = ov <= cfg.overlap_max
+            if valid.any():
+                j = int(np.argmax(np.where(valid, gain, -np.inf)))
+                best = (True, int(ov[j]), member[j], lo[j], hi[j])
+                break
+            j = int(np.lexsort((-gain, ov))[0])
+            if best is None or ov[j] < best[1]:
+                best = (False, int(ov[j]), member[j], lo[j], hi[j])
+
+        ok, ov_j, chosen, lo_j, hi_j = best
+        if attempt:
+            note("syndicate_resamples", attempt)
+        if not ok:
+            violations += 1
+            note("syndicate_overlap_violations")
+        max_overlap = max(max_overlap, ov_j)
+
+        acc_lo[i], acc_hi[i] = lo_j, hi_j
+        usage += chosen
+        fc = chosen[focus]
+        pair_cov += np.outer(fc, fc)
+        tickets.append(np.flatnonzero(chosen).tolist())
+        seeds.append(seed)
+
+    focus_use = usage[focus]
+    pairs_cov = pair_cov[upper]
+    report = {
+        "tickets": n,
+        "overlap_max": cfg.overlap_max,
+        "max_overlap": max_overlap,
+        "overlap_violations": violations,
+        "focus_numbers": focus.tolist(),
+        "focus_numbers_covered": float((focus_use > 0).mean()) if f else 0.0,
+        "focus_number_usage": {"min": int(focus_use.min()), "max": int(focus_use.max())} if f else {},
+        "focus_pairs_covered": float((pairs_cov > 0).mean()) if len(pairs_cov) else 0.0,
+        "focus_pair_usage": {
+            "min": int(pairs_cov.min()), "mean": round(float(pairs_cov.mean()), 2), "max": int(pairs_cov.max())
+        } if len(pairs_cov) else {},
+        "numbers_covered": int((usage > 0).sum()),
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000, 1),
+    }
+    return tickets, seeds, report
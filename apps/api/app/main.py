@@ -1,19 +1,132 @@
-from fastapi import FastAPI
-from app.db.session import engine, Base
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+import time
+from app.core import metrics
+from app.core.config import settings
+from app.core.warmup import warmup
+from app.db.session import engine, Base, SessionLocal
 from app.routes.auth import router as auth_router
 from app.routes.generate import router as gen_router
 from app.routes.billing import router as billing_router
 from app.routes.admin_draws import router as admin_router
+from app.routes.results import router as results_router
+from app.routes.stats import router as stats_router
 
-app = FastAPI(title="Lotomania SaaS API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # nada de banco no import do módulo: schema só aqui, e só em dev (DB_AUTO_MIGRATE ou
+    # SQLite); em produção as migrações rodam uma vez no release, não em cada worker
+    from app.core.stripe_inbox import stripe_inbox
+    from app.engine.executor import engine_executor, backtest_executor
 
-Base.metadata.create_all(bind=engine)
+    if settings.DB_AUTO_MIGRATE or engine.dialect.name == "sqlite":
+        from app.db.migrations import run_migrations
+        Base.metadata.create_all(bind=engine)
+        run_migrations(engine)
+    if settings.STRIPE_ENABLED:
+        stripe_inbox.start()
+    warmup.start()  # em segundo plano: o worker já aceita conexão, o /ready diz quando vale mandar tráfego
+    yield
+    warmup.stop()
+    stripe_inbox.stop()
+    engine_executor.shutdown()
+    backtest_executor.shutdown()
+
+app = FastAPI(title="Lotomania SaaS API", lifespan=lifespan)
+
+metrics.instrument_engine(engine)
 
 app.include_router(auth_router)
 app.include_router(gen_router)
 app.include_router(billing_router)
 app.include_router(admin_router)
+app.include_router(results_router)
+app.include_router(stats_router)
+
+def _register_gauges():
+    from app.engine.cache import ranking_cache
+    from app.engine.executor import engine_executor
+
+    metrics.register(metrics.Gauge("lotomania_engine_inflight", "Jobs do motor em voo.", lambda: engine_executor.inflight))
+    metrics.register(metrics.Gauge("lotomania_engine_rejected_total", "Jobs recusados com 429.", lambda: engine_executor.rejected, kind="counter"))
+    metrics.register(metrics.Gauge("lotomania_engine_timeouts_total", "Jobs que estouraram o tempo.", lambda: engine_executor.timeouts, kind="counter"))
+    metrics.register(metrics.Gauge("lotomania_ranking_cache_hits_total", "Acertos do cache de ranking.", lambda: ranking_cache.hits, kind="counter"))
+    metrics.register(metrics.Gauge("lotomania_ranking_cache_misses_total", "Faltas do cache de ranking.", lambda: ranking_cache.misses, kind="counter"))
+
+_register_gauges()
+
+@app.middleware("http")
+async def timing_middleware(request: Request, call_next):
+    # tempo por etapa do request -> header Server-Timing + histogramas do /metrics
+    timings = metrics.begin_request()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        response.headers["Server-Timing"] = timings.header()
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = getattr(route, "path", "<unmatched>")  # template da rota, não a URL (cardinalidade)
+        elapsed = time.perf_counter() - timings.started
+        metrics.REQUESTS.inc(method=request.method, route=path, status=status)
+        metrics.REQUEST_SECONDS.observe(elapsed, method=request.method, route=path)
 
 @app.get("/health")
 def health():
     return {"status": "ok"}
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/ready")
+def ready(wait: float = 0.0):
+    # 503 até o aquecimento terminar; ?wait=N segura até N s (máx. 30) esperando ficar pronto
+    if not warmup.wait(min(max(wait, 0.0), 30.0)):
+        return JSONResponse(status_code=503, content=warmup.status())
+    return warmup.status()
+
+def _warm_imports():
+    # o que ficou preguiçoso pra não pesar no boot: motor, bcrypt, jose
+    import app.engine.lotomania  # noqa: F401
+    import app.engine.cache  # noqa: F401
+    from jose import jwt  # noqa: F401
+    from app.core.security import hash_password
+    hash_password("warmup")  # carrega o backend do bcrypt
+
+def _warm_snapshot():
+    # snapshot ausente: um worker do host grava (lock), os outros só mapeiam o que ele gravou
+    from app.engine.snapshot import draw_snapshot
+    from app.routes.generate import write_draw_snapshot
+
+    if draw_snapshot.path and draw_snapshot.current() is None:
+        draw_snapshot.rebuild(write_draw_snapshot)
+
+def _warm_engine():
+    from app.engine.executor import engine_executor
+    engine_executor.warm()
+
+def _warm_rankings():
+    # ranking do concurso atual nas janelas mais pedidas já no cache (banco vazio = nada a aquecer)
+    from sqlalchemy import func
+    from app.db import models
+    from app.engine.lotomania import LotomaniaConfig
+    from app.routes.generate import _load_ranking
+
+    db = SessionLocal()
+    try:
+        latest = db.query(func.max(models.Draw.contest)).filter(models.Draw.lottery == "lotomania").scalar()
+        n_draws = db.query(func.count(models.Draw.id)).filter(models.Draw.lottery == "lotomania").scalar()
+        if latest is None or n_draws < 20:
+            return
+        for window in settings.WARMUP_WINDOWS:
+            _load_ranking(db, latest, window, LotomaniaConfig(count=1, window=window))
+    finally:
+        db.close()
+
+warmup.add("imports", _warm_imports)
+warmup.add("snapshot", _warm_snapshot)
+warmup.add("engine", _warm_engine)
+warmup.add("rankings", _warm_rankings)
@@ -1,11 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
-from app.db.session import get_db
+from pydantic import BaseModel, conint
+from app.db.session import get_db, SessionLocal
 from app.core.security import decode_token
-from app.db import models
+from app.db import crud
+from app.engine.cache import ranking_cache
+from app.engine.executor import engine_executor, backtest_executor
+from app.engine.snapshot import draw_snapshot
+from app.engine.bitmask import to_mask
+from app.core.config import settings
+from app.core.entitlements import entitlements
+from app.core.stripe_inbox import stripe_inbox
+from app.core import export, metrics
+from typing import Iterable, Iterator, List, Literal, Optional
+import io
 import re
+import time
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 auth_scheme = HTTPBearer()
@@ -22,44 +33,211 @@ class ImportIn(BaseModel):
     lottery: str = "lotomania"
     raw_text: str
 
-def parse_draws(raw_text: str):
-    lines = [l.strip() for l in raw_text.splitlines() if l.strip()]
-    out = []
+class BacktestIn(BaseModel):
+    window: conint(ge=20, le=200) = 60
+    count: conint(ge=1, le=50) = 10
+    user_id: int = 0                       # seeds dos bilhetes (cada usuário tem os seus)
+    start_contest: Optional[int] = None
+    end_contest: Optional[int] = None
+    # pesos a testar; None = padrão do LotomaniaConfig
+    nucleus_size: Optional[conint(ge=0, le=50)] = None
+    w_freq: Optional[float] = None
+    w_recency: Optional[float] = None
+    w_cycle: Optional[float] = None
+    target_gap_draws: Optional[float] = None
+    sigma_gap_draws: Optional[float] = None
+    w_pair: Optional[float] = None
+    w_triple: Optional[float] = None
+    top_pairs: Optional[conint(ge=0, le=4950)] = None
+    top_triples: Optional[conint(ge=0, le=5000)] = None
+
+_LINE_RE = re.compile(r"(\d+)\s*-\s*([\d/]+)\s*-\s*(.+)$")
+
+def parse_draw_line(line: str):
+    # "2650 - 09/01/2026 - 02 03 ..." -> (concurso, data, csv, máscara); None se não for linha de concurso
+    m = _LINE_RE.match(line.strip())
+    if not m:
+        return None
+    contest = int(m.group(1))
+    date_br = m.group(2).strip()
+    nums = [int(x) for x in m.group(3).split()]
+    if len(nums) != 20:
+        raise ValueError(f"Concurso {contest}: esperado 20 dezenas, veio {len(nums)}")
+    # a máscara não reclama: dezena repetida vira um bit só e 100+ estoura o mask_hi no banco
+    bad = sorted({n for n in nums if n > 99})
+    if bad:
+        raise ValueError(f"Concurso {contest}: dezena fora de 00..99: {', '.join(map(str, bad))}")
+    if len(set(nums)) != len(nums):
+        dup = sorted({n for n in nums if nums.count(n) > 1})
+        raise ValueError(f"Concurso {contest}: dezena repetida: {', '.join(f'{n:02d}' for n in dup)}")
+    nums_csv = ",".join(f"{n:02d}" for n in sorted(nums))
+    return contest, date_br, nums_csv, to_mask(nums)
+
+def iter_draws(lines: Iterable[str]) -> Iterator[tuple]:
     for line in lines:
-        m = re.match(r"(\d+)\s*-\s*([\d/]+)\s*-\s*(.+)$", line)
-        if not m:
-            continue
-        contest = int(m.group(1))
-        date_br = m.group(2).strip()
-        nums = [int(x) for x in m.group(3).split()]
-        if len(nums) != 20:
-            raise ValueError(f"Concurso {contest}: esperado 20 dezenas, veio {len(nums)}")
-        nums_csv = ",".join(f"{n:02d}" for n in sorted(nums))
-        out.append((contest, date_br, nums_csv))
-    return out
+        if line.strip():
+            draw = parse_draw_line(line)
+            if draw:
+                yield draw
+
+def parse_draws(raw_text: str):
+    return list(iter_draws(raw_text.splitlines()))
+
+def _import_stream(db: Session, draws: Iterable[tuple]) -> dict:
+    """Grava em blocos de IMPORT_CHUNK_SIZE, um INSERT ... ON CONFLICT por bloco, commit no fim."""
+    started = time.perf_counter()
+    inserted = updated = received = chunks = 0
+    changed = []  # concursos novos ou com dezenas alteradas
+
+    upsert_s = 0.0
+    try:
+        for chunk in _chunks(draws, settings.IMPORT_CHUNK_SIZE):
+            t0 = time.perf_counter()
+            ins, upd, chg = crud.upsert_draws(db, chunk)
+            upsert_s += time.perf_counter() - t0
+            inserted += ins
+            updated += upd
+            changed.extend(chg)
+            received += len(chunk)
+            chunks += 1
+        if changed:
+            crud.bump_data_version(db, "draws")  # snapshots de todos os hosts ficam velhos no mesmo commit
+        db.commit()
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    # o parse roda intercalado com os blocos (stream): é o que sobra do laço
+    metrics.observe_stage("import.upsert", upsert_s)
+    metrics.observe_stage("import.parse", time.perf_counter() - started - upsert_s)
+
+    # estatísticas incrementais das janelas (soma o novo, tira o que saiu)
+    with metrics.stage("import.stats"):
+        crud.refresh_window_stats(db, changed)
+
+    # snapshot mapeado do histórico: arquivo novo + os.replace; os workers trocam no próximo stat
+    if changed:
+        with metrics.stage("import.snapshot"):
+            draw_snapshot.rebuild(lambda: crud.rebuild_draw_snapshot(db), wait=True)
+        with metrics.stage("import.public_stats"):
+            crud.rebuild_public_stats(db)
+
+    # conferência das apostas feitas pros concursos que entraram/mudaram
+    with metrics.stage("import.results"):
+        checked = crud.check_results(db, changed)
+
+    # histórico mudou: rankings em cache ficaram velhos
+    ranking_cache.clear()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "inserted": inserted,
+        "updated": updated,
+        "total_received": received,
+        "chunks": chunks,
+        "bets_checked": sum(checked.values()),
+        "elapsed_s": round(elapsed, 3),
+        "rows_per_s": round(received / elapsed, 1) if elapsed > 0 else None,
+    }
+
+def _chunks(items: Iterable[tuple], size: int) -> Iterator[List[tuple]]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
 
 @router.post("/import-draws")
 def import_draws(payload: ImportIn, db: Session = Depends(get_db), _admin: int = Depends(require_admin)):
     if payload.lottery != "lotomania":
         raise HTTPException(status_code=400, detail="Por enquanto só Lotomania.")
 
+    return _import_stream(db, iter_draws(payload.raw_text.splitlines()))
+
+@router.post("/import-draws/upload")
+def import_draws_upload(
+    file: UploadFile = File(...),
+    lottery: str = Form("lotomania"),
+    db: Session = Depends(get_db),
+    _admin: int = Depends(require_admin),
+):
+    # histórico inteiro como arquivo (multipart): lê linha a linha, sem montar o texto todo em memória
+    if lottery != "lotomania":
+        raise HTTPException(status_code=400, detail="Por enquanto só Lotomania.")
+
+    lines = io.TextIOWrapper(file.file, encoding="utf-8", errors="replace")
+    return _import_stream(db, iter_draws(lines))
+
+@router.post("/check-results")
+def check_results(contest: int, db: Session = Depends(get_db), _admin: int = Depends(require_admin)):
+    # reconfere as apostas de um concurso (ex.: sessões antigas, de antes da conferência automática)
+    started = time.perf_counter()
+    checked = crud.check_results(db, [contest])
+    return {"contest": contest, "bets_checked": checked.get(contest, 0), "elapsed_s": round(time.perf_counter() - started, 3)}
+
+def _draw_rows(lottery: str):
+    db = SessionLocal()
     try:
-        draws = parse_draws(payload.raw_text)
+        yield from crud.iter_draws_export(db, settings.EXPORT_PAGE_SIZE, lottery)
+    finally:
+        db.close()
+
+@router.get("/draws/export")
+def export_draws(
+    format: Literal["csv", "parquet"] = "csv",
+    lottery: str = "lotomania",
+    _admin: int = Depends(require_admin),
+):
+    # histórico inteiro em ordem de concurso, em streaming (keyset em draws.contest)
+    return export.streaming_response(
+        format, export.DRAW_COLUMNS, _draw_rows(lottery), f"concursos-{lottery}", settings.EXPORT_PAGE_SIZE
+    )
+
+@router.get("/engine-stats")
+def engine_stats(_admin: int = Depends(require_admin)):
+    from app.engine.public_stats import public_stats
+
+    return {
+        "ranking_cache": ranking_cache.stats(),
+        "executor": engine_executor.stats(),
+        "backtest_executor": backtest_executor.stats(),
+        "entitlements": entitlements.stats(),
+        "draw_snapshot": draw_snapshot.stats(),
+        "public_stats": public_stats.stats(),
+        "stripe_inbox": stripe_inbox.stats(),
+    }
+
+@router.post("/backtest")
+def backtest(payload: BacktestIn, db: Session = Depends(get_db), _admin: int = Depends(require_admin)):
+    # replay do histórico inteiro com os pesos do payload (demora: roda em BACKTEST_WORKERS processos,
+    # um backtest por vez; outro chegando enquanto isso leva 429)
+    from app.engine.backtest import run_backtest
+    from app.engine.executor import EngineBusy, EngineTimeout
+    from app.engine.lotomania import LotomaniaConfig
+
+    weights = payload.model_dump(exclude_none=True, exclude={"window", "count", "user_id", "start_contest", "end_contest"})
+    cfg = LotomaniaConfig(count=payload.count, window=payload.window, **weights)
+    history = crud.get_draw_history(db)
+    try:
+        result = run_backtest(
+            history,
+            cfg,
+            user_id=payload.user_id,
+            start_contest=payload.start_contest,
+            end_contest=payload.end_contest,
+            executor=backtest_executor,
+        )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
-
-    # upsert simples: se existir, atualiza; se não, cria
-    inserted = 0
-    updated = 0
-    for contest, date_br, nums_csv in draws:
-        row = db.query(models.Draw).filter(models.Draw.contest == contest).first()
-        if row:
-            row.date_br = date_br
-            row.numbers_csv = nums_csv
-            updated += 1
-        else:
-            db.add(models.Draw(lottery="lotomania", contest=contest, date_br=date_br, numbers_csv=nums_csv))
-            inserted += 1
-
-    db.commit()
-    return {"inserted": inserted, "updated": updated, "total_received": len(draws)}
+    except EngineBusy:
+        raise HTTPException(
+            status_code=429,
+            detail="Já tem um backtest rodando. Tente de novo quando ele terminar.",
+            headers={"Retry-After": "30"},
+        )
+    except EngineTimeout:
+        raise HTTPException(status_code=504, detail="Backtest passou do tempo limite. Reduza o intervalo.")
+    result["config"] = {"window": cfg.window, "count": cfg.count, **weights}
+    return result
@@ -1,12 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.core.security import decode_token
 from app.core.config import settings
-from app.db import models
-import stripe
-from datetime import datetime
+from app.core.stripe_inbox import SignatureError, stripe_inbox, verify_event
+from app.db import models, crud
+from typing import Optional
 
 router = APIRouter(prefix="/billing", tags=["billing"])
 auth_scheme = HTTPBearer()
@@ -31,6 +31,8 @@ def checkout(plan_id: str, db: Session = Depends(get_db), user_id: int = Depends
     if not settings.STRIPE_ENABLED:
         raise HTTPException(status_code=400, detail="Stripe ainda não habilitado no servidor.")
 
+    import stripe  # SDK pesado (~1 s de import): só quem faz checkout paga
+
     stripe.api_key = settings.STRIPE_SECRET_KEY
 
     price_map = {"1m": settings.STRIPE_PRICE_1M, "3m": settings.STRIPE_PRICE_3M, "1y": settings.STRIPE_PRICE_1Y}
@@ -56,31 +58,28 @@ def checkout(plan_id: str, db: Session = Depends(get_db), user_id: int = Depends
     )
     return {"url": session["url"]}
 
+async def _raw_body(req: Request) -> bytes:
+    # corpo cru (a assinatura é sobre os bytes); o resto do webhook roda no threadpool, fora do event loop
+    return await req.body()
+
 @router.post("/webhook")
-async def webhook(req: Request, db: Session = Depends(get_db)):
+def webhook(
+    payload: bytes = Depends(_raw_body),
+    stripe_signature: Optional[str] = Header(default=None),
+    db: Session = Depends(get_db),
+):
     if not settings.STRIPE_ENABLED:
         raise HTTPException(status_code=400, detail="Stripe desabilitado.")
 
-    payload = await req.body()
-    sig = req.headers.get("stripe-signature")
     try:
-        event = stripe.Webhook.construct_event(payload, sig, settings.STRIPE_WEBHOOK_SECRET)
-    except Exception:
+        event = verify_event(payload, stripe_signature, settings.STRIPE_WEBHOOK_SECRET, settings.STRIPE_WEBHOOK_TOLERANCE_S)
+    except SignatureError:
         raise HTTPException(status_code=400, detail="Webhook inválido.")
 
-    # Evento principal: subscription updated/created
-    if event["type"] in ("customer.subscription.created", "customer.subscription.updated"):
-        sub_obj = event["data"]["object"]
-        customer_id = sub_obj["customer"]
-        stripe_sub_id = sub_obj["id"]
-        status = sub_obj["status"]
-        current_period_end = datetime.utcfromtimestamp(sub_obj["current_period_end"]).isoformat()
-
-        sub = db.query(models.Subscription).filter(models.Subscription.stripe_customer_id == customer_id).first()
-        if sub:
-            sub.stripe_subscription_id = stripe_sub_id
-            sub.active = status in ("active", "trialing")
-            sub.current_period_end = current_period_end
-            db.commit()
-
-    return {"ok": True}
+    # só grava e responde; quem aplica na assinatura é o drainer (app/core/stripe_inbox.py)
+    fresh = crud.enqueue_stripe_event(
+        db, str(event["id"]), str(event["type"]), int(event.get("created") or 0), payload.decode("utf-8")
+    )
+    if fresh:
+        stripe_inbox.wake()
+    return {"ok": True, "duplicate": not fresh}
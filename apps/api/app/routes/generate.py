@@ -1,11 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
-from pydantic import BaseModel, conint
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from pydantic import BaseModel, conint, conlist
+from typing import Literal, Optional
+import hashlib
 import json
+import time
 
-from app.db.session import get_db
+from app.db.session import get_db, SessionLocal
 from app.core.security import decode_token
+from app.core.config import settings
+from app.core.entitlements import entitlements
+from app.core import metrics, wire
 from app.db import models, crud
 
 router = APIRouter(prefix="/generate", tags=["generate"])
@@ -16,6 +25,33 @@ class GenerateIn(BaseModel):
     lottery: str = "lotomania"
     count: conint(ge=1, le=50)                 # usuário escolhe
     window: conint(ge=20, le=200) = 60         # agora padrão 60 (você pediu janela 60)
+    force_new: bool = False                    # True = nova sessão mesmo se a mesma entrada já foi gerada
+    ticket_mode: Literal["walk", "optimizer"] = "walk"  # optimizer = overlap garantido (ver auditoria)
+
+
+class SyndicateIn(BaseModel):
+    lottery: str = "lotomania"
+    count: conint(ge=1, le=10000)              # bolão: milhares de bilhetes por rodada
+    window: conint(ge=20, le=200) = 60
+    overlap_max: conint(ge=20, le=49) = 40     # overlap máximo entre quaisquer dois bilhetes
+    force_new: bool = False
+
+
+class StreamIn(BaseModel):
+    lottery: str = "lotomania"
+    count: conint(ge=1, le=1000)               # lote grande: cliente vê os bilhetes chegando
+    window: conint(ge=20, le=200) = 60
+    force_new: bool = False
+    ticket_mode: Literal["walk", "optimizer"] = "walk"
+
+
+class EvaluateIn(BaseModel):
+    session_id: Optional[int] = None           # sessão já gerada pelo usuário...
+    tickets: Optional[conlist(conlist(conint(ge=0, le=99), min_length=50, max_length=50),
+                              min_length=1, max_length=10000)] = None  # ...ou bilhetes avulsos
+    samples: Optional[conint(ge=1, le=settings.EVALUATOR_MAX_SAMPLES)] = None  # padrão EVALUATOR_SAMPLES
+    budget_ms: Optional[conint(ge=50, le=10000)] = None                        # padrão EVALUATOR_BUDGET_MS
+    seed: conint(ge=0, le=2**63 - 1) = 0       # mesma seed + mesmas amostras = mesmo resultado
 
 
 def get_user_id(creds: HTTPAuthorizationCredentials = Depends(auth_scheme)) -> int:
@@ -23,99 +59,545 @@ def get_user_id(creds: HTTPAuthorizationCredentials = Depends(auth_scheme)) -> i
     return int(data["sub"])
 
 
-@router.post("")
-def generate(
-    payload: GenerateIn,
-    db: Session = Depends(get_db),
-    user_id: int = Depends(get_user_id),
-):
-    # Paywall
-    if not crud.has_active_subscription(db, user_id):
+def _check_access(db: Session, user_id: int, lottery: str) -> None:
+    # Paywall (cache curto; webhook do Stripe invalida)
+    with metrics.stage("paywall"):
+        entitled = entitlements.is_entitled(db, user_id)
+    if not entitled:
         raise HTTPException(
             status_code=402,
             detail="Assinatura necessária para gerar apostas."
         )
 
-    if payload.lottery != "lotomania":
+    if lottery != "lotomania":
         raise HTTPException(
             status_code=400,
             detail="Por enquanto, apenas Lotomania."
         )
 
-    # 1) Puxa os últimos "window" concursos do banco (desc)
-    window = int(payload.window)
 
-    rows = (
-        db.query(models.Draw)
-        .filter(models.Draw.lottery == "lotomania")
-        .order_by(models.Draw.contest.desc())
-        .limit(window)
-        .all()
-    )
+def _run_engine(job: str, fn, *args):
+    # motor roda no pool de processos; fila cheia vira 429, estouro de tempo vira 504
+    from app.engine.executor import engine_executor, EngineBusy, EngineTimeout
 
-    # proteção: motor pede histórico real mínimo (ajuste se você quiser outro corte)
-    if len(rows) < 20:
+    started = time.perf_counter()
+    try:
+        result, seconds, events = engine_executor.run(metrics.engine_job, fn, *args)
+    except EngineBusy:
         raise HTTPException(
-            status_code=400,
-            detail="Poucos resultados no banco. Importe os concursos primeiro."
+            status_code=429,
+            detail="Muitas gerações em andamento. Tente de novo em instantes.",
+            headers={"Retry-After": str(settings.ENGINE_RETRY_AFTER_S)},
         )
+    except EngineTimeout:
+        raise HTTPException(status_code=504, detail="Geração demorou demais. Tente de novo.")
+
+    # engine.<job> = CPU do job; engine.wait = fila + ida e volta até o worker
+    metrics.record_engine_job(job, seconds, events)
+    if engine_executor.workers > 0:
+        metrics.observe_stage("engine.wait", max(time.perf_counter() - started - seconds, 0.0))
+    return result
 
-    # 2) Base draw = concurso mais recente
-    base_draw_id = str(rows[0].contest)
 
-    # 3) Monta window_results a partir do numbers_csv
-    window_results = []
-    for r in rows:
-        if not r.numbers_csv:
-            continue
-        nums = [int(x) for x in r.numbers_csv.split(",") if x != ""]
-        window_results.append(nums)
+def _run_engine_many(job: str, fn, jobs, budget_s: float):
+    # mesmo contrato do _run_engine, mas em fatias (até ENGINE_WORKERS ao mesmo tempo, um slot da fila)
+    from app.engine.executor import engine_executor, EngineBusy, EngineTimeout
 
-    if len(window_results) < 20:
+    try:
+        parts = engine_executor.run_many(metrics.engine_job, [(fn, *args) for args in jobs], budget_s)
+    except EngineBusy:
+        raise HTTPException(
+            status_code=429,
+            detail="Muitas gerações em andamento. Tente de novo em instantes.",
+            headers={"Retry-After": str(settings.ENGINE_RETRY_AFTER_S)},
+        )
+    except EngineTimeout:
+        raise HTTPException(status_code=504, detail="Simulação demorou demais. Tente com menos amostras.")
+
+    events: dict = {}
+    for _, _, part_events in parts:
+        for event, amount in part_events.items():
+            events[event] = events.get(event, 0) + amount
+    metrics.record_engine_job(job, sum(seconds for _, seconds, _ in parts), events)
+    return [result for result, _, _ in parts]
+
+
+def _latest_contest(db: Session) -> int:
+    # Base draw = concurso mais recente
+    with metrics.stage("db.latest"):
+        latest = (
+            db.query(func.max(models.Draw.contest))
+            .filter(models.Draw.lottery == "lotomania")
+            .scalar()
+        )
+    if latest is None:
         raise HTTPException(
             status_code=400,
-            detail="Resultados inválidos no banco (numbers_csv vazio/ruim)."
+            detail="Poucos resultados no banco. Importe os concursos primeiro."
         )
+    return latest
+
+
+def _fingerprint(user_id: int, mode: str, base_draw_id: str, cfg) -> str:
+    # tudo que determina a saída do motor; mesma entrada = mesma sessão
+    from app.engine.lotomania import scoring_hash
+
+    raw = json.dumps({
+        "user_id": user_id,
+        "mode": mode,
+        "base_draw_id": base_draw_id,
+        "count": cfg.count,
+        "window": cfg.window,
+        "ticket_size": cfg.ticket_size,
+        "overlap_max": cfg.diversity_overlap_max,
+        "scoring": scoring_hash(cfg),
+        # só entra fora do padrão: fingerprints gravados antes do modo otimizador continuam valendo
+        **({"ticket_mode": cfg.ticket_mode} if getattr(cfg, "ticket_mode", "walk") != "walk" else {}),
+    }, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _ticket_config(config_cls, payload, window: int):
+    return config_cls(
+        count=payload.count,
+        window=window,
+        ticket_mode=payload.ticket_mode,
+        optimizer_budget_ms=settings.TICKET_OPTIMIZER_BUDGET_MS,
+    )
+
+
+def write_draw_snapshot() -> None:
+    # regrava o snapshot com sessão própria (roda fora do request: thread de rebuild, warmup)
+    db = SessionLocal()
+    try:
+        crud.rebuild_draw_snapshot(db)
+    finally:
+        db.close()
+
+
+def _snapshot_window(window: int, version: int):
+    # máscaras da janela lidas do snapshot; None se ele não existe ou a versão não é a do banco
+    # (import feito em outro host, correção de concurso antigo): aí este request usa o banco e
+    # o arquivo é regravado em segundo plano, um por host
+    from app.engine.snapshot import draw_snapshot
+
+    if not settings.DRAW_SNAPSHOT_PATH:
+        return None
+    with metrics.stage("snapshot"):
+        snap = draw_snapshot.current()
+        if snap is not None:
+            if snap.version == version:
+                return snap.window_masks(window)
+    draw_snapshot.rebuild_in_background(write_draw_snapshot)
+    return None
+
+
+def _load_ranking(db: Session, latest: int, window: int, cfg):
+    """Ranking da janela terminando em `latest` (cache compartilhado entre usuários)."""
+    from app.engine.lotomania import build_ranking_from_masks, build_ranking_from_stats, scoring_hash
+    from app.engine.cache import ranking_cache
+    from app.engine.bitmask import join_mask
+
+    base_draw_id = str(latest)
+    # versão do histórico na chave: import/correção feito em outro worker (que só limpou o cache
+    # dele) muda a versão, e o ranking velho deixa de ser achado aqui também
+    version = crud.get_data_version(db, "draws")
+
+    def build():
+        # 2a) Janela = fatia do snapshot mapeado (sem ida ao banco), se ele estiver na mesma versão
+        window_masks = _snapshot_window(window, version)
+        if window_masks is not None and len(window_masks) >= 20:
+            return _run_engine("scores", build_ranking_from_masks, window_masks, cfg)
+
+        # 2b) Estatística incremental da janela (mantida no import), se estiver em dia
+        if window in settings.STATS_WINDOWS:
+            with metrics.stage("db.stats"):
+                stats = crud.get_window_stats(db, window)
+            if stats is not None and stats.head_contest == latest and len(stats) >= 20:
+                return _run_engine("scores", build_ranking_from_stats, stats, cfg)
+
+        # 2c) Senão, puxa as máscaras dos últimos "window" concursos do banco (desc)
+        with metrics.stage("db.draws"):
+            rows = (
+                db.query(models.Draw.mask_lo, models.Draw.mask_hi)
+                .filter(models.Draw.lottery == "lotomania")
+                .order_by(models.Draw.contest.desc())
+                .limit(window)
+                .all()
+            )
+
+        # proteção: motor pede histórico real mínimo (ajuste se você quiser outro corte)
+        if len(rows) < 20:
+            raise HTTPException(
+                status_code=400,
+                detail="Poucos resultados no banco. Importe os concursos primeiro."
+            )
+
+        # 3) Janela = máscaras de 100 bits (sem parse de string)
+        window_masks = [join_mask(lo, hi) for lo, hi in rows if lo is not None]
+
+        if len(window_masks) < 20:
+            raise HTTPException(
+                status_code=400,
+                detail="Resultados inválidos no banco (máscara vazia/ruim)."
+            )
+
+        return _run_engine("scores", build_ranking_from_masks, window_masks, cfg)
+
+    with metrics.stage("ranking"):
+        return ranking_cache.get_or_build((base_draw_id, version, window, scoring_hash(cfg)), build)
+
+
+def _bets_payload(tickets, audits):
+    return [
+        {"index": i, "numbers": [f"{n:02d}" for n in t], "audit": a}
+        for i, (t, a) in enumerate(zip(tickets, audits), start=1)
+    ]
+
+
+def _compact_payload(sess_id: int, reused: bool, shared: dict, tickets, seeds, optimizer=None) -> dict:
+    # formato compacto (Accept: wire.COMPACT_MEDIA_TYPE): auditoria uma vez, bilhete = máscara hex
+    return {"format": "compact", "session_id": sess_id, "reused": reused, "audit": shared,
+            **wire.compact_bets(tickets, seeds, optimizer)}
+
+
+def _reused_generate(db: Session, sess, compact: bool = False) -> dict:
+    # remonta a resposta de uma sessão já gravada, sem rodar o motor
+    from app.engine.lotomania import ticket_audit
+
+    shared = json.loads(sess.audit_json)
+    bets = crud.get_session_bets(db, sess.id)
+    if compact:
+        return _compact_payload(sess.id, True, shared, [t for _, _, t in bets], [seed for _, seed, _ in bets])
+    return {
+        "session_id": sess.id,
+        "reused": True,
+        "bets": _bets_payload([t for _, _, t in bets], [ticket_audit(shared, i, seed) for i, seed, _ in bets]),
+    }
+
+
+def _reused_syndicate(db: Session, sess, compact: bool = False) -> dict:
+    shared = json.loads(sess.audit_json)
+    bets = crud.get_session_bets(db, sess.id)
+    if compact:
+        payload = _compact_payload(sess.id, True, shared, [t for _, _, t in bets], [seed for _, seed, _ in bets])
+        payload["coverage"] = shared.get("coverage", {})
+        return payload
+    return {
+        "session_id": sess.id,
+        "reused": True,
+        "audit": shared,
+        "coverage": shared.get("coverage", {}),
+        "bets": [{"index": i, "numbers": [f"{n:02d}" for n in t]} for i, _, t in bets],
+    }
+
+
+def _save_or_reuse(db: Session, user_id: int, fingerprint, **kwargs):
+    # corrida (duplo clique): quem perder o índice único devolve a sessão de quem ganhou
+    try:
+        with metrics.stage("db.insert"):
+            return crud.save_generation(db, user_id=user_id, fingerprint=fingerprint, **kwargs), False
+    except IntegrityError:
+        db.rollback()
+        existing = crud.get_session_by_fingerprint(db, user_id, fingerprint) if fingerprint else None
+        if existing is None:
+            raise
+        return existing, True
+
 
-    # 4) Chama o motor
-    from app.engine.lotomania import LotomaniaConfig, generate_lotomania_tickets
+@router.post("")
+def generate(
+    payload: GenerateIn,
+    request: Request,
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_user_id),
+):
+    _check_access(db, user_id, payload.lottery)
+
+    from app.engine.lotomania import LotomaniaConfig, assemble_tickets, optimizer_summary, shared_audit
+
+    window = int(payload.window)
+    cfg = _ticket_config(LotomaniaConfig, payload, window)
+    compact = wire.wants_compact(request)
+    latest = _latest_contest(db)
+    base_draw_id = str(latest)
+
+    # mesma entrada determinística já gerada? devolve a sessão existente
+    fingerprint = None if payload.force_new else _fingerprint(user_id, "padrao", base_draw_id, cfg)
+    if fingerprint:
+        with metrics.stage("db.reuse"):
+            existing = crud.get_session_by_fingerprint(db, user_id, fingerprint)
+        if existing:
+            return wire.respond(request, _reused_generate(db, existing, compact), compact)
+
+    # 4) Ranking compartilhado (cache) + bilhetes do usuário
+    ranking = _load_ranking(db, latest, window, cfg)
+    tickets, audits = _run_engine("tickets", assemble_tickets, user_id, base_draw_id, ranking, cfg)
+
+    # 5) Cria sessão (auditoria compartilhada vai uma vez) e grava apostas num INSERT só
+    shared = shared_audit(base_draw_id, ranking, cfg)
+    if cfg.ticket_mode == "optimizer":
+        shared["optimizer"] = optimizer_summary([a["optimizer"] for a in audits])
+    sess, reused = _save_or_reuse(
+        db,
+        user_id,
+        fingerprint,
+        requested_count=payload.count,
+        shared_audit=shared,
+        tickets=tickets,
+        seeds=[a["seed"] for a in audits],
+    )
+    if reused:
+        return wire.respond(request, _reused_generate(db, sess, compact), compact)
+
+    metrics.TICKETS.inc(len(tickets), mode="padrao")
+
+    # 6) Devolve payload
+    if compact:
+        optimizer = [a["optimizer"] for a in audits] if cfg.ticket_mode == "optimizer" else None
+        body = _compact_payload(sess.id, False, shared, tickets, [a["seed"] for a in audits], optimizer)
+    else:
+        body = {"session_id": sess.id, "reused": False, "bets": _bets_payload(tickets, audits)}
+    return wire.respond(request, body, compact)
 
-    cfg = LotomaniaConfig(count=payload.count, window=window)
 
-    # OBS: aqui você pode decidir se passa last_draw_numbers também.
-    # Se o seu motor NÃO precisa, deixe assim.
-    tickets, audits = generate_lotomania_tickets(
-        user_id=user_id,
-        base_draw_id=base_draw_id,
-        window_results=window_results,
-        cfg=cfg
+@router.post("/syndicate")
+def generate_syndicate(
+    payload: SyndicateIn,
+    request: Request,
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_user_id),
+):
+    # Bolão: milhares de bilhetes, overlap via popcount e seleção por cobertura
+    _check_access(db, user_id, payload.lottery)
+
+    from app.engine.lotomania import LotomaniaConfig, shared_audit
+    from app.engine.syndicate import SyndicateConfig, SYNDICATE_NOTES, generate_syndicate_tickets
+
+    window = int(payload.window)
+    cfg = LotomaniaConfig(count=payload.count, window=window, diversity_overlap_max=payload.overlap_max)
+    compact = wire.wants_compact(request)
+    latest = _latest_contest(db)
+    base_draw_id = str(latest)
+
+    fingerprint = None if payload.force_new else _fingerprint(user_id, "bolao", base_draw_id, cfg)
+    if fingerprint:
+        with metrics.stage("db.reuse"):
+            existing = crud.get_session_by_fingerprint(db, user_id, fingerprint)
+        if existing:
+            return wire.respond(request, _reused_syndicate(db, existing, compact), compact)
+
+    ranking = _load_ranking(db, latest, window, cfg)
+    tickets, seeds, coverage = _run_engine(
+        "syndicate",
+        generate_syndicate_tickets,
+        user_id,
+        base_draw_id,
+        ranking,
+        SyndicateConfig(count=payload.count, overlap_max=payload.overlap_max),
     )
 
-    # 5) Cria sessão de geração
-    sess = models.GenerationSession(
-        user_id=user_id,
-        lottery="lotomania",
-        requested_count=payload.count
+    shared = shared_audit(base_draw_id, ranking, cfg)
+    shared["mode"] = "bolao"
+    shared["notes"] = SYNDICATE_NOTES
+    shared["coverage"] = coverage
+    sess, reused = _save_or_reuse(
+        db,
+        user_id,
+        fingerprint,
+        requested_count=payload.count,
+        shared_audit=shared,
+        tickets=tickets,
+        seeds=seeds,
     )
-    db.add(sess)
-    db.commit()
-    db.refresh(sess)
-
-    # 6) Salva apostas e devolve payload
-    out = []
-    for i, (t, a) in enumerate(zip(tickets, audits), start=1):
-        bet = models.Bet(
-            session_id=sess.id,
-            index=i,
-            numbers_csv=",".join(f"{n:02d}" for n in t),
-            audit_json=json.dumps(a, ensure_ascii=False),
-        )
-        db.add(bet)
-        out.append({
-            "index": i,
-            "numbers": [f"{n:02d}" for n in t],
-            "audit": a
+    if reused:
+        return wire.respond(request, _reused_syndicate(db, sess, compact), compact)
+
+    metrics.TICKETS.inc(len(tickets), mode="bolao")
+
+    # sem auditoria por bilhete: com 10k bilhetes ela vai uma vez só
+    if compact:
+        body = _compact_payload(sess.id, False, shared, tickets, seeds)
+        body["coverage"] = coverage
+    else:
+        body = {
+            "session_id": sess.id,
+            "reused": False,
+            "audit": shared,
+            "coverage": coverage,
+            "bets": [{"index": i, "numbers": [f"{n:02d}" for n in t]} for i, t in enumerate(tickets, start=1)],
+        }
+    return wire.respond(request, body, compact)
+
+
+def _ndjson(obj) -> bytes:
+    return (json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _stream_reused(session_id: int, shared: dict):
+    from app.engine.lotomania import ticket_audit
+
+    db = SessionLocal()
+    try:
+        bets = crud.get_session_bets(db, session_id)
+    finally:
+        db.close()
+    yield _ndjson({"type": "session", "session_id": session_id, "reused": True})
+    for index, seed, ticket in bets:
+        yield _ndjson({
+            "type": "bet", "index": index,
+            "numbers": [f"{n:02d}" for n in ticket], "audit": ticket_audit(shared, index, seed),
         })
+    yield _ndjson({"type": "done", "count": len(bets)})
+
+
+def _stream_generate(user_id: int, fingerprint, ranking, cfg, shared: dict):
+    # roda depois que o request já "voltou": a sessão do Depends(get_db) fecha antes do corpo, então abre outra
+    from app.engine.lotomania import iter_lotomania_tickets, optimizer_summary
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        # fingerprint só no fim: sessão cortada no meio (cliente caiu) não é reaproveitada
+        sess = crud.create_session(db, user_id, cfg.count, shared)
+        db.commit()
+        yield _ndjson({"type": "session", "session_id": sess.id, "reused": False})
+
+        pending_tickets, pending_seeds = [], []
+        optimizer_stats = []
+        sent = 0
+        first_ms = None
+
+        def flush():
+            if pending_tickets:
+                crud.add_bets(db, sess.id, sent - len(pending_tickets) + 1, pending_tickets, pending_seeds)
+                db.commit()
+                pending_tickets.clear()
+                pending_seeds.clear()
+
+        try:
+            for ticket, audit in iter_lotomania_tickets(user_id, shared["base_draw_id"], ranking, cfg):
+                sent += 1
+                pending_tickets.append(ticket)
+                pending_seeds.append(audit["seed"])
+                if "optimizer" in audit:
+                    optimizer_stats.append(audit["optimizer"])
+                if len(pending_tickets) >= settings.STREAM_FLUSH_EVERY:
+                    flush()
+                yield _ndjson({"type": "bet", "index": sent, "numbers": [f"{n:02d}" for n in ticket], "audit": audit})
+                if first_ms is None:
+                    first_ms = round((time.perf_counter() - started) * 1000, 2)
+        finally:
+            # o que já foi mandado fica gravado, mesmo se o cliente desconectou
+            flush()
+
+        if optimizer_stats:
+            shared["optimizer"] = optimizer_summary(optimizer_stats)
+            sess.audit_json = json.dumps(shared, ensure_ascii=False)
+            db.commit()
+        if fingerprint:
+            sess.request_fingerprint = fingerprint
+            try:
+                db.commit()
+            except IntegrityError:
+                db.rollback()  # outra sessão com a mesma entrada terminou antes; esta fica sem fingerprint
+
+        metrics.TICKETS.inc(sent, mode="padrao")
+        yield _ndjson({
+            "type": "done",
+            "count": sent,
+            **({"optimizer": shared["optimizer"]} if optimizer_stats else {}),
+            "first_ticket_ms": first_ms,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        })
+    finally:
+        db.close()
+
+
+@router.post("/stream")
+def generate_stream(
+    payload: StreamIn,
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_user_id),
+):
+    """Mesmo motor do /generate, em NDJSON: uma linha "session", uma "bet" por bilhete
+    assim que passa no overlap (gravada em blocos de STREAM_FLUSH_EVERY) e uma "done"."""
+    _check_access(db, user_id, payload.lottery)
 
-    db.commit()
-    return {"session_id": sess.id, "bets": out}
+    from app.engine.lotomania import LotomaniaConfig, shared_audit
+
+    window = int(payload.window)
+    cfg = _ticket_config(LotomaniaConfig, payload, window)
+    latest = _latest_contest(db)
+    base_draw_id = str(latest)
+
+    fingerprint = None if payload.force_new else _fingerprint(user_id, "padrao", base_draw_id, cfg)
+    if fingerprint:
+        with metrics.stage("db.reuse"):
+            existing = crud.get_session_by_fingerprint(db, user_id, fingerprint)
+        if existing:
+            return StreamingResponse(
+                _stream_reused(existing.id, json.loads(existing.audit_json)), media_type="application/x-ndjson"
+            )
+
+    # erro de acesso/histórico sai antes do stream (status HTTP normal); o ranking pesado
+    # vai pro pool, os bilhetes saem inline (montagem é leve) enquanto o corpo é enviado
+    ranking = _load_ranking(db, latest, window, cfg)
+    shared = shared_audit(base_draw_id, ranking, cfg)
+    return StreamingResponse(
+        _stream_generate(user_id, fingerprint, ranking, cfg, shared), media_type="application/x-ndjson"
+    )
+
+
+@router.post("/evaluate")
+def evaluate_tickets(
+    payload: EvaluateIn,
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_user_id),
+):
+    """Chance dos bilhetes (de uma sessão ou avulsos): conta exata por bilhete e, pro
+    conjunto, Monte Carlo de `samples` sorteios limitado por `budget_ms`."""
+    _check_access(db, user_id, "lotomania")
+
+    from app.engine import evaluator
+
+    if (payload.session_id is None) == (payload.tickets is None):
+        raise HTTPException(status_code=400, detail="Mande session_id ou tickets (um dos dois).")
+    if payload.session_id is not None:
+        sess = db.get(models.GenerationSession, payload.session_id)
+        if sess is None or sess.user_id != user_id:
+            raise HTTPException(status_code=404, detail="Sessão não encontrada.")
+        tickets = [t for _, _, t in crud.get_session_bets(db, sess.id)]
+    else:
+        tickets = payload.tickets
+        for i, t in enumerate(tickets, start=1):
+            if len(set(t)) != len(t):
+                raise HTTPException(status_code=400, detail=f"Bilhete {i}: dezena repetida.")
+    if not tickets:
+        raise HTTPException(status_code=400, detail="Sessão sem apostas.")
+
+    samples = payload.samples or settings.EVALUATOR_SAMPLES
+    budget_ms = payload.budget_ms or settings.EVALUATOR_BUDGET_MS
+    t_lo, t_hi = evaluator.pack_tickets(tickets)
+    plan = evaluator.shard_plan(samples, settings.EVALUATOR_SHARD_SAMPLES)
+
+    started = time.perf_counter()
+    parts = _run_engine_many(
+        "evaluate",
+        evaluator.simulate_shard,
+        [(t_lo, t_hi, payload.seed, shard, n) for shard, n in plan],
+        budget_ms / 1000,
+    )
+    simulation = evaluator.summarize_simulation(parts)
+    simulation.update({
+        "seed": payload.seed,
+        "requested_samples": samples,
+        "budget_exhausted": len(parts) < len(plan),  # parou por tempo: samples < requested_samples
+        "elapsed_ms": round(1000 * (time.perf_counter() - started), 1),
+    })
+    return {
+        "session_id": payload.session_id,
+        "tickets": len(tickets),
+        "exact": evaluator.ticket_odds(len(tickets)),
+        "simulation": simulation,
+    }
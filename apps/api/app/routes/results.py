@@ -0,0 +1,80 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.orm import Session
+from typing import Literal, Optional
+from app.db.session import get_db, SessionLocal
+from app.core.security import decode_token
+from app.core.config import settings
+from app.core import export
+from app.db import crud
+from app.engine.results import is_prize
+
+router = APIRouter(prefix="/results", tags=["results"])
+auth_scheme = HTTPBearer()
+
+def get_user_id(creds: HTTPAuthorizationCredentials = Depends(auth_scheme)) -> int:
+    data = decode_token(creds.credentials)
+    return int(data["sub"])
+
+def _parse_cursor(after: str):
+    # "concurso.sessão.índice", o mesmo que a página anterior devolveu em "next"
+    try:
+        contest, session_id, index = (int(p) for p in after.split("."))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido.")
+    return contest, session_id, index
+
+@router.get("")
+def my_results(
+    contest: Optional[int] = None,
+    after: Optional[str] = None,
+    page: int = 1,
+    page_size: int = 50,
+    with_total: bool = False,
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_user_id),
+):
+    # conferência das apostas do usuário (só as de concursos já importados); próxima página
+    # com ?after=<next> (keyset). ?page= ainda funciona (OFFSET), mas fica lento lá no fundo
+    page = max(page, 1)
+    page_size = min(max(page_size, 1), 500)
+    cursor = _parse_cursor(after) if after else None
+    offset = 0 if cursor else (page - 1) * page_size
+    total, rows, next_cursor = crud.get_user_results(
+        db, user_id, contest, page_size, after=cursor, offset=offset, with_total=with_total
+    )
+    return {
+        "page": page,
+        "page_size": page_size,
+        "total": total,
+        "next": ".".join(map(str, next_cursor)) if next_cursor else None,
+        "items": [
+            {
+                "session_id": session_id,
+                "contest": target,
+                "index": index,
+                "numbers": [f"{n:02d}" for n in numbers],
+                "hits": hits,
+                "prize": is_prize(hits),
+            }
+            for session_id, target, index, numbers, hits in rows
+        ],
+    }
+
+def _bet_rows(user_id: int):
+    # sessão própria: a do Depends fecha antes do corpo do stream
+    db = SessionLocal()
+    try:
+        yield from crud.iter_user_bets_export(db, user_id, settings.EXPORT_SESSIONS_PER_PAGE)
+    finally:
+        db.close()
+
+@router.get("/export")
+def export_bets(
+    format: Literal["csv", "parquet"] = "csv",
+    user_id: int = Depends(get_user_id),
+):
+    """Todas as apostas do usuário (sessão mais antiga primeiro), em CSV ou Parquet, gerado em streaming."""
+    return export.streaming_response(
+        format, export.BET_COLUMNS, _bet_rows(user_id), f"apostas-{user_id}", settings.EXPORT_PAGE_SIZE
+    )
@@ -0,0 +1,93 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+from email.utils import parsedate_to_datetime
+import threading
+import time
+
+from app.core.config import settings
+from app.core.wire import accepts_gzip
+from app.db.session import SessionLocal
+from app.engine.public_stats import public_stats
+
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+# resposta pública e igual pra todo mundo: CDN/navegador podem guardar, e revalidam com 304
+CACHE_CONTROL = "public, max-age=60, stale-while-revalidate=300"
+
+_recheck_lock = threading.Lock()
+_checked_at = float("-inf")
+_db_contest = None  # concurso mais recente visto no banco na última conferência
+
+def _needs_sync(exists: bool) -> bool:
+    # arquivo ausente (host novo, /tmp limpo) quando já se sabe que há concursos, ou hora de conferir de novo
+    stale = time.monotonic() - _checked_at >= settings.PUBLIC_STATS_RECHECK_S
+    return stale or (not exists and (_db_contest is not None or public_stats.loaded))
+
+def _sync_with_db(wait: bool) -> None:
+    # regrava o arquivo se está ausente ou atrás do banco (import feito em outro host);
+    # fora isso o banco só é consultado a cada PUBLIC_STATS_RECHECK_S por worker
+    global _checked_at, _db_contest
+    from sqlalchemy import func
+    from app.db import crud, models
+
+    if not _recheck_lock.acquire(blocking=wait):
+        return  # outro request já está conferindo; este responde com o que tem
+    try:
+        body, exists = public_stats.get(settings.PUBLIC_STATS_WINDOWS[0])
+        if not _needs_sync(exists):
+            return  # quem segurava o lock já resolveu
+        db = SessionLocal()
+        try:
+            _db_contest = db.query(func.max(models.Draw.contest)).filter(models.Draw.lottery == "lotomania").scalar()
+            if _db_contest is not None and (body is None or body.contest != _db_contest):
+                crud.rebuild_public_stats(db)
+        finally:
+            db.close()
+        _checked_at = time.monotonic()
+    finally:
+        _recheck_lock.release()
+
+def _not_modified(request: Request, etag: str, last_modified: str) -> bool:
+    inm = request.headers.get("if-none-match")
+    if inm is not None:
+        # If-None-Match manda sobre o If-Modified-Since
+        return inm.strip() == "*" or etag in [t.strip().removeprefix("W/") for t in inm.split(",")]
+    ims = request.headers.get("if-modified-since")
+    if ims:
+        try:
+            return parsedate_to_datetime(ims) >= parsedate_to_datetime(last_modified)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+@router.get("")
+async def public_window_stats(request: Request, window: int = 60):
+    """Frequência, atraso, quentes/frias e top pares da janela, do concurso mais recente.
+
+    Público e sem login. Sai de corpos pré-serializados (reconstruídos no import), com
+    ETag/Last-Modified; If-None-Match/If-Modified-Since batendo = 304 sem corpo.
+    """
+    if window not in settings.PUBLIC_STATS_WINDOWS:
+        raise HTTPException(status_code=404, detail=f"Janela fora das publicadas: {settings.PUBLIC_STATS_WINDOWS}")
+
+    body, exists = public_stats.get(window)
+    if _needs_sync(exists):
+        await run_in_threadpool(_sync_with_db, not exists)
+        body, exists = public_stats.get(window)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Sem concursos importados ainda.")
+
+    # Vary em toda resposta (304 e sem gzip inclusive): cache na frente separa as duas versões
+    headers = {
+        "ETag": body.etag,
+        "Last-Modified": body.last_modified,
+        "Cache-Control": CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+    }
+    if _not_modified(request, body.etag, body.last_modified):
+        return Response(status_code=304, headers=headers)
+    if accepts_gzip(request):
+        headers["Content-Encoding"] = "gzip"
+        return Response(body.gzipped, media_type="application/json", headers=headers)
+    return Response(body.body, media_type="application/json", headers=headers)
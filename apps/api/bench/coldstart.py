@@ -0,0 +1,161 @@
+"""Cold start: quanto um worker novo leva pra abrir a porta e pra ficar útil.
+
+    cd apps/api
+    python -m bench.coldstart --runs 5 --out bench/coldstart.json
+
+Tudo em processos novos (nada importado/cacheado de antes), SQLite temporário
+com o mesmo histórico sintético do bench.run:
+
+  import_ms           `import app.main` (o que todo worker paga antes de abrir a porta)
+  health_ms           do spawn do uvicorn até o primeiro /health 200
+  ready_ms            do spawn até o /ready 200 (motor, snapshot e ranking aquecidos)
+  generate_ready_ms   primeiro /generate depois do /ready
+  generate_cold_ms    primeiro /generate logo depois do /health, sem esperar o /ready
+                      (o que o tráfego sentia antes, com tudo preguiçoso no primeiro request)
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, List, Optional
+
+from bench.synthetic import history_text, synthetic_history
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _request(url: str, body: Optional[dict] = None, token: Optional[str] = None, timeout: float = 30.0) -> int:
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, method="POST" if data else "GET")
+    req.add_header("Content-Type", "application/json")
+    if token:
+        req.add_header("Authorization", f"Bearer {token}")
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as r:
+            r.read()
+            return r.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, ConnectionError, socket.timeout):
+        return 0
+
+def _wait_for(url: str, started: float, deadline_s: float) -> float:
+    while time.perf_counter() - started < deadline_s:
+        if _request(url, timeout=2.0) == 200:
+            return (time.perf_counter() - started) * 1000
+        time.sleep(0.01)
+    raise RuntimeError(f"{url} não respondeu 200 em {deadline_s:.0f}s")
+
+def seed(env: Dict[str, str], history_size: int, seed_value: int) -> str:
+    """Cria o banco (schema + histórico + usuário assinante) e devolve o token do usuário."""
+    os.environ.update(env)
+    os.environ["ENGINE_WORKERS"] = "0"
+
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.db.session import SessionLocal
+    from app.db import models
+
+    with TestClient(app) as client:
+        token = client.post("/auth/register", json={"email": "cold@example.com", "password": "cold"}).json()["token"]
+        db = SessionLocal()
+        try:
+            db.query(models.Subscription).update({"active": True})
+            db.commit()
+        finally:
+            db.close()
+        text = history_text(synthetic_history(history_size, seed=seed_value))
+        r = client.post("/admin/import-draws", json={"raw_text": text}, headers={"Authorization": f"Bearer {token}"})
+        if r.status_code != 200:
+            raise RuntimeError(f"import falhou: {r.status_code} {r.text}")
+    return token
+
+def measure_import(env: Dict[str, str]) -> float:
+    code = "import time; t = time.perf_counter(); import app.main; print((time.perf_counter() - t) * 1000)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=API_DIR, env=env, check=True, capture_output=True, text=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+def measure_server(env: Dict[str, str], token: str, wait_ready: bool, deadline_s: float) -> Dict[str, float]:
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=API_DIR, env=env,
+    )
+    try:
+        out = {"health_ms": _wait_for(f"{base}/health", started, deadline_s)}
+        if wait_ready:
+            out["ready_ms"] = _wait_for(f"{base}/ready", started, deadline_s)
+        t0 = time.perf_counter()
+        status = _request(f"{base}/generate", {"count": 10, "window": 60, "force_new": True}, token)
+        if status != 200:
+            raise RuntimeError(f"/generate respondeu {status}")
+        out["generate_ready_ms" if wait_ready else "generate_cold_ms"] = (time.perf_counter() - t0) * 1000
+        return out
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Cold start da API (import, /health, /ready, primeiro /generate)")
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--workers", type=int, default=2, help="ENGINE_WORKERS do servidor medido")
+    ap.add_argument("--history", type=int, default=500, help="concursos no banco")
+    ap.add_argument("--deadline", type=float, default=120.0, help="segundos até desistir de um /health ou /ready")
+    ap.add_argument("--seed", type=int, default=2026)
+    ap.add_argument("--out", help="grava o resultado em JSON nesse arquivo")
+    args = ap.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix="lotomania-cold-")
+    env = {
+        "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'cold.db')}",
+        "DRAW_SNAPSHOT_PATH": os.path.join(tmp, "draws.snap"),
+        "STRIPE_ENABLED": "false",
+        "JWT_SECRET": "bench-coldstart",
+    }
+    token = seed(env, args.history, args.seed)
+
+    child_env = dict(os.environ, **env, ENGINE_WORKERS=str(args.workers))
+    samples: Dict[str, List[float]] = {}
+    for i in range(args.runs):
+        if os.path.exists(env["DRAW_SNAPSHOT_PATH"]):
+            os.remove(env["DRAW_SNAPSHOT_PATH"])  # cada rodada = host novo
+        run = {"import_ms": measure_import(child_env)}
+        run.update(measure_server(child_env, token, wait_ready=True, deadline_s=args.deadline))
+        run.update({k: v for k, v in measure_server(child_env, token, wait_ready=False, deadline_s=args.deadline).items()
+                    if k != "health_ms"})
+        for k, v in run.items():
+            samples.setdefault(k, []).append(v)
+        print(f"run {i + 1}: " + "  ".join(f"{k} {v:8.1f}" for k, v in run.items()), file=sys.stderr)
+
+    report = {
+        "meta": {"runs": args.runs, "engine_workers": args.workers, "history_size": args.history,
+                 "python": sys.version.split()[0], "cpu_count": os.cpu_count()},
+        "results": {k: {"median_ms": round(statistics.median(v), 1), "min_ms": round(min(v), 1),
+                        "max_ms": round(max(v), 1)} for k, v in samples.items()},
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
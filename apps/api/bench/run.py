@@ -0,0 +1,263 @@
+"""Benchmark do motor e do caminho completo do /generate.
+
+Histórico sintético com seed fixa (mesmos concursos em toda máquina), SQLite
+temporário e motor inline (ENGINE_WORKERS=0), então dá pra comparar rodadas:
+
+    cd apps/api
+    python -m bench.run --out bench/baseline.json
+    # ... mexe no motor ...
+    python -m bench.run --compare bench/baseline.json
+
+O caminho da API usa o TestClient do FastAPI (precisa do httpx instalado).
+Sai com código 1 se o --compare achar regressão.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+from bench.synthetic import history_text, synthetic_history
+
+WINDOWS = (20, 60, 200)
+COUNTS = (1, 10, 50)
+HISTORY_SIZE = 500
+USER_ID = 1
+
+def _percentile(sorted_ms: List[float], p: float) -> float:
+    # interpolação linear, igual ao numpy.percentile padrão
+    if len(sorted_ms) == 1:
+        return sorted_ms[0]
+    k = (len(sorted_ms) - 1) * p / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_ms) - 1)
+    return sorted_ms[lo] + (sorted_ms[hi] - sorted_ms[lo]) * (k - lo)
+
+def measure(fn: Callable[[], object], iterations: int, warmup: int = 2,
+            setup: Optional[Callable[[], None]] = None) -> dict:
+    """Roda `fn` `iterations` vezes (depois do aquecimento) e mais uma sob tracemalloc.
+
+    `setup` roda antes de cada chamada e fica fora do tempo (ex.: limpar cache).
+    """
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+
+    samples = []
+    for _ in range(iterations):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+
+    # pico de memória numa rodada separada: o tracemalloc deixa tudo mais lento
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    samples.sort()
+    mean = statistics.fmean(samples)
+    return {
+        "iterations": iterations,
+        "p50_ms": round(_percentile(samples, 50), 3),
+        "p95_ms": round(_percentile(samples, 95), 3),
+        "p99_ms": round(_percentile(samples, 99), 3),
+        "mean_ms": round(mean, 3),
+        "ops_per_s": round(1000.0 / mean, 2) if mean else 0.0,
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+def engine_cases(history, iterations: int) -> Dict[str, Callable[[], dict]]:
+    from app.engine.bitmask import to_mask
+    from app.engine.lotomania import (
+        LotomaniaConfig, _build_scores, assemble_tickets, build_ranking_from_masks,
+        generate_lotomania_tickets_from_masks,
+    )
+
+    base_draw_id = str(history[-1][0])
+    cases = {}
+    for window in WINDOWS:
+        rows = history[-window:][::-1]  # o motor recebe a janela do mais novo pro mais velho
+        masks = [to_mask(n) for _, n in rows]
+        results = [n for _, n in rows]
+        cfg1 = LotomaniaConfig(count=1, window=window)
+        ranking = build_ranking_from_masks(masks, cfg1)
+
+        cases[f"engine.reference_scores.w{window}"] = (
+            lambda results=results, cfg=cfg1: measure(lambda: _build_scores(results, cfg), iterations)
+        )
+        cases[f"engine.ranking.w{window}"] = (
+            lambda masks=masks, cfg=cfg1: measure(lambda: build_ranking_from_masks(masks, cfg), iterations)
+        )
+        for count in COUNTS:
+            cfg = LotomaniaConfig(count=count, window=window)
+            cases[f"engine.assemble.w{window}.n{count}"] = (
+                lambda cfg=cfg, ranking=ranking: measure(
+                    lambda: assemble_tickets(USER_ID, base_draw_id, ranking, cfg), iterations
+                )
+            )
+            cases[f"engine.generate.w{window}.n{count}"] = (
+                lambda cfg=cfg, masks=masks: measure(
+                    lambda: generate_lotomania_tickets_from_masks(USER_ID, base_draw_id, masks, cfg), iterations
+                )
+            )
+    return cases
+
+def api_cases(history, iterations: int) -> Dict[str, Callable[[], dict]]:
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+    from app.db.session import SessionLocal
+    from app.db import models
+    from app.engine.cache import ranking_cache
+    from app.core.entitlements import entitlements
+
+    client = TestClient(app)
+    client.__enter__()  # roda o lifespan (schema + aquecimento) e fica aberto até o fim do processo
+    token = client.post("/auth/register", json={"email": "bench@example.com", "password": "bench"}).json()["token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    db = SessionLocal()
+    try:
+        db.query(models.Subscription).update({"active": True})
+        db.commit()
+    finally:
+        db.close()
+
+    r = client.post("/admin/import-draws", json={"raw_text": history_text(history)}, headers=headers)
+    if r.status_code != 200:
+        raise RuntimeError(f"import falhou: {r.status_code} {r.text}")
+    client.get("/ready", params={"wait": 30})  # aquecimento em segundo plano não pode cair dentro das medições
+
+    def post(body: dict) -> None:
+        r = client.post("/generate", json=body, headers=headers)
+        if r.status_code != 200:
+            raise RuntimeError(f"/generate falhou: {r.status_code} {r.text}")
+
+    def cold() -> None:
+        # request "frio": sem ranking nem paywall em cache, força sessão nova
+        ranking_cache.clear()
+        entitlements.clear()
+
+    cases = {}
+    for window in WINDOWS:
+        for count in COUNTS:
+            body = {"count": count, "window": window, "force_new": True}
+            cases[f"api.generate.cold.w{window}.n{count}"] = (
+                lambda body=body: measure(lambda: post(body), iterations, setup=cold)
+            )
+    body = {"count": 10, "window": 60, "force_new": True}
+    cases["api.generate.warm.w60.n10"] = lambda: measure(lambda: post(body), iterations)
+    reused = {"count": 10, "window": 60}
+    cases["api.generate.reused.w60.n10"] = lambda: measure(lambda: post(reused), iterations)
+    return cases
+
+def compare(current: dict, baseline: dict, threshold: float, mem_threshold: float) -> List[str]:
+    """Casos que ficaram mais lentos (p50/p95) ou mais gulosos (pico de memória) que o baseline."""
+    regressions = []
+    print(f"\n{'caso':44s} {'p50 base':>10s} {'p50 agora':>10s} {'Δp50':>8s} {'Δp95':>8s} {'Δmem':>8s}")
+    for name, cur in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            print(f"{name:44s} {'-':>10s} {cur['p50_ms']:>10.3f}   (novo)")
+            continue
+
+        def delta(key: str) -> float:
+            return cur[key] / base[key] - 1.0 if base[key] else 0.0
+
+        d50, d95, dmem = delta("p50_ms"), delta("p95_ms"), delta("peak_kb")
+        flags = []
+        if d50 > threshold:
+            flags.append("p50")
+        if d95 > threshold:
+            flags.append("p95")
+        if dmem > mem_threshold:
+            flags.append("mem")
+        mark = "  REGRESSÃO " + ",".join(flags) if flags else ""
+        print(f"{name:44s} {base['p50_ms']:>10.3f} {cur['p50_ms']:>10.3f} "
+              f"{d50:>+8.1%} {d95:>+8.1%} {dmem:>+8.1%}{mark}")
+        if flags:
+            regressions.append(name)
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark do motor Lotomania e do /generate")
+    ap.add_argument("--out", help="grava o resultado em JSON nesse arquivo")
+    ap.add_argument("--compare", help="JSON de uma rodada anterior (baseline)")
+    ap.add_argument("--threshold", type=float, default=0.10, help="piora tolerada em p50/p95 (0.10 = 10%%)")
+    ap.add_argument("--mem-threshold", type=float, default=0.20, help="piora tolerada no pico de memória")
+    ap.add_argument("--iterations", type=int, default=50, help="medições por caso do motor")
+    ap.add_argument("--api-iterations", type=int, default=20, help="medições por caso da API")
+    ap.add_argument("--only", choices=["engine", "api"], help="roda só um dos grupos")
+    ap.add_argument("--filter", default="", help="só casos cujo nome contém esse texto")
+    ap.add_argument("--seed", type=int, default=2026)
+    args = ap.parse_args(argv)
+
+    # banco descartável e motor inline: precisa estar no ambiente antes do primeiro import de app.*
+    tmp = tempfile.mkdtemp(prefix="lotomania-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ["ENGINE_WORKERS"] = "0"
+    os.environ["STRIPE_ENABLED"] = "false"
+    os.environ["DRAW_SNAPSHOT_PATH"] = os.path.join(tmp, "draws.snap")
+
+    import numpy
+
+    history = synthetic_history(HISTORY_SIZE, seed=args.seed)
+    cases: Dict[str, Callable[[], dict]] = {}
+    if args.only in (None, "engine"):
+        cases.update(engine_cases(history, args.iterations))
+    if args.only in (None, "api"):
+        cases.update(api_cases(history, args.api_iterations))
+
+    results = {}
+    for name, run in cases.items():
+        if args.filter and args.filter not in name:
+            continue
+        results[name] = run()
+        r = results[name]
+        print(f"{name:44s} p50 {r['p50_ms']:9.3f} ms  p95 {r['p95_ms']:9.3f} ms  "
+              f"{r['ops_per_s']:9.1f} op/s  pico {r['peak_kb']:9.1f} KB", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "numpy": numpy.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": args.seed,
+            "history_size": HISTORY_SIZE,
+        },
+        "results": results,
+    }
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    else:
+        json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold, args.mem_threshold)
+        if regressions:
+            print(f"\n{len(regressions)} caso(s) com regressão", file=sys.stderr)
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
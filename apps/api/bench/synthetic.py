@@ -0,0 +1,14 @@
+import random
+from typing import List, Tuple
+
+def synthetic_history(n: int, seed: int = 2026, first_contest: int = 1) -> List[Tuple[int, List[int]]]:
+    """Histórico falso e reprodutível: (concurso, 20 dezenas ordenadas), em ordem crescente."""
+    rng = random.Random(seed)
+    return [(first_contest + i, sorted(rng.sample(range(100), 20))) for i in range(n)]
+
+def history_text(history: List[Tuple[int, List[int]]]) -> str:
+    # mesmo formato que o /admin/import-draws aceita
+    return "\n".join(
+        f"{contest} - 01/01/2020 - " + " ".join(f"{n:02d}" for n in numbers)
+        for contest, numbers in history
+    )
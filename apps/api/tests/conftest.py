@@ -0,0 +1,59 @@
+import os
+import tempfile
+
+# settings são lidos no import do app: ambiente de teste (sqlite temporário, motor inline,
+# arquivos compartilhados dentro do tmp) precisa estar pronto antes de qualquer `import app`
+_TMP = tempfile.mkdtemp(prefix="lotomania-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_TMP}/test.db")
+os.environ.setdefault("ENGINE_WORKERS", "0")
+os.environ.setdefault("BACKTEST_WORKERS", "0")
+os.environ.setdefault("DB_AUTO_MIGRATE", "true")
+os.environ.setdefault("DRAW_SNAPSHOT_PATH", f"{_TMP}/draws.snap")
+os.environ.setdefault("PUBLIC_STATS_PATH", f"{_TMP}/public-stats.json")
+os.environ.setdefault("STRIPE_WEBHOOK_SECRET", "whsec_test")
+os.environ.setdefault("WARMUP_WINDOWS", "[]")
+
+import random
+
+import pytest
+
+def draw_lines(first: int, last: int, seed: int = 3) -> str:
+    # texto do import: "<concurso> - <data> - 20 dezenas"
+    rng = random.Random(seed)
+    return "\n".join(
+        f"{c} - 01/01/2020 - " + " ".join(map(str, rng.sample(range(100), 20))) for c in range(first, last + 1)
+    )
+
+@pytest.fixture
+def client():
+    # banco zerado e caches do processo limpos a cada teste; o lifespan recria o schema
+    from fastapi.testclient import TestClient
+
+    from app.core.entitlements import entitlements
+    from app.db.session import Base, engine
+    from app.engine.cache import ranking_cache
+    from app.main import app
+
+    Base.metadata.drop_all(bind=engine)
+    for name in os.listdir(_TMP):
+        if name != "test.db":
+            os.remove(os.path.join(_TMP, name))
+    ranking_cache.clear()
+    entitlements.clear()
+    with TestClient(app) as c:
+        yield c
+
+@pytest.fixture
+def admin(client):
+    # primeiro usuário = admin, já com assinatura ativa
+    from app.db import models
+    from app.db.session import SessionLocal
+
+    token = client.post("/auth/register", json={"email": "admin@x.com", "password": "pw"}).json()["token"]
+    db = SessionLocal()
+    try:
+        db.query(models.Subscription).update({"active": True})
+        db.commit()
+    finally:
+        db.close()
+    return {"Authorization": f"Bearer {token}"}
@@ -0,0 +1,36 @@
+from conftest import draw_lines
+
+def test_backtest_sharded_matches_inline():
+    # faixas separadas (cada uma aquece a própria janela) dão o mesmo resultado que uma só
+    import random
+
+    from app.engine.backtest import run_backtest
+    from app.engine.executor import EngineExecutor
+    from app.engine.lotomania import LotomaniaConfig
+
+    rng = random.Random(5)
+    history = [(c, sorted(rng.sample(range(100), 20))) for c in range(1, 61)]
+    cfg = LotomaniaConfig(count=3, window=20)
+    inline = run_backtest(history, cfg, user_id=2)
+    executor = EngineExecutor(workers=2, max_inflight=1, timeout_s=120)
+    try:
+        sharded = run_backtest(history, cfg, user_id=2, executor=executor)
+    finally:
+        executor.shutdown()
+    assert sharded["shards"] == 2
+    for key in ("contests", "tickets", "mean_hits", "hits_histogram", "best_hits_histogram"):
+        assert inline[key] == sharded[key]
+
+def test_one_backtest_at_a_time(client, admin):
+    from app.engine.executor import backtest_executor
+
+    assert client.post("/admin/import-draws", json={"raw_text": draw_lines(1, 40)}, headers=admin).status_code == 200
+    body = {"window": 20, "count": 2}
+
+    ok = client.post("/admin/backtest", json=body, headers=admin)
+    assert ok.status_code == 200 and ok.json()["contests"] == 20
+
+    # com um backtest em voo (segura o único slot), o próximo leva 429 em vez de subir outro pool
+    inner = backtest_executor.run(lambda: client.post("/admin/backtest", json=body, headers=admin))
+    assert inner.status_code == 429 and "Retry-After" in inner.headers
+    assert client.post("/admin/backtest", json=body, headers=admin).status_code == 200
@@ -0,0 +1,60 @@
+import random
+
+import numpy as np
+
+from app.engine.bitmask import split_mask, to_mask
+from app.engine.results import count_hits
+from conftest import draw_lines
+
+def test_count_hits_matches_bit_count():
+    rng = random.Random(11)
+    tickets = [rng.sample(range(100), 50) for _ in range(500)] + [list(range(50)), list(range(50, 100))]
+    lo, hi = zip(*(split_mask(to_mask(t)) for t in tickets))
+    for draw in ([*range(80, 100)], [*range(20)], rng.sample(range(100), 20), rng.sample(range(100), 20)):
+        d = to_mask(draw)
+        expected = [(to_mask(t) & d).bit_count() for t in tickets]
+        assert expected == [len(set(t) & set(draw)) for t in tickets]
+        assert count_hits(np.array(lo, dtype=np.int64), np.array(hi, dtype=np.int64), d).tolist() == expected
+
+def _stored_hits(contest):
+    from app.db import models
+    from app.db.session import SessionLocal
+    from app.engine.bitmask import from_mask, join_mask
+
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(models.Bet.mask_lo, models.Bet.mask_hi, models.Bet.hits)
+            .join(models.GenerationSession, models.Bet.session_id == models.GenerationSession.id)
+            .filter(models.GenerationSession.target_contest == contest)
+            .all()
+        )
+        draw = db.query(models.Draw).filter(models.Draw.contest == contest).one()
+        drawn = set(from_mask(join_mask(draw.mask_lo, draw.mask_hi)))
+        return [(hits, len(set(from_mask(join_mask(lo, hi))) & drawn)) for lo, hi, hits in rows]
+    finally:
+        db.close()
+
+def test_import_checks_bets_in_batches(client, admin, monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "RESULTS_BATCH_SIZE", 7)  # vários lotes de keyset
+    assert client.post("/admin/import-draws", json={"raw_text": draw_lines(1, 80)}, headers=admin).status_code == 200
+    for count in (10, 9, 5):
+        assert client.post("/generate", json={"count": count, "window": 20, "force_new": True}, headers=admin).status_code == 200
+
+    assert client.post("/admin/import-draws", json={"raw_text": draw_lines(1, 81)}, headers=admin).status_code == 200
+    pairs = _stored_hits(81)
+    assert len(pairs) == 24 and all(stored == expected for stored, expected in pairs)
+
+    # reconferência manual depois de zerar: mesmo resultado
+    from app.db import models
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    db.query(models.Bet).update({"hits": None})
+    db.commit()
+    db.close()
+    res = client.post("/admin/check-results", params={"contest": 81}, headers=admin).json()
+    assert res["bets_checked"] == 24
+    assert _stored_hits(81) == pairs
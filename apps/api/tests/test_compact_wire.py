@@ -0,0 +1,71 @@
+import random
+
+from app.core import wire
+from conftest import draw_lines
+
+COMPACT = {"Accept": wire.COMPACT_MEDIA_TYPE}
+
+# porte direto do apps/web/app/api/client.ts (maskNumbers / ticketAudit / expandCompact)
+
+def mask_numbers(hex_: str):
+    out = []
+    for i in range(len(hex_)):
+        nibble = int(hex_[len(hex_) - 1 - i], 16)
+        for b in range(4):
+            if nibble & (1 << b):
+                out.append(f"{i * 4 + b:02d}")
+    return out
+
+def ticket_audit(shared, index, seed, optimizer=None):
+    audit = {k: shared[k] for k in ("lottery", "base_draw_id", "window", "nucleus", "diversity_overlap_max")}
+    audit.update(ticket_index=index, seed=seed, meta=shared["meta"], notes=shared["notes"])
+    if shared.get("ticket_mode"):
+        audit["ticket_mode"] = shared["ticket_mode"]
+    if optimizer:
+        audit["optimizer"] = optimizer
+    return audit
+
+def expand_compact(data):
+    rest = {k: v for k, v in data.items() if k not in ("format", "masks", "seeds", "optimizer")}
+    bolao = (data.get("audit") or {}).get("mode") == "bolao"
+    optimizer = data.get("optimizer")
+    bets = []
+    for i, hex_ in enumerate(data["masks"]):
+        bet = {"index": i + 1, "numbers": mask_numbers(hex_)}
+        if not bolao:
+            bet["audit"] = ticket_audit(data["audit"], i + 1, data["seeds"][i], optimizer[i] if optimizer else None)
+        bets.append(bet)
+    if not bolao:
+        rest.pop("audit", None)
+    return {**rest, "bets": bets}
+
+def test_mask_hex_round_trip():
+    rng = random.Random(1)
+    for ticket in ([0], [99], [0, 49, 50, 99], list(range(100)), *(sorted(rng.sample(range(100), 50)) for _ in range(200))):
+        assert mask_numbers(wire.mask_hex(ticket)) == [f"{n:02d}" for n in sorted(ticket)]
+
+def test_generate_compact_expands_to_json(client, admin):
+    assert client.post("/admin/import-draws", json={"raw_text": draw_lines(1, 80)}, headers=admin).status_code == 200
+    req = {"count": 6, "window": 40}
+
+    expanded = client.post("/generate", json=req, headers=admin).json()
+    compact = client.post("/generate", json=req, headers={**admin, **COMPACT}).json()
+    assert compact["format"] == "compact" and compact["reused"] is True
+    assert expand_compact(compact) == {**expanded, "reused": True}
+
+def test_optimizer_compact_carries_per_ticket_stats(client, admin):
+    assert client.post("/admin/import-draws", json={"raw_text": draw_lines(1, 80)}, headers=admin).status_code == 200
+    req = {"count": 5, "window": 40, "ticket_mode": "optimizer", "force_new": True}
+
+    expanded = client.post("/generate", json=req, headers=admin).json()
+    compact = client.post("/generate", json=req, headers={**admin, **COMPACT}).json()
+    assert len(compact["optimizer"]) == 5
+    assert expand_compact(compact)["bets"] == expanded["bets"]
+
+def test_syndicate_compact_expands_to_json(client, admin):
+    assert client.post("/admin/import-draws", json={"raw_text": draw_lines(1, 80)}, headers=admin).status_code == 200
+    req = {"count": 40, "window": 40}
+
+    expanded = client.post("/generate/syndicate", json=req, headers=admin).json()
+    compact = client.post("/generate/syndicate", json=req, headers={**admin, **COMPACT}).json()
+    assert expand_compact(compact) == {**expanded, "reused": True}
@@ -0,0 +1,43 @@
+from collections import Counter
+import itertools
+import random
+
+import pytest
+
+from app.engine.cooccurrence import window_tuple_counts
+from app.engine.lotomania import _occurrence_matrix
+from app.engine.stats import WindowStats
+
+def _history(n: int, pool: int, seed: int):
+    # pool pequeno = muitas contagens empatadas (o caso em que o desempate importa)
+    rng = random.Random(seed)
+    return [(c, sorted(rng.sample(range(pool), 20))) for c in range(1, n + 1)]
+
+def _most_common(window_results, k: int, n: int):
+    # referência: Counter sobre a janela do mais recente pro mais antigo
+    c = Counter()
+    for draw in window_results:
+        c.update(itertools.combinations(sorted(draw), k))
+    return c.most_common(n)
+
+def _as_pairs(ranked):
+    return [(tuple(int(x) for x in nums), int(cnt)) for nums, cnt in zip(ranked.numbers(), ranked.counts)]
+
+@pytest.mark.parametrize("window, pool", [(3, 100), (20, 100), (20, 26), (60, 30)])
+@pytest.mark.parametrize("k, top", [(2, 10), (2, 300), (3, 25), (3, 5000), (4, 40)])
+def test_window_top_matches_most_common(window, pool, k, top):
+    draws = [d for _, d in reversed(_history(window, pool, seed=window + pool))]  # mais recente primeiro
+    counts = window_tuple_counts(_occurrence_matrix(draws), k)
+    assert _as_pairs(counts.top(top)) == _most_common(draws, k, top)
+
+@pytest.mark.parametrize("pool", [100, 28])
+def test_sliding_stats_match_most_common(pool):
+    # depois de muitos push/pop a janela incremental desempata igual a recontar do zero
+    history = _history(120, pool, seed=pool)
+    stats = WindowStats.build(20, history[:20])
+    for contest, numbers in history[20:]:
+        stats.push(contest, numbers)
+        if contest % 25 == 0 or contest == history[-1][0]:
+            feat = stats.features()
+            assert _as_pairs(feat["pairs"].top(50)) == _most_common(stats.draws, 2, 50)
+            assert _as_pairs(feat["triples"].top(50)) == _most_common(stats.draws, 3, 50)
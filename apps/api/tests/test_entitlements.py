@@ -0,0 +1,133 @@
+import json
+
+import pytest
+
+from app.core.entitlements import EntitlementCache
+from app.db import crud
+from conftest import draw_lines
+
+def _cache():
+    return EntitlementCache(ttl_s=60.0, negative_ttl_s=5.0, maxsize=2)
+
+def test_hit_after_miss(monkeypatch):
+    calls = []
+    monkeypatch.setattr(crud, "has_active_subscription", lambda db, uid: calls.append(uid) or True)
+    cache = _cache()
+    assert cache.is_entitled(None, 1) and cache.is_entitled(None, 1)
+    assert calls == [1] and cache.stats()["hits"] == 1
+
+def test_invalidate_during_db_read_is_not_overwritten(monkeypatch):
+    cache = _cache()
+    state = {"active": False}
+
+    def read(db, uid):
+        seen = state["active"]
+        # o drainer aplica o pagamento e invalida enquanto esta leitura (velha) está em voo
+        state["active"] = True
+        cache.invalidate(uid)
+        return seen
+
+    monkeypatch.setattr(crud, "has_active_subscription", read)
+    assert cache.is_entitled(None, 7) is False  # o que leu vale pra este request...
+    monkeypatch.setattr(crud, "has_active_subscription", lambda db, uid: state["active"])
+    assert cache.is_entitled(None, 7) is True  # ...mas não ficou no cache
+    assert cache.stats()["misses"] == 2
+
+def test_failed_read_leaves_nothing_behind(monkeypatch):
+    cache = _cache()
+
+    def boom(db, uid):
+        raise RuntimeError("banco fora")
+
+    monkeypatch.setattr(crud, "has_active_subscription", boom)
+    try:
+        cache.is_entitled(None, 3)
+    except RuntimeError:
+        pass
+    assert cache._loading == {} and cache.stats()["size"] == 0
+
+def test_lru_bound(monkeypatch):
+    monkeypatch.setattr(crud, "has_active_subscription", lambda db, uid: True)
+    cache = _cache()
+    for uid in (1, 2, 3):
+        cache.is_entitled(None, uid)
+    assert cache.stats()["size"] == 2
+
+def _user(client, email):
+    from app.db import models
+    from app.db.session import SessionLocal
+
+    token = client.post("/auth/register", json={"email": email, "password": "pw"}).json()["token"]
+    db = SessionLocal()
+    try:
+        sub = db.query(models.Subscription).order_by(models.Subscription.id.desc()).first()
+        sub.stripe_customer_id = f"cus_{email}"
+        db.commit()
+        return {"Authorization": f"Bearer {token}"}, sub.stripe_customer_id
+    finally:
+        db.close()
+
+def _set_active(customer, active):
+    from app.db import models
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        db.query(models.Subscription).filter(models.Subscription.stripe_customer_id == customer).update({"active": active})
+        db.commit()
+    finally:
+        db.close()
+
+@pytest.fixture
+def stripe_on(client, admin, monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "STRIPE_ENABLED", True)
+    monkeypatch.setattr(settings, "STRIPE_WEBHOOK_SECRET", "whsec_test")
+    assert client.post("/admin/import-draws", json={"raw_text": draw_lines(1, 40)}, headers=admin).status_code == 200
+
+    def send(event_id, created, customer, status):
+        from app.core.stripe_inbox import sign_payload, stripe_inbox
+
+        body = json.dumps({
+            "id": event_id, "type": "customer.subscription.updated", "created": created,
+            "data": {"object": {"id": "sub_" + customer, "customer": customer, "status": status,
+                                "current_period_end": 1900000000}},
+        }).encode()
+        res = client.post("/billing/webhook", content=body, headers={"Stripe-Signature": sign_payload(body, "whsec_test")})
+        assert res.status_code == 200
+        stripe_inbox.drain()  # o drainer de fundo pode ter pego antes; aqui só garante que terminou
+    return send
+
+def test_plans_are_public(client):
+    res = client.get("/billing/plans")
+    assert res.status_code == 200 and [p["id"] for p in res.json()["plans"]] == ["1m", "3m", "1y"]
+
+def test_paywall_without_subscription(client, stripe_on):
+    headers, _ = _user(client, "free@x.com")
+    res = client.post("/generate", json={"count": 2}, headers=headers)
+    assert res.status_code == 402 and "Assinatura" in res.json()["detail"]
+    assert client.post("/generate/stream", json={"count": 2}, headers=headers).status_code == 402
+    assert client.post("/generate", json={"count": 2}).status_code in (401, 403)  # sem token nem chega no paywall
+
+def test_payment_unlocks_right_away(client, stripe_on):
+    headers, customer = _user(client, "paga@x.com")
+    assert client.post("/generate", json={"count": 2}, headers=headers).status_code == 402
+
+    # ativou no banco por fora (outro worker): o "não" fica no cache até o NEGATIVE_TTL...
+    _set_active(customer, True)
+    assert client.post("/generate", json={"count": 2}, headers=headers).status_code == 402
+    _set_active(customer, False)
+
+    # ...mas o pagamento pelo webhook invalida na hora, sem esperar o TTL
+    stripe_on("evt_pay", 100, customer, "active")
+    assert client.post("/generate", json={"count": 2}, headers=headers).status_code == 200
+
+def test_cancel_locks_right_away(client, stripe_on):
+    headers, customer = _user(client, "cancela@x.com")
+    stripe_on("evt_pay", 100, customer, "active")
+    assert client.post("/generate", json={"count": 2}, headers=headers).status_code == 200
+    assert client.post("/generate", json={"count": 2}, headers=headers).status_code == 200  # positivo em cache
+
+    stripe_on("evt_cancel", 200, customer, "canceled")
+    assert client.post("/generate", json={"count": 2, "force_new": True}, headers=headers).status_code == 402
@@ -0,0 +1,80 @@
+from math import comb, sqrt
+
+import numpy as np
+import pytest
+
+from app.engine import evaluator
+from conftest import draw_lines
+
+def _simulate(tickets, samples, seed=0, shard_samples=50_000):
+    t_lo, t_hi = evaluator.pack_tickets(tickets)
+    plan = evaluator.shard_plan(samples, shard_samples)
+    return evaluator.summarize_simulation([evaluator.simulate_shard(t_lo, t_hi, seed, i, n) for i, n in plan])
+
+def test_exact_distribution():
+    dist = evaluator.hit_distribution()
+    assert sum(dist) == pytest.approx(1.0, abs=1e-12)
+    assert dist[20] == pytest.approx(comb(50, 20) / comb(100, 20), rel=1e-12)
+    assert dist[0] == dist[20]  # 50 de 100: zero acertos = os 20 no complemento
+    odds = evaluator.ticket_odds(3)
+    assert odds["expected_prize_tickets"] == pytest.approx(3 * odds["prize_probability"])
+
+def test_random_draws_are_uniform_20_of_100():
+    lo, hi = evaluator.random_draws(np.random.default_rng(5), 200_000)
+    assert (np.bitwise_count(lo) + np.bitwise_count(hi) == 20).all()
+    per_number = np.array([
+        int(np.count_nonzero(half & np.uint64(1 << b))) for half in (lo, hi) for b in range(50)
+    ])
+    # cada dezena sai com p = 0,2: 200k sorteios -> 40000 ± 179
+    assert np.abs(per_number - 40_000).max() < 6 * sqrt(200_000 * 0.2 * 0.8)
+
+def test_monte_carlo_agrees_with_exact():
+    n = 400_000
+    dist = np.array(evaluator.hit_distribution())
+
+    # um bilhete: histograma de acertos = distribuição exata
+    one = _simulate([list(range(0, 100, 2))], n)
+    freq = np.array(one["best_hits_histogram"]) / n
+    assert np.all(np.abs(freq - dist) <= 5 * np.sqrt(dist * (1 - dist) / n) + 1e-6)
+    lo, hi = one["any_prize"]["ci95"]
+    p = sum(dist[h] for h in (20, 19, 18, 17, 16, 15, 0))
+    assert abs(one["any_prize"]["p"] - p) <= 5 * sqrt(p * (1 - p) / n) and lo <= one["any_prize"]["p"] <= hi
+
+    # bilhete e complemento: melhor = max(h, 20 - h), também exato
+    pair = _simulate([list(range(50)), list(range(50, 100))], n, seed=3)
+    best = np.zeros(21)
+    for h, q in enumerate(dist):
+        best[max(h, 20 - h)] += q
+    freq = np.array(pair["best_hits_histogram"]) / n
+    assert np.all(np.abs(freq - best) <= 5 * np.sqrt(best * (1 - best) / n) + 1e-6)
+
+def test_reproducible_and_independent_of_batch_size(monkeypatch):
+    tickets = [list(range(50)), list(range(25, 75)), list(range(0, 100, 2))]
+    base = _simulate(tickets, 30_000, seed=42, shard_samples=10_000)
+    assert _simulate(tickets, 30_000, seed=42, shard_samples=10_000) == base
+    monkeypatch.setattr(evaluator, "CHUNK_BYTES", 3 * 1500 * evaluator.BYTES_PER_CELL)  # lotes de 1500 sorteios
+    assert _simulate(tickets, 30_000, seed=42, shard_samples=10_000) == base
+    assert _simulate(tickets, 30_000, seed=43, shard_samples=10_000) != base
+
+def test_chunk_memory_is_bounded():
+    for n in (1, 50, 1000, 10_000, 100_000):
+        rows = evaluator.chunk_rows(n)
+        assert rows >= evaluator.MIN_CHUNK_ROWS
+        assert rows == evaluator.MIN_CHUNK_ROWS or rows * n * evaluator.BYTES_PER_CELL <= evaluator.CHUNK_BYTES
+    assert evaluator.chunk_rows(10_000) * 10_000 * evaluator.BYTES_PER_CELL <= 32 * 1024 * 1024
+
+def test_evaluate_endpoint(client, admin):
+    assert client.post("/admin/import-draws", json={"raw_text": draw_lines(1, 80)}, headers=admin).status_code == 200
+    sess = client.post("/generate", json={"count": 3, "window": 30}, headers=admin).json()["session_id"]
+
+    body = {"session_id": sess, "samples": 20_000, "seed": 9}
+    first = client.post("/generate/evaluate", json=body, headers=admin).json()
+    again = client.post("/generate/evaluate", json=body, headers=admin).json()
+    assert first["tickets"] == 3 and first["simulation"]["samples"] == 20_000
+    for key in ("any_prize", "any_hits_at_least", "best_hits_histogram"):
+        assert first["simulation"][key] == again["simulation"][key]
+
+    assert client.post("/generate/evaluate", json={"samples": 10}, headers=admin).status_code == 400
+    assert client.post("/generate/evaluate", json={"session_id": sess + 99}, headers=admin).status_code == 404
+    dup = {"tickets": [[0] * 50]}
+    assert client.post("/generate/evaluate", json=dup, headers=admin).status_code == 400
@@ -0,0 +1,70 @@
+import time
+
+import pytest
+
+from app.engine import executor as executor_mod
+from app.engine.executor import EngineBusy, EngineExecutor, EngineTimeout
+from conftest import draw_lines
+
+def test_bounded_inflight_inline():
+    ex = EngineExecutor(workers=0, max_inflight=1, timeout_s=5)
+
+    def nested():
+        with pytest.raises(EngineBusy):
+            ex.run(sum, [1, 2])
+        return "ok"
+
+    assert ex.run(nested) == "ok"
+    assert ex.run(sum, [1, 2]) == 3  # o slot voltou
+    stats = ex.stats()
+    assert (stats["inflight"], stats["jobs"], stats["rejected"]) == (0, 2, 1)
+
+def test_pool_timeout_keeps_slot_until_worker_finishes():
+    ex = EngineExecutor(workers=1, max_inflight=1, timeout_s=0.5)
+    try:
+        assert ex.run(pow, 2, 10) == 1024
+        with pytest.raises(EngineTimeout):
+            ex.run(time.sleep, 1.5)
+        # o job estourado ainda ocupa o worker: o slot só volta quando ele termina
+        assert ex.stats()["inflight"] == 1
+        with pytest.raises(EngineBusy):
+            ex.run(pow, 2, 3)
+        deadline = time.monotonic() + 5
+        while ex.stats()["inflight"] and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert ex.run(pow, 2, 3) == 8
+        assert ex.stats()["timeouts"] == 1 and ex.stats()["rejected"] == 1
+    finally:
+        ex.shutdown()
+
+def test_run_many_budget_returns_prefix():
+    ex = EngineExecutor(workers=0, max_inflight=1, timeout_s=5)
+    done = ex.run_many(lambda i: time.sleep(0.05) or i, [(i,) for i in range(20)], budget_s=0.12)
+    assert 1 <= len(done) < 20 and done == list(range(len(done)))
+    # orçamento que não acaba nunca: tudo, em ordem, ocupando um slot só
+    assert ex.run_many(pow, [(2, i) for i in range(6)], budget_s=60) == [2 ** i for i in range(6)]
+    assert ex.stats()["jobs"] == 2
+
+    pool = EngineExecutor(workers=2, max_inflight=1, timeout_s=10)
+    try:
+        assert pool.run_many(pow, [(3, i) for i in range(7)], budget_s=60) == [3 ** i for i in range(7)]
+        assert pool.stats()["inflight"] == 0
+    finally:
+        pool.shutdown()
+
+def test_generate_maps_busy_and_timeout(client, admin, monkeypatch):
+    assert client.post("/admin/import-draws", json={"raw_text": draw_lines(1, 80)}, headers=admin).status_code == 200
+    req = {"count": 2, "window": 60, "force_new": True}
+
+    monkeypatch.setattr(executor_mod, "engine_executor", EngineExecutor(workers=0, max_inflight=0, timeout_s=5))
+    busy = client.post("/generate", json=req, headers=admin)
+    assert busy.status_code == 429 and busy.headers["retry-after"] == "2"
+
+    slow = EngineExecutor(workers=0, max_inflight=4, timeout_s=5)
+
+    def too_slow(fn, *args):
+        raise EngineTimeout()
+
+    monkeypatch.setattr(slow, "run", too_slow)
+    monkeypatch.setattr(executor_mod, "engine_executor", slow)
+    assert client.post("/generate", json=req, headers=admin).status_code == 504
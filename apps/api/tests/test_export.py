@@ -0,0 +1,92 @@
+import csv
+import io
+
+import pytest
+
+from conftest import draw_lines
+
+def _export(client, admin, path, fmt):
+    res = client.get(path, params={"format": fmt}, headers=admin)
+    assert res.status_code == 200
+    return res.content
+
+def _seed(client, admin):
+    assert client.post("/admin/import-draws", json={"raw_text": draw_lines(1, 45)}, headers=admin).status_code == 200
+    for count in (3, 7, 1, 5, 9):
+        res = client.post("/generate", json={"count": count, "force_new": True}, headers=admin)
+        assert res.status_code == 200
+
+def _small_pages(monkeypatch):
+    # páginas/lotes bem menores que os dados: vários keysets, lotes do cursor e blocos de CSV
+    from app.core import export
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "EXPORT_PAGE_SIZE", 4)
+    monkeypatch.setattr(settings, "EXPORT_SESSIONS_PER_PAGE", 2)
+    monkeypatch.setattr(settings, "EXPORT_FETCH_SIZE", 3)
+    monkeypatch.setattr(export, "CSV_CHUNK_ROWS", 5)
+
+@pytest.mark.parametrize("path", ["/results/export", "/admin/draws/export"])
+def test_csv_pages_equal_one_shot(client, admin, monkeypatch, path):
+    _seed(client, admin)
+    whole = _export(client, admin, path, "csv")
+    _small_pages(monkeypatch)
+    assert _export(client, admin, path, "csv") == whole
+
+    rows = list(csv.reader(io.StringIO(whole.decode("utf-8"))))
+    assert len(rows) == 1 + (25 if path == "/results/export" else 45)
+    assert all(len(r[rows[0].index("numbers")].split()) in (20, 50) for r in rows[1:])
+
+def test_csv_numbers_match_the_stored_bets(client, admin):
+    from app.db import crud
+    from app.db.session import SessionLocal
+
+    _seed(client, admin)
+    rows = list(csv.DictReader(io.StringIO(_export(client, admin, "/results/export", "csv").decode("utf-8"))))
+    db = SessionLocal()
+    try:
+        expected = [
+            (str(sid), str(index), " ".join(f"{n:02d}" for n in ticket))
+            for sid in sorted({int(r["session_id"]) for r in rows})
+            for index, _, ticket in crud.get_session_bets(db, sid)
+        ]
+    finally:
+        db.close()
+    assert [(r["session_id"], r["index"], r["numbers"]) for r in rows] == expected
+
+def test_csv_chunks_are_blocks_of_rows(monkeypatch):
+    from app.core import export
+
+    monkeypatch.setattr(export, "CSV_CHUNK_ROWS", 5)
+    rows = [(c, "01/01/2020", (1 << c) | 1) for c in range(1, 13)]
+    chunks = list(export.csv_chunks(export.DRAW_COLUMNS, rows))
+    assert len(chunks) == 3  # 5 + 5 + 2 (cabeçalho vai junto do primeiro)
+    assert [c.count(b"\n") for c in chunks] == [6, 5, 2]
+    assert chunks[0].startswith(b"contest,date_br,numbers\n1,01/01/2020,00 01\n")
+    assert list(export.csv_chunks(export.DRAW_COLUMNS, [])) == [b"contest,date_br,numbers\n"]
+
+@pytest.mark.parametrize("path, total", [("/results/export", 25), ("/admin/draws/export", 45)])
+def test_parquet_row_groups(client, admin, monkeypatch, path, total):
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    _seed(client, admin)
+    whole = pq.ParquetFile(io.BytesIO(_export(client, admin, path, "parquet")))
+    assert whole.metadata.num_row_groups == 1
+    _small_pages(monkeypatch)
+    paged = pq.ParquetFile(io.BytesIO(_export(client, admin, path, "parquet")))
+
+    # um row group por página de EXPORT_PAGE_SIZE linhas, mesmo conteúdo do arquivo de uma página só
+    sizes = [paged.metadata.row_group(i).num_rows for i in range(paged.metadata.num_row_groups)]
+    assert sizes == [4] * (total // 4) + ([total % 4] if total % 4 else [])
+    assert paged.read().to_pylist() == whole.read().to_pylist()
+    assert paged.schema_arrow == whole.schema_arrow
+
+def test_parquet_without_pyarrow_is_501(client, admin, monkeypatch):
+    from app.core import export
+
+    def unavailable(columns, rows, row_group):
+        raise export.ExportUnavailable("Parquet precisa do pyarrow instalado; use format=csv.")
+
+    monkeypatch.setattr(export, "parquet_chunks", unavailable)
+    res = client.get("/admin/draws/export", params={"format": "parquet"}, headers=admin)
+    assert res.status_code == 501 and "pyarrow" in res.json()["detail"]
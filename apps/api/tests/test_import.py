@@ -0,0 +1,78 @@
+import pytest
+
+from app.routes.admin_draws import parse_draw_line
+from conftest import draw_lines
+
+def test_parse_draw_line():
+    contest, date, csv, mask = parse_draw_line("2650 - 09/01/2026 - " + " ".join(map(str, range(80, 100))))
+    assert (contest, date) == (2650, "09/01/2026")
+    assert csv.split(",")[0] == "80" and bin(mask).count("1") == 20
+    assert parse_draw_line("Concurso - Data - Dezenas") is None
+
+@pytest.mark.parametrize("numbers, message", [
+    (["05"] * 20, "repetida: 05"),
+    ([*map(str, range(19)), "03"], "repetida: 03"),
+    ([str(n) for n in range(130, 150)], "fora de 00..99"),
+    ([*map(str, range(19)), "100"], "fora de 00..99: 100"),
+])
+def test_rejects_bad_numbers(client, admin, numbers, message):
+    text = draw_lines(1, 30) + f"\n31 - 01/01/2020 - {' '.join(numbers)}"
+    res = client.post("/admin/import-draws", json={"raw_text": text}, headers=admin)
+    assert res.status_code == 400 and message in res.json()["detail"]
+    # nada gravado: o import inteiro volta
+    assert client.get("/admin/draws/export", headers=admin).text.count("\n") == 1
+
+def _db_state():
+    from app.db import crud, models
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        draws = {d.contest: d.numbers_csv for d in db.query(models.Draw).all()}
+        return draws, crud.get_data_version(db, "draws"), crud.get_window_stats(db, 50)
+    finally:
+        db.close()
+
+def test_upload_in_chunks_and_reimport(client, admin, monkeypatch):
+    from app.core.config import settings
+    from app.engine.snapshot import draw_snapshot
+
+    monkeypatch.setattr(settings, "IMPORT_CHUNK_SIZE", 7)
+    text = "Concurso - Data - Dezenas\n\n" + draw_lines(1, 50) + "\n"
+    files = {"file": ("lotomania.txt", text.encode(), "text/plain")}
+
+    res = client.post("/admin/import-draws/upload", files=files, data={"lottery": "lotomania"}, headers=admin).json()
+    assert (res["inserted"], res["updated"], res["total_received"], res["chunks"]) == (50, 0, 50, 8)
+    draws, version, stats = _db_state()
+    assert sorted(draws) == list(range(1, 51)) and version == 1
+    assert stats.head_contest == 50 and len(stats) == 50
+    assert draw_snapshot.current().version == 1 and draw_snapshot.current().head_contest == 50
+
+    # o mesmo arquivo de novo: ON CONFLICT sem mudança nenhuma, versão e snapshot ficam
+    rebuilds = draw_snapshot.stats()["rebuilds"]
+    again = client.post("/admin/import-draws/upload", files=files, headers=admin).json()
+    assert again["inserted"] == 0 and again["total_received"] == 50
+    assert _db_state()[:2] == (draws, 1)
+    assert draw_snapshot.stats()["rebuilds"] == rebuilds
+
+def test_correction_runs_follow_up_steps(client, admin, monkeypatch):
+    from app.core.config import settings
+    from app.engine.cache import ranking_cache
+    from app.engine.snapshot import draw_snapshot
+
+    monkeypatch.setattr(settings, "IMPORT_CHUNK_SIZE", 7)
+    assert client.post("/admin/import-draws", json={"raw_text": draw_lines(1, 60)}, headers=admin).status_code == 200
+    assert client.post("/generate", json={"count": 2, "window": 50}, headers=admin).status_code == 200
+    assert ranking_cache.stats()["size"] == 1
+
+    # concurso 40 corrigido e repetido no mesmo bloco (fica a última linha), 61 novo
+    fix = " ".join(map(str, range(80, 100)))
+    text = draw_lines(1, 60) + f"\n40 - 01/01/2020 - {' '.join(map(str, range(20)))}\n40 - 01/01/2020 - {fix}\n" + draw_lines(61, 61, seed=8)
+    res = client.post("/admin/import-draws", json={"raw_text": text}, headers=admin).json()
+    assert res["inserted"] == 1
+
+    draws, version, stats = _db_state()
+    assert draws[40] == ",".join(map(str, range(80, 100))) and 61 in draws
+    assert version == 2 and draw_snapshot.current().version == 2
+    assert stats.head_contest == 61 and stats.draws[61 - 40] == list(range(80, 100))  # janela reconstruída
+    assert ranking_cache.stats()["size"] == 0
@@ -0,0 +1,50 @@
+import time
+
+from app.core import metrics
+from conftest import draw_lines
+
+def _parts(header):
+    out = {}
+    for part in header.split(", "):
+        name, _, dur = part.partition(";dur=")
+        out[name] = float(dur)
+    return out
+
+def _sample(body, series):
+    # valor de uma série no texto do /metrics (contadores são do processo: compara antes/depois)
+    for line in body.splitlines():
+        if line.startswith(series + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+def test_nested_stages_record_exclusive_time():
+    timings = metrics.begin_request()
+    with metrics.stage("outer"):
+        time.sleep(0.02)
+        with metrics.stage("inner"):
+            time.sleep(0.05)
+        time.sleep(0.03)
+        metrics.observe_query(0.03)  # "SQL" de 30 ms feito dentro do "outer"
+    parts = _parts(timings.header())
+    assert 45 <= parts["inner"] < 80
+    assert 15 <= parts["outer"] < 45  # 20 ms próprios, sem os 50 do inner nem os 30 do SQL
+    assert parts["db"] == 30.0
+    assert parts["outer"] + parts["inner"] <= parts["total"] + 0.1
+
+def test_server_timing_and_prometheus(client, admin):
+    series = 'lotomania_http_requests_total{method="POST",route="/generate",status="200"}'
+    before = _sample(client.get("/metrics").text, series)
+    assert client.post("/admin/import-draws", json={"raw_text": draw_lines(1, 80)}, headers=admin).status_code == 200
+    res = client.post("/generate", json={"count": 3, "window": 60}, headers=admin)
+    assert res.status_code == 200
+    parts = _parts(res.headers["server-timing"])
+    for name in ("paywall", "db.latest", "ranking", "snapshot", "engine.scores", "engine.tickets", "db", "encode", "total"):
+        assert name in parts, name
+    # exclusivos: as partes cabem no total (arredondamento de 0,01 ms por parte)
+    assert sum(v for k, v in parts.items() if k != "total") <= parts["total"] + 0.01 * len(parts)
+
+    body = client.get("/metrics").text
+    assert _sample(body, series) == before + 1
+    assert 'lotomania_stage_duration_seconds_count{stage="ranking"}' in body
+    assert 'lotomania_engine_job_duration_seconds_count{job="scores"}' in body
+    assert "# TYPE lotomania_engine_inflight gauge" in body
@@ -0,0 +1,96 @@
+import json
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from app.core.config import settings
+from app.db import migrations
+from app.db.session import Base
+from app.engine.bitmask import join_mask, to_mask
+
+# esquema de antes da normalização das apostas (auditoria inteira + dezenas em texto por bilhete)
+LEGACY = [
+    "CREATE TABLE users (id INTEGER PRIMARY KEY, email VARCHAR(255) NOT NULL, "
+    "password_hash VARCHAR(255) NOT NULL, created_at DATETIME)",
+    "CREATE TABLE subscriptions (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, active BOOLEAN, "
+    "plan VARCHAR(50), stripe_customer_id VARCHAR(255), stripe_subscription_id VARCHAR(255), "
+    "current_period_end VARCHAR(50))",
+    "CREATE TABLE sessions (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, created_at DATETIME, "
+    "lottery VARCHAR(50) NOT NULL, requested_count INTEGER NOT NULL)",
+    "CREATE TABLE bets (id INTEGER PRIMARY KEY, session_id INTEGER NOT NULL, \"index\" INTEGER NOT NULL, "
+    "numbers_csv VARCHAR(400) NOT NULL, audit_json TEXT NOT NULL)",
+    "CREATE TABLE draws (id INTEGER PRIMARY KEY, lottery VARCHAR(50) NOT NULL, contest INTEGER NOT NULL, "
+    "date_br VARCHAR(20), numbers_csv VARCHAR(300) NOT NULL)",
+]
+
+def _ticket(session: int, index: int):
+    return sorted({(session * 7 + index * 3 + k * 2) % 100 for k in range(50)})
+
+@pytest.fixture
+def legacy_engine(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "MIGRATION_BATCH_SIZE", 3)  # vários lotes mesmo com pouca linha
+    engine = create_engine(f"sqlite:///{tmp_path}/legacy.db")
+    with engine.begin() as conn:
+        for ddl in LEGACY:
+            conn.execute(text(ddl))
+        conn.execute(text("INSERT INTO users (id, email, password_hash) VALUES (1, 'a@x.com', 'x')"))
+        for contest in range(1, 6):
+            nums = ",".join(f"{n:02d}" for n in range(contest, contest + 20))
+            conn.execute(text(
+                "INSERT INTO draws (lottery, contest, date_br, numbers_csv) VALUES ('lotomania', :c, '', :n)"
+            ), {"c": contest, "n": nums})
+        for sess in (1, 2):
+            conn.execute(text(
+                "INSERT INTO sessions (id, user_id, lottery, requested_count) VALUES (:s, 1, 'lotomania', 4)"
+            ), {"s": sess})
+            for index in range(1, 5):
+                audit = {"lottery": "lotomania", "base_draw_id": "5", "window": 60, "nucleus": [1, 2],
+                         "ticket_index": index, "seed": sess * 1000 + index}
+                conn.execute(text(
+                    "INSERT INTO bets (session_id, \"index\", numbers_csv, audit_json) VALUES (:s, :i, :n, :a)"
+                ), {"s": sess, "i": index, "n": ",".join(f"{n:02d}" for n in _ticket(sess, index)),
+                    "a": json.dumps(audit)})
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+def test_backfill_keeps_legacy_columns_until_contract(legacy_engine):
+    migrations.run_migrations(legacy_engine)
+
+    with legacy_engine.connect() as conn:
+        assert {"numbers_csv", "audit_json", "mask_lo", "seed"} <= {c["name"] for c in inspect(conn).get_columns("bets")}
+        bets = conn.execute(text(
+            "SELECT session_id, \"index\", seed, mask_lo, mask_hi FROM bets ORDER BY id"
+        )).all()
+        sessions = conn.execute(text(
+            "SELECT id, base_draw_id, window_size, target_contest, audit_json FROM sessions ORDER BY id"
+        )).all()
+        draws = conn.execute(text("SELECT contest, mask_lo, mask_hi FROM draws ORDER BY contest")).all()
+
+    assert len(bets) == 8
+    for sess, index, seed, lo, hi in bets:
+        assert seed == sess * 1000 + index
+        assert join_mask(lo, hi) == to_mask(_ticket(sess, index))
+    for sess_id, base, window, target, audit in sessions:
+        assert (base, window, target) == ("5", 60, 6)
+        shared = json.loads(audit)
+        assert "seed" not in shared and "ticket_index" not in shared and shared["nucleus"] == [1, 2]
+    for contest, lo, hi in draws:
+        assert join_mask(lo, hi) == to_mask(range(contest, contest + 20))
+
+    migrations.run_migrations(legacy_engine, contract=True)
+    with legacy_engine.connect() as conn:
+        cols = {c["name"] for c in inspect(conn).get_columns("bets")}
+    assert not {"numbers_csv", "audit_json"} & cols
+
+    migrations.run_migrations(legacy_engine, contract=True)  # de novo: nada a fazer
+
+def test_contract_refuses_rows_without_backfill(legacy_engine):
+    for step in migrations.STEPS:  # colunas novas sem o backfill
+        with legacy_engine.begin() as conn:
+            step(conn)
+    with pytest.raises(RuntimeError, match="sem backfill"):
+        with legacy_engine.begin() as conn:
+            migrations.drop_legacy_bet_columns(conn)
+    with legacy_engine.connect() as conn:
+        assert "numbers_csv" in {c["name"] for c in inspect(conn).get_columns("bets")}
@@ -0,0 +1,62 @@
+import random
+
+import numpy as np
+import pytest
+
+from app.engine.lotomania import LotomaniaConfig, assemble_tickets, build_ranking, optimizer_summary
+
+def _window(seed: int, n: int = 60):
+    rng = random.Random(seed)
+    return [sorted(rng.sample(range(100), 20)) for _ in range(n)]
+
+def _overlaps(tickets):
+    m = np.zeros((len(tickets), 100), dtype=np.int64)
+    for i, t in enumerate(tickets):
+        m[i, t] = 1
+    ov = m @ m.T
+    return ov, ov[np.triu_indices(len(tickets), k=1)]
+
+@pytest.mark.parametrize("seed, count, cap, nucleus", [
+    (1, 10, 30, 11),
+    (2, 25, 30, 11),
+    (3, 50, 30, 11),
+    (4, 20, 27, 5),
+    (5, 40, 32, 15),
+])
+def test_optimizer_meets_overlap_cap(seed, count, cap, nucleus):
+    cfg = LotomaniaConfig(count=count, window=60, nucleus_size=nucleus, diversity_overlap_max=cap,
+                          ticket_mode="optimizer", optimizer_budget_ms=60_000)
+    ranking = build_ranking(_window(seed), cfg)
+    tickets, audits = assemble_tickets(7, "2650", ranking, cfg)
+
+    assert len(tickets) == count
+    assert all(len(t) == 50 and len(set(t)) == 50 and set(ranking.nucleus) <= set(t) for t in tickets)
+    _, pairs = _overlaps(tickets)
+    assert pairs.max() <= cap  # a garantia
+
+    summary = optimizer_summary([a["optimizer"] for a in audits])
+    assert summary["constraint_met"] and summary["violations"] == 0 and not summary["budget_exhausted"]
+    assert summary["max_overlap"] == pairs.max()
+
+    # determinístico em (usuário, concurso base, índice) com orçamento de sobra
+    again, _ = assemble_tickets(7, "2650", ranking, cfg)
+    assert again == tickets
+
+def test_audit_is_honest_when_cap_is_infeasible():
+    # núcleo de 30 fixo com limite 30 e muitos bilhetes: não dá; a auditoria tem que dizer
+    cfg = LotomaniaConfig(count=30, window=60, nucleus_size=30, diversity_overlap_max=30,
+                          ticket_mode="optimizer", optimizer_budget_ms=60_000)
+    tickets, audits = assemble_tickets(7, "2650", build_ranking(_window(9), cfg), cfg)
+    ov, _ = _overlaps(tickets)
+    for i, a in enumerate(audits):
+        worst = int(ov[i, :i].max()) if i else 0
+        assert a["optimizer"]["max_overlap"] == worst
+        assert a["optimizer"]["constraint_met"] == (worst <= 30)
+    assert not optimizer_summary([a["optimizer"] for a in audits])["constraint_met"]
+
+def test_zero_budget_falls_back_to_greedy_and_says_so():
+    cfg = LotomaniaConfig(count=15, window=60, ticket_mode="optimizer", optimizer_budget_ms=0)
+    tickets, audits = assemble_tickets(7, "2650", build_ranking(_window(4), cfg), cfg)
+    assert len(tickets) == 15
+    assert all(a["optimizer"]["iterations"] == 0 for a in audits)
+    assert optimizer_summary([a["optimizer"] for a in audits])["budget_exhausted"]
@@ -0,0 +1,21 @@
+from conftest import draw_lines
+
+def test_encoding_negotiation_and_vary(client, admin):
+    assert client.post("/admin/import-draws", json={"raw_text": draw_lines(1, 80)}, headers=admin).status_code == 200
+
+    zipped = client.get("/stats?window=60", headers={"Accept-Encoding": "x-gzip"})
+    assert zipped.status_code == 200 and zipped.headers["content-encoding"] == "gzip"
+    assert zipped.headers["vary"] == "Accept-Encoding"
+    # o TestClient já descomprime
+    assert zipped.json()["window"] == 60
+
+    for refused in ("gzip;q=0", "identity", "*;q=0"):
+        plain = client.get("/stats?window=60", headers={"Accept-Encoding": refused})
+        assert plain.status_code == 200 and "content-encoding" not in plain.headers
+        assert plain.headers["vary"] == "Accept-Encoding"
+        assert plain.json() == zipped.json()
+
+    etag = zipped.headers["etag"]
+    cached = client.get("/stats?window=60", headers={"If-None-Match": etag, "Accept-Encoding": "gzip;q=0"})
+    assert cached.status_code == 304 and cached.content == b""
+    assert cached.headers["vary"] == "Accept-Encoding" and cached.headers["etag"] == etag
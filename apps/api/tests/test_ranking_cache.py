@@ -0,0 +1,64 @@
+import threading
+import time
+
+from app.engine.cache import RankingCache
+from conftest import draw_lines
+
+def test_lru_hits_misses_and_eviction():
+    cache = RankingCache(maxsize=2)
+    built = []
+
+    def builder(key):
+        return lambda: built.append(key) or f"ranking-{key}"
+
+    assert cache.get_or_build("a", builder("a")) == "ranking-a"
+    assert cache.get_or_build("a", builder("a")) == "ranking-a"
+    cache.get_or_build("b", builder("b"))
+    cache.get_or_build("a", builder("a"))  # "a" vira o mais recente
+    cache.get_or_build("c", builder("c"))  # sai o "b"
+    cache.get_or_build("a", builder("a"))
+    cache.get_or_build("b", builder("b"))
+    assert built == ["a", "b", "c", "b"]
+    assert cache.stats() == {"size": 2, "maxsize": 2, "hits": 3, "misses": 4}
+
+def test_concurrent_requests_build_once():
+    cache = RankingCache(maxsize=4)
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.05)
+        return "r"
+
+    threads = [threading.Thread(target=cache.get_or_build, args=("k", slow)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1 and cache.stats()["hits"] == 7
+
+def test_past_draw_correction_elsewhere_invalidates_ranking(client, admin, monkeypatch):
+    # correção de um concurso antigo feita por outro worker: o clear() roda lá, não aqui;
+    # a versão na chave faz este processo recalcular mesmo assim
+    from app.engine.cache import ranking_cache
+
+    assert client.post("/admin/import-draws", json={"raw_text": draw_lines(1, 80)}, headers=admin).status_code == 200
+    req = {"count": 5, "window": 60, "force_new": True}
+    before = client.post("/generate", json=req, headers=admin).json()
+    assert client.post("/generate", json=req, headers=admin).json()["bets"] == before["bets"]
+    misses = ranking_cache.stats()["misses"]
+
+    corrected = draw_lines(1, 80).splitlines()
+    corrected[69] = "70 - 01/01/2020 - " + " ".join(str(n) for n in range(20))
+    with monkeypatch.context() as m:
+        m.setattr(ranking_cache, "clear", lambda: None)  # o import "rodou em outro processo"
+        res = client.post("/admin/import-draws", json={"raw_text": "\n".join(corrected)}, headers=admin).json()
+    assert res["inserted"] == 0
+
+    after = client.post("/generate", json=req, headers=admin).json()
+    assert ranking_cache.stats()["misses"] == misses + 1
+    assert after["bets"] != before["bets"]
+
+    # e é o mesmo ranking de um cache zerado
+    ranking_cache.clear()
+    assert client.post("/generate", json=req, headers=admin).json()["bets"] == after["bets"]
@@ -0,0 +1,44 @@
+from conftest import draw_lines
+
+def _checked_bets(client, admin):
+    # 3 sessões pro concurso 81 e 2 pro 82, todas conferidas no import seguinte
+    assert client.post("/admin/import-draws", json={"raw_text": draw_lines(1, 80)}, headers=admin).status_code == 200
+    for _ in range(3):
+        assert client.post("/generate", json={"count": 4, "window": 20, "force_new": True}, headers=admin).status_code == 200
+    assert client.post("/admin/import-draws", json={"raw_text": draw_lines(1, 81)}, headers=admin).status_code == 200
+    for _ in range(2):
+        assert client.post("/generate", json={"count": 3, "window": 20, "force_new": True}, headers=admin).status_code == 200
+    assert client.post("/admin/import-draws", json={"raw_text": draw_lines(1, 82)}, headers=admin).status_code == 200
+
+def _key(item):
+    return (-item["contest"], -item["session_id"], item["index"])
+
+def test_keyset_pages_cover_everything_once(client, admin):
+    _checked_bets(client, admin)
+
+    everything = client.get("/results?page_size=500&with_total=true", headers=admin).json()
+    assert everything["total"] == len(everything["items"]) == 18 and everything["next"] is None
+    assert everything["items"] == sorted(everything["items"], key=_key)
+
+    seen, after = [], None
+    while True:
+        params = {"page_size": 5} | ({"after": after} if after else {})
+        page = client.get("/results", params=params, headers=admin).json()
+        assert page["total"] is None  # sem COUNT se não pedir
+        seen += page["items"]
+        after = page["next"]
+        if after is None:
+            break
+    assert seen == everything["items"]
+
+    # ?page= antigo continua igual
+    second = client.get("/results?page=2&page_size=5", headers=admin).json()
+    assert second["items"] == everything["items"][5:10]
+
+def test_keyset_with_contest_filter_and_bad_cursor(client, admin):
+    _checked_bets(client, admin)
+    first = client.get("/results?contest=81&page_size=7", headers=admin).json()
+    rest = client.get("/results", params={"contest": 81, "page_size": 7, "after": first["next"]}, headers=admin).json()
+    assert {i["contest"] for i in first["items"] + rest["items"]} == {81}
+    assert len(first["items"]) + len(rest["items"]) == 12 and rest["next"] is None
+    assert client.get("/results?after=81.x", headers=admin).status_code == 400
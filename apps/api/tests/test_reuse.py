@@ -0,0 +1,78 @@
+from conftest import draw_lines
+
+COMPACT = {"Accept": "application/vnd.lotomania.compact+json"}
+
+def _subscriber(client, email):
+    from app.db import models
+    from app.db.session import SessionLocal
+
+    token = client.post("/auth/register", json={"email": email, "password": "pw"}).json()["token"]
+    db = SessionLocal()
+    try:
+        user = db.query(models.User).filter(models.User.email == email).one()
+        db.query(models.Subscription).filter(models.Subscription.user_id == user.id).update({"active": True})
+        db.commit()
+    finally:
+        db.close()
+    return {"Authorization": f"Bearer {token}"}
+
+def _numbers(body):
+    return [b["numbers"] for b in body["bets"]]
+
+def test_same_request_reuses_session(client, admin):
+    assert client.post("/admin/import-draws", json={"raw_text": draw_lines(1, 80)}, headers=admin).status_code == 200
+    req = {"count": 5, "window": 30}
+
+    first = client.post("/generate", json=req, headers=admin).json()
+    again = client.post("/generate", json=req, headers=admin).json()
+    assert first["reused"] is False and again["reused"] is True
+    assert again["session_id"] == first["session_id"] and _numbers(again) == _numbers(first)
+
+    # compacto reaproveitado = mesmos bilhetes em máscara
+    compact = client.post("/generate", json=req, headers={**admin, **COMPACT}).json()
+    assert compact["reused"] is True and compact["session_id"] == first["session_id"]
+    assert len(compact["masks"]) == 5
+
+    # qualquer entrada diferente = sessão nova
+    for other in ({"count": 6, "window": 30}, {"count": 5, "window": 31}, {**req, "ticket_mode": "optimizer"}, {**req, "force_new": True}):
+        body = client.post("/generate", json=other, headers=admin).json()
+        assert body["reused"] is False and body["session_id"] != first["session_id"]
+
+    # force_new não grava fingerprint: a requisição normal continua caindo na sessão original
+    assert client.post("/generate", json=req, headers=admin).json()["session_id"] == first["session_id"]
+
+    # outro usuário e concurso novo também não reaproveitam
+    other_user = client.post("/generate", json=req, headers=_subscriber(client, "b@x.com")).json()
+    assert other_user["reused"] is False and other_user["session_id"] != first["session_id"]
+    assert client.post("/admin/import-draws", json={"raw_text": draw_lines(1, 81)}, headers=admin).status_code == 200
+    assert client.post("/generate", json=req, headers=admin).json()["reused"] is False
+
+def test_syndicate_reuse(client, admin):
+    assert client.post("/admin/import-draws", json={"raw_text": draw_lines(1, 80)}, headers=admin).status_code == 200
+    req = {"count": 30, "window": 30, "overlap_max": 40}
+    first = client.post("/generate/syndicate", json=req, headers=admin).json()
+    again = client.post("/generate/syndicate", json=req, headers=admin).json()
+    assert first["reused"] is False and again["reused"] is True
+    assert again["session_id"] == first["session_id"] and _numbers(again) == _numbers(first)
+
+def test_losing_the_insert_race_returns_the_winner(client, admin, monkeypatch):
+    # duplo clique: a segunda requisição não viu a sessão na consulta, perde no índice único
+    # e devolve a sessão de quem ganhou
+    from app.db import crud
+
+    assert client.post("/admin/import-draws", json={"raw_text": draw_lines(1, 80)}, headers=admin).status_code == 200
+    req = {"count": 4, "window": 30}
+    first = client.post("/generate", json=req, headers=admin).json()
+
+    lookup = crud.get_session_by_fingerprint
+    calls = []
+
+    def miss_first(db, user_id, fingerprint):
+        calls.append(fingerprint)
+        return None if len(calls) == 1 else lookup(db, user_id, fingerprint)
+
+    monkeypatch.setattr(crud, "get_session_by_fingerprint", miss_first)
+    raced = client.post("/generate", json=req, headers=admin).json()
+    assert len(calls) == 2
+    assert raced["reused"] is True and raced["session_id"] == first["session_id"]
+    assert _numbers(raced) == _numbers(first)
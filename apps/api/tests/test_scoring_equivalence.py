@@ -0,0 +1,70 @@
+import random
+
+import pytest
+
+from app.engine.bitmask import to_mask
+from app.engine.lotomania import (
+    LotomaniaConfig, _build_scores, _build_scores_np, _ranking_from_scores,
+    build_ranking_from_masks, build_ranking_from_stats, build_scores_batch,
+)
+from app.engine.stats import WindowStats
+
+def _history(rng: random.Random, size: int):
+    # mais recente primeiro, igual ao window_results do motor
+    return [sorted(rng.sample(range(100), 20)) for _ in range(size)]
+
+def _tied_history(size: int):
+    # cada dezena sai o mesmo número de vezes: só o desempate decide o ranking
+    return [list(range((i % 5) * 20, (i % 5) * 20 + 20)) for i in range(size)]
+
+def _configs(rng: random.Random, window: int):
+    yield LotomaniaConfig(count=1, window=window)
+    yield LotomaniaConfig(
+        count=1, window=window,
+        w_freq=rng.uniform(0, 1), w_recency=rng.uniform(0, 1), w_cycle=rng.uniform(0, 1),
+        target_gap_draws=rng.uniform(1, 20), sigma_gap_draws=rng.uniform(0, 10),
+        w_pair=rng.uniform(0, 0.5), w_triple=rng.uniform(0, 0.5),
+        top_pairs=rng.randint(1, 300), top_triples=rng.randint(1, 300),
+        nucleus_size=rng.randint(1, 20),
+    )
+
+def _cases():
+    rng = random.Random(2024)
+    for trial in range(12):
+        window = rng.choice([20, 37, 60, 200])
+        yield f"random-{trial}-w{window}", _history(rng, window), list(_configs(rng, window))
+    for window in (20, 200):
+        yield f"ties-w{window}", _tied_history(window), list(_configs(rng, window))
+
+@pytest.mark.parametrize("name,history,cfgs", list(_cases()), ids=lambda v: v if isinstance(v, str) else "")
+def test_vectorized_paths_match_reference(name, history, cfgs):
+    masks = [to_mask(d) for d in history]
+    stats = WindowStats.build(len(history), [(i, d) for i, d in enumerate(reversed(history), start=1)])
+
+    batch = build_scores_batch(history, cfgs)
+    for cfg, (batch_scores, batch_meta) in zip(cfgs, batch):
+        scores, meta = _build_scores(history, cfg)
+        np_scores, np_meta = _build_scores_np(history, cfg)
+        assert np_scores == scores
+        assert batch_scores == np_scores
+        assert np_meta == meta == batch_meta
+
+        ref = _ranking_from_scores(scores, meta, cfg)
+        for other in (
+            _ranking_from_scores(np_scores, np_meta, cfg),
+            build_ranking_from_masks(masks, cfg),
+            build_ranking_from_stats(stats, cfg),
+        ):
+            assert other.nucleus == ref.nucleus
+            assert other.ranked == ref.ranked
+            assert other.meta == ref.meta
+            assert other.scores == ref.scores
+
+def test_batch_uses_each_config_window():
+    rng = random.Random(7)
+    history = _history(rng, 200)
+    cfgs = [LotomaniaConfig(count=1, window=w) for w in (20, 60, 200, 60)]
+    for cfg, (scores, meta) in zip(cfgs, build_scores_batch(history, cfgs)):
+        ref_scores, ref_meta = _build_scores(history[: cfg.window], cfg)
+        assert scores == ref_scores
+        assert meta == ref_meta
@@ -0,0 +1,92 @@
+import os
+import threading
+
+from app.core.config import settings
+from app.db import crud
+from app.db.session import SessionLocal
+from app.engine.bitmask import join_mask, split_mask, to_mask
+from app.engine.snapshot import SnapshotReader, write_snapshot
+
+from conftest import draw_lines
+
+def _rows(contests):
+    return [(c, *split_mask(to_mask(range(c % 80, c % 80 + 20)))) for c in contests]
+
+def test_atomic_swap_keeps_old_map_readable(tmp_path):
+    path = str(tmp_path / "draws.snap")
+    write_snapshot(path, _rows([3, 1, 2]), version=1)
+    reader = SnapshotReader(path)
+    old = reader.current()
+    assert old.version == 1 and old.head_contest == 3
+    before = old.window_masks(3)
+
+    write_snapshot(path, _rows(range(1, 11)), version=2)
+    assert [p for p in os.listdir(tmp_path) if p.endswith(".tmp")] == []
+    assert old.window_masks(3) == before  # quem já tinha o mapa antigo segue lendo ele
+
+    new = reader.current()
+    assert new is not old and new.version == 2 and new.head_contest == 10
+    assert new.window_masks(2) == [join_mask(*split_mask(to_mask(range(c, c + 20)))) for c in (10, 9)]
+    assert reader.current() is new and reader.reloads == 2
+
+def test_corrupt_file_falls_back(tmp_path):
+    path = str(tmp_path / "draws.snap")
+    write_snapshot(path, _rows([1, 2]), version=1)
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 5)
+    assert SnapshotReader(path).current() is None
+
+def test_rebuild_is_one_per_host(tmp_path):
+    reader = SnapshotReader(str(tmp_path / "draws.snap"))
+    other_worker = SnapshotReader(reader.path)  # outro processo do host: só o flock segura
+    started, release = threading.Event(), threading.Event()
+
+    def slow_write():
+        started.set()
+        release.wait(5)
+
+    t = threading.Thread(target=reader.rebuild, args=(slow_write,))
+    t.start()
+    started.wait(5)
+    assert other_worker.rebuild(lambda: None) is False
+    release.set()
+    t.join()
+    assert other_worker.rebuild(lambda: None) is True
+
+def _no_inline_rebuild(db):
+    raise AssertionError("snapshot regravado dentro do request")
+
+def test_stale_snapshot_falls_back_to_db_without_inline_rebuild(client, admin, monkeypatch):
+    from app.engine import snapshot as snapshot_mod
+    from app.routes import generate
+
+    assert client.post("/admin/import-draws", json={"raw_text": draw_lines(1, 80)}, headers=admin).status_code == 200
+    snap = snapshot_mod.draw_snapshot.current()
+    db = SessionLocal()
+    version = crud.get_data_version(db, "draws")
+    db.close()
+    assert snap.version == version == 1 and snap.head_contest == 80
+
+    # correção de um concurso antigo (mesmo topo) feita "em outro host": só o banco muda
+    db = SessionLocal()
+    crud.upsert_draws(db, [(5, "01/01/2020", "00,01", to_mask(range(20)))])
+    crud.bump_data_version(db, "draws")
+    db.commit()
+    db.close()
+
+    scheduled = []
+    monkeypatch.setattr(snapshot_mod.draw_snapshot, "rebuild_in_background", scheduled.append)
+    monkeypatch.setattr(crud, "rebuild_draw_snapshot", _no_inline_rebuild)
+    db = SessionLocal()
+    try:
+        assert generate._snapshot_window(60, crud.get_data_version(db, "draws")) is None  # versão velha: o request vai pro banco
+    finally:
+        db.close()
+    assert scheduled == [generate.write_draw_snapshot]
+    monkeypatch.undo()
+
+    generate.write_draw_snapshot()
+    fresh = snapshot_mod.draw_snapshot.current()
+    assert fresh.version == 2
+    assert fresh.window_masks(80)[-5] == to_mask(range(20))
+    assert os.path.exists(settings.DRAW_SNAPSHOT_PATH)
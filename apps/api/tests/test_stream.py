@@ -0,0 +1,71 @@
+import json
+
+from conftest import draw_lines
+
+def _bets_in_db(session_id):
+    from app.db import crud
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        return crud.get_session_bets(db, session_id)
+    finally:
+        db.close()
+
+def test_stream_lines_and_reuse(client, admin, monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "STREAM_FLUSH_EVERY", 7)
+    assert client.post("/admin/import-draws", json={"raw_text": draw_lines(1, 80)}, headers=admin).status_code == 200
+    req = {"count": 25, "window": 60}
+
+    res = client.post("/generate/stream", json=req, headers=admin)
+    assert res.status_code == 200 and res.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in res.text.splitlines()]
+    assert [l["type"] for l in lines] == ["session"] + ["bet"] * 25 + ["done"]
+    assert [l["index"] for l in lines[1:-1]] == list(range(1, 26)) and lines[-1]["count"] == 25
+
+    session_id = lines[0]["session_id"]
+    stored = _bets_in_db(session_id)
+    assert [[f"{n:02d}" for n in t] for _, _, t in stored] == [l["numbers"] for l in lines[1:-1]]
+
+    # terminou inteiro: ganhou fingerprint, o /generate igual reaproveita (e o stream também)
+    again = client.post("/generate", json=req, headers=admin).json()
+    assert again["reused"] is True and again["session_id"] == session_id
+    replay = [json.loads(line) for line in client.post("/generate/stream", json=req, headers=admin).text.splitlines()]
+    assert replay[0] == {"type": "session", "session_id": session_id, "reused": True}
+    assert [l["numbers"] for l in replay[1:-1]] == [l["numbers"] for l in lines[1:-1]]
+
+def test_count_cap(client, admin):
+    assert client.post("/generate/stream", json={"count": 1001}, headers=admin).status_code == 422
+    assert client.post("/generate/stream", json={"count": 0}, headers=admin).status_code == 422
+
+def test_disconnect_keeps_what_was_sent(client, admin, monkeypatch):
+    # cliente cai no meio: o gerador é fechado; o que saiu fica gravado e a sessão não vira reaproveitável
+    from app.core.config import settings
+    from app.db import crud
+    from app.db.session import SessionLocal
+    from app.engine.lotomania import LotomaniaConfig, shared_audit
+    from app.routes import generate
+
+    monkeypatch.setattr(settings, "STREAM_FLUSH_EVERY", 4)
+    assert client.post("/admin/import-draws", json={"raw_text": draw_lines(1, 80)}, headers=admin).status_code == 200
+    cfg = LotomaniaConfig(count=20, window=60)
+    db = SessionLocal()
+    try:
+        ranking = generate._load_ranking(db, 80, 60, cfg)
+    finally:
+        db.close()
+    gen = generate._stream_generate(1, "fp-disconnect", ranking, cfg, shared_audit("80", ranking, cfg))
+
+    session_id = json.loads(next(gen))["session_id"]
+    sent = [json.loads(next(gen)) for _ in range(6)]
+    assert len(_bets_in_db(session_id)) == 4  # um bloco de 4 já commitado enquanto o stream corre
+    gen.close()
+
+    assert [i for i, _, _ in _bets_in_db(session_id)] == [b["index"] for b in sent]
+    db = SessionLocal()
+    try:
+        assert crud.get_session_by_fingerprint(db, 1, "fp-disconnect") is None
+    finally:
+        db.close()
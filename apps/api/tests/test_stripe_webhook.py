@@ -0,0 +1,119 @@
+import json
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.core.stripe_inbox import SignatureError, sign_payload, stripe_inbox, verify_event
+from app.db import models
+from app.db.session import SessionLocal
+
+SECRET = "whsec_test"
+
+def _event(event_id: str, created: int, status: str = "active", customer: str = "cus_1") -> bytes:
+    return json.dumps({
+        "id": event_id,
+        "type": "customer.subscription.updated",
+        "created": created,
+        "data": {"object": {"id": "sub_1", "customer": customer, "status": status, "current_period_end": 1900000000}},
+    }).encode()
+
+def test_valid_signature():
+    body = _event("evt_1", 1)
+    assert verify_event(body, sign_payload(body, SECRET), SECRET)["id"] == "evt_1"
+
+def test_wrong_secret():
+    body = _event("evt_1", 1)
+    with pytest.raises(SignatureError):
+        verify_event(body, sign_payload(body, "whsec_outro"), SECRET)
+
+def test_tampered_body():
+    body = _event("evt_1", 1)
+    with pytest.raises(SignatureError):
+        verify_event(_event("evt_1", 2), sign_payload(body, SECRET), SECRET)
+
+def test_expired_timestamp():
+    body = _event("evt_1", 1)
+    header = sign_payload(body, SECRET, timestamp=int(time.time()) - 301)
+    with pytest.raises(SignatureError):
+        verify_event(body, header, SECRET, tolerance_s=300)
+    assert verify_event(body, header, SECRET, tolerance_s=0)["id"] == "evt_1"  # 0 = sem janela
+
+def test_multiple_v1_entries():
+    # rotação de segredo: o Stripe manda uma assinatura por segredo ativo
+    body = _event("evt_1", 1)
+    valid = sign_payload(body, SECRET)
+    t, v1 = valid.split(",")
+    other = sign_payload(body, "whsec_antigo").split(",")[1]
+    assert verify_event(body, f"{t},{other},{v1}", SECRET)["id"] == "evt_1"
+    with pytest.raises(SignatureError):
+        verify_event(body, f"{t},{other}", SECRET)
+
+@pytest.mark.parametrize("header", [None, "", "lixo", "t=abc,v1=00", "v1=deadbeef", "t=1700000000"])
+def test_malformed_header(header):
+    with pytest.raises(SignatureError):
+        verify_event(_event("evt_1", 1), header, SECRET)
+
+def test_signed_body_that_is_not_an_event():
+    body = b'{"ok": true}'
+    with pytest.raises(SignatureError):
+        verify_event(body, sign_payload(body, SECRET), SECRET)
+
+@pytest.fixture
+def webhook(client, monkeypatch):
+    monkeypatch.setattr(settings, "STRIPE_ENABLED", True)
+    monkeypatch.setattr(settings, "STRIPE_WEBHOOK_SECRET", SECRET)
+    client.post("/auth/register", json={"email": "a@x.com", "password": "pw"})
+    db = SessionLocal()
+    db.query(models.Subscription).update({"stripe_customer_id": "cus_1"})
+    db.commit()
+    db.close()
+
+    def send(body: bytes):
+        return client.post("/billing/webhook", content=body, headers={"Stripe-Signature": sign_payload(body, SECRET)})
+    return send
+
+def _subscription():
+    db = SessionLocal()
+    try:
+        sub = db.query(models.Subscription).one()
+        return sub.active, sub.stripe_event_at
+    finally:
+        db.close()
+
+def _inbox_rows():
+    db = SessionLocal()
+    try:
+        return db.query(models.StripeEvent).count()
+    finally:
+        db.close()
+
+def test_duplicate_event_id_is_one_inbox_row(webhook):
+    body = _event("evt_dup", 100)
+    first, retry = webhook(body), webhook(body)
+    assert first.json() == {"ok": True, "duplicate": False}
+    assert retry.json() == {"ok": True, "duplicate": True}
+    assert _inbox_rows() == 1
+    assert webhook(b"{}").status_code == 400  # assinado certo, mas não é evento
+
+def test_drainer_applies_each_event_once(webhook):
+    webhook(_event("evt_a", 100, "active"))
+    assert stripe_inbox.drain() == 1
+    assert _subscription() == (True, 100)
+
+    webhook(_event("evt_a", 100, "active"))  # retry depois de aplicado
+    assert stripe_inbox.drain() == 0
+    assert _subscription() == (True, 100)
+
+def test_out_of_order_event_is_ignored(webhook):
+    webhook(_event("evt_new", 200, "canceled"))
+    assert stripe_inbox.drain() == 1
+    webhook(_event("evt_old", 150, "active"))  # chegou depois, mas é mais velho
+    assert stripe_inbox.drain() == 1  # processado (sai da inbox) sem mexer na assinatura
+    assert _subscription() == (False, 200)
+
+def test_drainer_applies_pending_events_in_created_order(webhook):
+    webhook(_event("evt_late", 300, "canceled"))
+    webhook(_event("evt_early", 250, "active"))
+    assert stripe_inbox.drain() == 2
+    assert _subscription() == (False, 300)
@@ -0,0 +1,55 @@
+import json
+import random
+
+import pytest
+
+from app.engine import sweep
+from app.engine.backtest import run_backtest
+from app.engine.lotomania import LotomaniaConfig
+
+def _history(n=70, seed=6):
+    rng = random.Random(seed)
+    return [(c, sorted(rng.sample(range(100), 20))) for c in range(1, n + 1)]
+
+CANDIDATES = sweep.grid_candidates({"w_freq": [0.3, 0.7], "top_pairs": [10, 120]})
+
+def _by_id(results):
+    return {r["id"]: r for r in results}
+
+def test_sweep_matches_backtest_and_pool_matches_inline():
+    history = _history()
+    inline = sweep.run_sweep(history, CANDIDATES, window=40, count=3, eval_contests=25, user_id=1)
+    assert len(inline) == 4
+    assert [r["mean_hits"] for r in inline] == sorted((r["mean_hits"] for r in inline), reverse=True)
+
+    for row in inline:
+        cfg = LotomaniaConfig(count=3, window=40, **row["config"])
+        bt = run_backtest(history, cfg, user_id=1, start_contest=history[-25][0])
+        assert row["hits_histogram"] == bt["hits_histogram"] and row["mean_hits"] == bt["mean_hits"]
+
+    # pool com o histórico em memória compartilhada: mesmos números
+    pooled = sweep.run_sweep(history, CANDIDATES, window=40, count=3, eval_contests=25, user_id=1, workers=2)
+    assert _by_id(pooled) == _by_id(inline)
+
+def test_checkpoint_resume(tmp_path, monkeypatch):
+    history = _history()
+    path = str(tmp_path / "sweep.jsonl")
+    first = sweep.run_sweep(history, CANDIDATES[:2], window=40, count=2, eval_contests=10, checkpoint=path)
+
+    # interrompida no meio: 1 linha de cabeçalho + 1 resultado gravado
+    lines = open(path).read().splitlines()
+    open(path, "w").write("\n".join(lines[:2]) + "\n")
+    calls = []
+    real = sweep._evaluate
+    monkeypatch.setattr(sweep, "_evaluate", lambda *a: calls.append(a) or real(*a))
+    resumed = sweep.run_sweep(history, CANDIDATES[:2], window=40, count=2, eval_contests=10, checkpoint=path)
+    assert len(calls) == 1 and _by_id(resumed) == _by_id(first)
+    assert sum("sweep" in json.loads(line) for line in open(path)) == 1
+
+    # mesmo arquivo, varredura diferente: recusa em vez de misturar
+    with pytest.raises(ValueError, match="outra varredura"):
+        sweep.run_sweep(history, CANDIDATES, window=40, count=2, eval_contests=10, checkpoint=path)
+
+def test_rejects_non_scoring_fields():
+    with pytest.raises(ValueError, match="não são de score"):
+        sweep.run_sweep(_history(), [{"count": 3}], window=40)
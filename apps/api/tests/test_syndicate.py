@@ -0,0 +1,54 @@
+import random
+
+import numpy as np
+
+from app.engine.lotomania import LotomaniaConfig, build_ranking
+from app.engine.syndicate import SyndicateConfig, generate_syndicate_tickets
+from conftest import draw_lines
+
+def _ranking(seed=2):
+    rng = random.Random(seed)
+    return build_ranking([sorted(rng.sample(range(100), 20)) for _ in range(60)], LotomaniaConfig(count=1, window=60))
+
+def _max_overlaps(tickets):
+    m = np.zeros((len(tickets), 100), dtype=np.int32)
+    for i, t in enumerate(tickets):
+        m[i, t] = 1
+    ov = m @ m.T
+    np.fill_diagonal(ov, 0)
+    return ov.max(axis=1)
+
+def test_overlap_report_matches_tickets():
+    ranking = _ranking()
+    tickets, seeds, report = generate_syndicate_tickets(4, "2650", ranking, SyndicateConfig(count=400, overlap_max=36))
+    assert len(tickets) == len(seeds) == 400
+    assert all(len(t) == 50 and len(set(t)) == 50 and all(0 <= n < 100 for n in t) for t in tickets)
+
+    ov = _max_overlaps(tickets)
+    assert report["max_overlap"] == ov.max()
+    assert report["overlap_violations"] == 0 and ov.max() <= 36
+    assert report["numbers_covered"] == 100 and report["focus_pairs_covered"] == 1.0
+
+    # determinístico em (usuário, concurso base, índice): o prefixo não depende do total
+    again, again_seeds, _ = generate_syndicate_tickets(4, "2650", ranking, SyndicateConfig(count=50, overlap_max=36))
+    assert again == tickets[:50] and again_seeds == seeds[:50]
+    other, _, _ = generate_syndicate_tickets(5, "2650", ranking, SyndicateConfig(count=50, overlap_max=36))
+    assert other != again
+
+def test_impossible_cap_is_reported_not_hidden():
+    tickets, _, report = generate_syndicate_tickets(4, "2650", _ranking(), SyndicateConfig(count=60, overlap_max=20))
+    m = np.zeros((len(tickets), 100), dtype=np.int32)
+    for i, t in enumerate(tickets):
+        m[i, t] = 1
+    ov = m @ m.T
+    against_earlier = [int(ov[i, :i].max()) if i else 0 for i in range(len(tickets))]
+    assert report["overlap_violations"] == sum(o > 20 for o in against_earlier) > 0
+    assert report["max_overlap"] == max(against_earlier)
+
+def test_syndicate_endpoint(client, admin):
+    assert client.post("/admin/import-draws", json={"raw_text": draw_lines(1, 80)}, headers=admin).status_code == 200
+    body = client.post("/generate/syndicate", json={"count": 300, "window": 60, "overlap_max": 38}, headers=admin).json()
+    tickets = [[int(n) for n in b["numbers"]] for b in body["bets"]]
+    assert len(tickets) == 300 and body["coverage"]["overlap_violations"] == 0
+    assert _max_overlaps(tickets).max() <= 38
+    assert body["audit"]["mode"] == "bolao"
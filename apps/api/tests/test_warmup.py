@@ -0,0 +1,36 @@
+import threading
+
+from app.core.warmup import Warmup
+
+def test_ready_only_after_every_step(client, monkeypatch):
+    import app.main
+
+    gate = threading.Event()
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("banco subindo")
+
+    w = Warmup(retry_s=0.01)
+    w.add("flaky", flaky)
+    w.add("slow", lambda: gate.wait(5))
+    monkeypatch.setattr(app.main, "warmup", w)
+    w.start()
+
+    res = client.get("/ready")
+    assert res.status_code == 503 and res.json()["pending"] in (["slow"], ["flaky", "slow"])
+    assert client.get("/health").status_code == 200  # o processo responde enquanto aquece
+
+    gate.set()
+    res = client.get("/ready?wait=5")
+    assert res.status_code == 200
+    body = res.json()
+    assert body["ready"] and body["pending"] == [] and body["error"] is None
+    assert set(body["steps_ms"]) == {"flaky", "slow"} and len(attempts) == 2
+
+def test_lifespan_warms_the_real_steps(client):
+    res = client.get("/ready?wait=20")
+    assert res.status_code == 200, res.json()
+    assert set(res.json()["steps_ms"]) == {"imports", "snapshot", "engine", "rankings"}
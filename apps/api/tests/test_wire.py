@@ -0,0 +1,41 @@
+import pytest
+from starlette.requests import Request
+
+from app.core import wire
+
+def _request(accept_encoding=None, accept="application/json"):
+    headers = [(b"accept", accept.encode())]
+    if accept_encoding is not None:
+        headers.append((b"accept-encoding", accept_encoding.encode()))
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False),
+    ("", False),
+    ("gzip", True),
+    ("gzip, deflate, br", True),
+    ("GZIP;Q=0.5", True),
+    ("x-gzip", True),
+    ("gzip;q=0", False),
+    ("gzip; q=0.000", False),
+    ("br, gzip;q=0", False),
+    ("identity", False),
+    ("*", True),
+    ("*;q=0", False),
+    ("*, gzip;q=0", False),
+    ("gzip;q=0, *", False),
+    ("deflate, *;q=0.1", True),
+    ("gzipx", False),
+    ("gzip;q=abc", False),
+])
+def test_accepts_gzip(header, expected):
+    assert wire.accepts_gzip(_request(header)) is expected
+
+def test_respond_honours_q_zero_and_always_varies():
+    body = {"bets": [list(range(50))] * 20}
+    plain = wire.respond(_request("gzip;q=0"), body)
+    assert "content-encoding" not in plain.headers
+    assert "Accept-Encoding" in plain.headers["vary"]
+    zipped = wire.respond(_request("x-gzip"), body)
+    assert zipped.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in zipped.headers["vary"]
@@ -1,11 +1,58 @@
 const API_URL = process.env.NEXT_PUBLIC_API_URL || "http://localhost:8000";
 
-export async function apiFetch(path: string, opts: RequestInit = {}) {
+// resposta compacta do /generate: auditoria uma vez só, bilhete = máscara de 100 bits em hex
+export const COMPACT_MEDIA_TYPE = "application/vnd.lotomania.compact+json";
+
+export async function apiFetch(path: string, opts: RequestInit = {}, compact = false) {
   const token = typeof window !== "undefined" ? localStorage.getItem("token") : null;
   const headers: any = { "Content-Type": "application/json", ...(opts.headers || {}) };
   if (token) headers["Authorization"] = `Bearer ${token}`;
+  if (compact) headers["Accept"] = COMPACT_MEDIA_TYPE;
   const res = await fetch(`${API_URL}${path}`, { ...opts, headers });
   const data = await res.json().catch(() => ({}));
   if (!res.ok) throw new Error(data.detail || "Erro API");
-  return data;
+  return data.format === "compact" ? expandCompact(data) : data;
+}
+
+// "hex" (bit n ligado = dezena n) -> ["00", "07", ...] em ordem crescente
+export function maskNumbers(hex: string): string[] {
+  const out: string[] = [];
+  for (let i = 0; i < hex.length; i++) {
+    const nibble = parseInt(hex[hex.length - 1 - i], 16);
+    for (let b = 0; b < 4; b++) {
+      if (nibble & (1 << b)) out.push(String(i * 4 + b).padStart(2, "0"));
+    }
+  }
+  return out;
+}
+
+// mesma auditoria por bilhete que o formato antigo manda (ticket_audit no backend)
+function ticketAudit(shared: any, index: number, seed: number, optimizer?: any) {
+  const audit: any = {
+    lottery: shared.lottery,
+    base_draw_id: shared.base_draw_id,
+    window: shared.window,
+    nucleus: shared.nucleus,
+    diversity_overlap_max: shared.diversity_overlap_max,
+    ticket_index: index,
+    seed,
+    meta: shared.meta,
+    notes: shared.notes,
+  };
+  if (shared.ticket_mode) audit.ticket_mode = shared.ticket_mode;
+  if (optimizer) audit.optimizer = optimizer;
+  return audit;
+}
+
+// remonta o formato antigo ({session_id, reused, bets: [{index, numbers, audit}]}) a partir do compacto
+export function expandCompact(data: any) {
+  const { format, masks, seeds, optimizer, ...rest } = data;
+  const bolao = data.audit?.mode === "bolao"; // bolão não tem auditoria por bilhete
+  const bets = masks.map((hex: string, i: number) => {
+    const bet: any = { index: i + 1, numbers: maskNumbers(hex) };
+    if (!bolao) bet.audit = ticketAudit(data.audit, i + 1, seeds[i], optimizer?.[i]);
+    return bet;
+  });
+  if (!bolao) delete rest.audit;
+  return { ...rest, bets };
 }
@@ -18,7 +18,7 @@ export default function Gerar() {
       const data = await apiFetch("/generate", {
         method: "POST",
         body: JSON.stringify({ lottery: loteria, count, window })
-      });
+      }, true);
       sessionStorage.setItem("last_result", JSON.stringify(data));
       router.push("/resultado");
     } catch (e: any) {